@@ -0,0 +1,115 @@
+# benchmarks/bench_auth.py
+"""
+Micro-benchmark de emisión y verificación de JWT.
+
+Compara JWTCore (src/services/jwt_service.py) con jwt.encode/jwt.decode de PyJWT usando
+la misma clave, por algoritmo, y mide la dependencia verify_token de las rutas (token en
+caché vs. token nuevo).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_auth.py
+    python benchmarks/bench_auth.py --iterations 20000 --algorithms HS256 EdDSA
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt  # noqa: E402
+
+from src.services.jwt_service import JWTCore  # noqa: E402
+
+SECRET = "benchmark-secret-key-with-enough-entropy"
+
+
+def generate_private_key(algorithm: str) -> str:
+    """Clave privada PEM de prueba para ES256 o EdDSA."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+    if algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def measure(label: str, func, iterations: int) -> None:
+    func()  # calentamiento
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed / iterations * 1e6:9.2f} µs/op  {iterations / elapsed:11.0f} op/s")
+
+
+def bench_algorithm(algorithm: str, iterations: int) -> None:
+    if algorithm.startswith("HS"):
+        core = JWTCore(algorithm, secret_key=SECRET)
+        signing_key = verifying_key = SECRET
+    else:
+        private_pem = generate_private_key(algorithm)
+        core = JWTCore(algorithm, private_key=private_pem)
+        signing_key, verifying_key = core._signing_key, core._verifying_key
+
+    claims = {"sub": "usuario@example.com"}
+    token = core.issue(claims, timedelta(minutes=30))
+    pyjwt_token = jwt.encode(
+        {**claims, "exp": datetime.utcnow() + timedelta(minutes=30)}, signing_key, algorithm=algorithm
+    )
+    # Los tokens son JWS estándar: PyJWT verifica los de JWTCore y viceversa
+    jwt.decode(token, verifying_key, algorithms=[algorithm])
+    core.verify(pyjwt_token)
+
+    print(f"{algorithm}")
+    measure("JWTCore.issue", lambda: core.issue(claims), iterations)
+    measure("jwt.encode (PyJWT)", lambda: jwt.encode(
+        {**claims, "exp": datetime.utcnow() + timedelta(minutes=30)}, signing_key, algorithm=algorithm
+    ), iterations)
+    measure("JWTCore.verify", lambda: core.verify(token), iterations)
+    measure("jwt.decode (PyJWT)", lambda: jwt.decode(token, verifying_key, algorithms=[algorithm]), iterations)
+
+
+def bench_dependency(iterations: int) -> None:
+    """verify_token de auth_routes: claims en caché (caso común) y token sin caché."""
+    from src.routes.auth_routes import verify_token
+    from src.services.auth_cache import token_cache
+    from src.services.jwt_service import jwt_core
+
+    token = jwt_core.issue({"sub": "usuario@example.com"})
+    loop = asyncio.new_event_loop()
+
+    def cached():
+        loop.run_until_complete(verify_token(token))
+
+    def uncached():
+        token_cache.clear()
+        loop.run_until_complete(verify_token(token))
+
+    print(f"verify_token (dependencia de rutas, {jwt_core.algorithm})")
+    measure("claims en caché", cached, iterations)
+    measure("sin caché (verifica firma)", uncached, iterations)
+    loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--algorithms", nargs="+", default=["HS256", "ES256", "EdDSA"])
+    args = parser.parse_args()
+
+    for algorithm in args.algorithms:
+        bench_algorithm(algorithm, args.iterations)
+    bench_dependency(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
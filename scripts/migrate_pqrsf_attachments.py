@@ -0,0 +1,161 @@
+# scripts/migrate_pqrsf_attachments.py
+"""
+Migra al almacén por contenido (src/services/blob_store.py) los archivos guardados con
+los formatos anteriores:
+- Adjuntos de PQRSF con ruta completa en uploads/pqrsf (un UUID distinto por cada subida
+  aunque el archivo se repitiera): cada archivo se mueve una sola vez y las copias
+  repetidas se eliminan.
+- PDFs de generadores guardados en la columna generator.invoice_pdf: pasan al almacén y
+  la columna queda en NULL.
+Antes agrega a las tablas existentes las columnas nuevas (create_all no altera tablas
+que ya existen).
+
+Uso (desde la raíz del repositorio):
+    python scripts/migrate_pqrsf_attachments.py
+"""
+import mimetypes
+import os
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import LargeBinary, String, column, inspect, table, text  # noqa: E402
+
+from src.database import SessionLocal, engine, init_db  # noqa: E402
+from src.models.generator import Generator  # noqa: E402
+from src.models.nomina import Nomina  # noqa: E402
+from src.models.pqrsf import PQRSF  # noqa: E402
+from src.models.loading import with_heavy_columns  # noqa: E402
+from src.services.blob_store import blob_store  # noqa: E402
+
+# Columnas agregadas a tablas que ya existían en las bases anteriores
+NEW_COLUMNS = [
+    Generator.__table__.c.invoice_pdf_sha256,
+    Generator.__table__.c.invoice_pdf_size,
+    Nomina.__table__.c.pdf_sha256,
+]
+
+# La columna anterior ya no está en el modelo
+legacy_generator = table(
+    "generator",
+    column("id", String),
+    column("invoice_pdf", LargeBinary),
+    column("invoice_pdf_sha256", String),
+    column("invoice_pdf_size"),
+)
+
+
+def add_missing_columns(bind=engine) -> List[str]:
+    """
+    Agrega con ALTER TABLE las columnas de NEW_COLUMNS que falten.
+    :return: Columnas agregadas ("tabla.columna").
+    """
+    added = []
+    with bind.begin() as conn:
+        # Con la conexión de la transacción: el escritor de SQLite tiene una sola
+        inspector = inspect(conn)
+        for new_column in NEW_COLUMNS:
+            table_name = new_column.table.name
+            existing = {info["name"] for info in inspector.get_columns(table_name)}
+            if new_column.name in existing:
+                continue
+            column_type = new_column.type.compile(dialect=bind.dialect)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {new_column.name} {column_type}"))
+            added.append(f"{table_name}.{new_column.name}")
+    return added
+
+
+def migrate_generator_pdfs(db, batch_size: int = 50) -> Dict[str, int]:
+    """
+    Pasa al almacén los PDFs de generator.invoice_pdf (por tandas: cada PDF está en memoria
+    mientras se guarda) y deja la columna en NULL.
+    :return: Generadores actualizados.
+    """
+    result = {"generators": 0}
+    if "invoice_pdf" not in {info["name"] for info in inspect(engine).get_columns("generator")}:
+        return result
+    last_id = ""
+    while True:
+        rows = db.execute(
+            legacy_generator.select()
+            .with_only_columns(legacy_generator.c.id, legacy_generator.c.invoice_pdf)
+            .where(legacy_generator.c.id > last_id, legacy_generator.c.invoice_pdf.isnot(None))
+            .order_by(legacy_generator.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        refs = []
+        for generator_id, data in rows:
+            digest, size = blob_store.put_bytes(bytes(data))
+            db.execute(legacy_generator.update().where(legacy_generator.c.id == generator_id).values(
+                invoice_pdf=None, invoice_pdf_sha256=digest, invoice_pdf_size=size,
+            ))
+            refs.append((digest, size, "application/pdf"))
+        blob_store.add_refs(db, refs)
+        db.commit()
+        result["generators"] += len(rows)
+    return result
+
+
+def migrate(db, batch_size: int = 200) -> Dict[str, int]:
+    """
+    :return: Solicitudes actualizadas, archivos movidos y archivos que ya no existían.
+    """
+    result = {"pqrsf": 0, "files": 0, "missing": 0}
+    stored: Dict[str, Dict[str, Any]] = {}  # ruta anterior -> descripción en el almacén
+    last_id = 0
+    while True:
+        rows = db.query(PQRSF).options(with_heavy_columns()).filter(PQRSF.id > last_id).order_by(PQRSF.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for pqrsf in rows:
+            if not any(isinstance(item, str) for item in pqrsf.archivos or []):
+                continue
+            archivos, refs = [], []
+            for item in pqrsf.archivos:
+                if not isinstance(item, str):
+                    archivos.append(item)
+                    continue
+                if item not in stored:
+                    if not os.path.exists(item):
+                        result["missing"] += 1
+                        archivos.append(item)
+                        continue
+                    digest, size = blob_store.put_file(item)
+                    name = os.path.basename(item)
+                    # Formato anterior: "<uuid>_<nombre original>"
+                    nombre = name[37:] if len(name) > 37 and name[36] == "_" else name
+                    stored[item] = {"sha256": digest, "nombre": nombre, "size": size,
+                                    "content_type": mimetypes.guess_type(nombre)[0]}
+                    result["files"] += 1
+                archivos.append(stored[item])
+                refs.append((stored[item]["sha256"], stored[item]["size"], stored[item]["content_type"]))
+            blob_store.add_refs(db, refs)
+            pqrsf.archivos = archivos
+            result["pqrsf"] += 1
+        db.commit()
+    return result
+
+
+def main() -> None:
+    init_db()
+    added = add_missing_columns()
+    print(f"Columnas agregadas: {', '.join(added) or 'ninguna'}")
+    db = SessionLocal()
+    try:
+        result = migrate(db)
+        result.update(migrate_generator_pdfs(db))
+    finally:
+        db.close()
+    print(f"Generadores con el PDF movido al almacén: {result['generators']}")
+    print(f"Solicitudes actualizadas: {result['pqrsf']}")
+    print(f"Archivos movidos al almacén: {result['files']} (faltantes: {result['missing']})")
+    print(f"Almacén: {blob_store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# src/business_logic/async_logic.py
+from typing import Any, Callable, Optional, Type
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncLogic:
+    """
+    Variante asíncrona de una clase *Logic.
+
+    Cada método público de `logic_class` se expone como corrutina y se ejecuta con
+    AsyncSession.run_sync: la lógica síncrona recibe la sesión ORM de siempre, pero la
+    E/S de la base de datos la hace el driver asíncrono (aiosqlite, asyncpg) sin
+    bloquear el event loop.
+    """
+    logic_class: Optional[Type] = None
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_") or self.logic_class is None:
+            raise AttributeError(name)
+        method = getattr(self.logic_class, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        async def runner(*args, **kwargs):
+            def call(session):
+                return getattr(self.logic_class(session), name)(*args, **kwargs)
+            return await self.db.run_sync(call)
+
+        runner.__name__ = name
+        runner.__doc__ = method.__doc__
+        return runner
@@ -115,4 +115,4 @@ class ClientsLogic:
         :param user_id: ID del usuario (contador).
         :return: Lista de objetos Client.
         """
-        return self.db.query(Client).filter(Client.id_user == user_id).all()
\ No newline at end of file
+        return self.db.query(Client).filter(Client.id_user == user_id).all()
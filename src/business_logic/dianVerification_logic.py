@@ -105,4 +105,4 @@ class DianVerificationLogic:
         }
         self.create_verification(verification_data)
 
-        return dian_response
\ No newline at end of file
+        return dian_response
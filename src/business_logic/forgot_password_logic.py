@@ -1,3 +1,4 @@
+import jwt
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from src.models.forgot_password import PasswordResetToken  # Import absoluto
@@ -6,20 +7,39 @@ from src.schemas.forgot_password_schemas import ForgotPasswordRequest, ResetPass
 from src.models.login import User  # Import absoluto
 from src.services.email_service import send_password_reset_email  # Import absoluto
 from src.utils.exceptions import NotFoundException, InvalidTokenException  # Import absoluto
-from src.utils.auth import create_access_token, verify_token
+from src.utils.auth import create_access_token
+from src.services.jwt_service import decode_token
+from src.services.password_service import hash_password, password_hasher
+from src.services.token_revocation import revocation_list
 from src.config import settings
 
 def reset_password(db: Session, request: ResetPasswordRequest):
-    # Verificar si el token es válido y no ha expirado
-    token_record = db.query(PasswordResetToken).filter(
-        PasswordResetToken.token == request.token,
-        PasswordResetToken.used == False,
-        PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not token_record:
+    # Verificar firma, expiración y revocación del token en memoria (sin consultar la base de datos)
+    try:
+        payload = decode_token(request.token)
+    except jwt.PyJWTError:
         raise InvalidTokenException("Token inválido o expirado")
-    
+    if payload.get("type") != "password_reset" or revocation_list.is_revoked(payload):
+        raise InvalidTokenException("Token inválido o expirado")
+
+    user = db.query(User).filter(User.email == payload["sub"]).first()
+    if not user:
+        raise InvalidTokenException("Token inválido o expirado")
+
+    user.password_hash = password_hasher.run_sync(hash_password, request.new_password)
+    db.query(PasswordResetToken).filter(
+        PasswordResetToken.email == user.email,
+        PasswordResetToken.used == False
+    ).update({"used": True}, synchronize_session=False)
+    db.commit()
+
+    # El enlace usado y los demás enlaces pendientes dejan de servir, y se cierran las sesiones abiertas
+    revocation_list.revoke_subject(db, user.email, "password_reset", reason="password_reset")
+    revocation_list.revoke_subject(db, user.email, reason="password_reset")
+
+    return {"message": "Contraseña actualizada correctamente"}
+
+
 def request_password_reset(db: Session, request: ForgotPasswordRequest):
     # Verificar si el usuario existe
     user = db.query(User).filter(User.email == request.email).first()
@@ -47,7 +67,7 @@ def request_password_reset(db: Session, request: ForgotPasswordRequest):
     db.add(reset_token)
     db.commit()
     
-    send_password_reset_email(email=user.email, token=jwt_token)
+    send_password_reset_email(db, email=user.email, token=jwt_token, user_name=f"{user.first_name} {user.last_name}")
     
     return {"message": "Email de recuperación enviado"}    
 
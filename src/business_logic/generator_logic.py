@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from src.models.generator import Generator  # Importa el modelo Generator
 from src.schemas.generator_schema import GeneratorJsonSchema  # Importa el esquema para serialización
 from typing import Optional, Dict, Any
+from src.services.blob_store import blob_store
 
 class GeneratorLogic:
     def __init__(self, db_session: Session):
@@ -21,10 +22,16 @@ class GeneratorLogic:
             electronic_invoice=generator_data.get("electronic_invoice", "No"),  # Por defecto, "No"
             cufe=generator_data.get("cufe", ""),  # Por defecto, vacío
             qr_code=generator_data.get("qr_code", ""),  # Por defecto, vacío
-            invoice_pdf=generator_data.get("invoice_pdf", b"")  # Por defecto, bytes vacíos
         )
 
         try:
+            # El PDF va al almacén por contenido; en la tabla queda solo su digest
+            pdf_content = generator_data.get("invoice_pdf")
+            if pdf_content:
+                digest, size = blob_store.put_bytes(pdf_content)
+                blob_store.add_refs(self.db, [(digest, size, "application/pdf")])
+                new_generator.invoice_pdf_sha256 = digest
+                new_generator.invoice_pdf_size = size
             self.db.add(new_generator)
             self.db.commit()
             self.db.refresh(new_generator)
@@ -55,6 +62,15 @@ class GeneratorLogic:
             raise ValueError("Generador no encontrado.")
 
         try:
+            update_data = dict(update_data)
+            pdf_content = update_data.pop("invoice_pdf", None)
+            if pdf_content:
+                digest, size = blob_store.put_bytes(pdf_content)
+                if digest != generator.invoice_pdf_sha256:
+                    blob_store.add_refs(self.db, [(digest, size, "application/pdf")])
+                    blob_store.release(self.db, [generator.invoice_pdf_sha256])
+                    generator.invoice_pdf_sha256 = digest
+                    generator.invoice_pdf_size = size
             for key, value in update_data.items():
                 if hasattr(generator, key):
                     setattr(generator, key, value)
@@ -77,6 +93,7 @@ class GeneratorLogic:
             return False
 
         try:
+            blob_store.release(self.db, [generator.invoice_pdf_sha256])
             self.db.delete(generator)
             self.db.commit()
             return True
@@ -108,4 +125,4 @@ class GeneratorLogic:
         }
         self.create_generator(generator_data)
 
-        return generated_data
\ No newline at end of file
+        return generated_data
@@ -0,0 +1,247 @@
+# src/business_logic/invoice_batch_logic.py
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.models.clients import Client
+from src.models.invoice import Invoice, InvoiceItem
+from src.schemas.invoice_issue_schema import InvoiceIssueRequest
+from src.services.invoice_code_service import invoice_code_issuer
+from src.services.invoice_number_service import invoice_numbers
+from src.utils.money import SCALE, div_round, from_cents, to_cents
+
+# Máximo de Numeric(12, 2) en centavos (totales de factura y de línea)
+MAX_AMOUNT_CENTS = 10 ** 12 - 1
+# Cota para cantidad x precio en centavos antes de pasar a int64 (sin desbordar)
+MAX_PRODUCT = 2 ** 62
+
+
+class InvoiceBatchLogic:
+    LOOKUP_CHUNK = 500  # Tamaño de los lotes de IN (...) al validar contra la base de datos
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def _existing(self, column, values: Iterable[str], *filters) -> set:
+        """Valores de la columna que ya existen (consultas IN por lotes), con filtros opcionales."""
+        values = list(set(values))
+        found = set()
+        for start in range(0, len(values), self.LOOKUP_CHUNK):
+            chunk = values[start:start + self.LOOKUP_CHUNK]
+            found.update(value for (value,) in self.db.query(column).filter(column.in_(chunk), *filters))
+        return found
+
+    def _validate(self, invoices: List[Dict[str, Any]], range_id: Optional[str],
+                  errors: Dict[int, List[str]], id_user: Optional[str] = None) -> Dict[int, InvoiceIssueRequest]:
+        """
+        Valida todas las facturas en una pasada: esquema, números repetidos en el lote o ya
+        usados, y clientes inexistentes (dos consultas IN por lotes para todo el lote).
+        """
+        valid: Dict[int, InvoiceIssueRequest] = {}
+        for index, raw in enumerate(invoices):
+            try:
+                valid[index] = InvoiceIssueRequest.model_validate(raw)
+            except ValidationError as e:
+                errors[index] = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                                 for error in e.errors()]
+
+        seen: Dict[str, int] = {}
+        for index, invoice in valid.items():
+            if invoice.invoice_number is None:
+                if range_id is None:
+                    errors.setdefault(index, []).append("Falta invoice_number y no se indicó range_id")
+            elif invoice.invoice_number in seen:
+                errors.setdefault(index, []).append(f"invoice_number repetido en el lote (índice {seen[invoice.invoice_number]})")
+            else:
+                seen[invoice.invoice_number] = index
+
+        used_numbers = self._existing(Invoice.invoice_number, seen)
+        client_filters = [Client.id_user == id_user] if id_user is not None else []
+        clients = self._existing(Client.id, (invoice.id_client for invoice in valid.values()), *client_filters)
+        for index, invoice in valid.items():
+            if invoice.invoice_number in used_numbers:
+                errors.setdefault(index, []).append("invoice_number ya existe")
+            if invoice.id_client not in clients:
+                errors.setdefault(index, []).append("Cliente no encontrado")
+        return {index: invoice for index, invoice in valid.items() if index not in errors}
+
+    @staticmethod
+    def _compute(invoices: List[InvoiceIssueRequest]) -> Dict[str, np.ndarray]:
+        """
+        Totales de todas las líneas del lote en un solo paso vectorizado (int64 en centavos,
+        redondeo half-up como line_total_cents) y su suma por factura.
+        """
+        items = [item for invoice in invoices for item in invoice.items]
+        owner = np.repeat(np.arange(len(invoices)), [len(invoice.items) for invoice in invoices])
+
+        def column(name: str) -> np.ndarray:
+            return np.fromiter((to_cents(getattr(item, name)) for item in items), dtype=np.int64, count=len(items))
+
+        quantity, unit_price = column("quantity"), column("unit_price")
+        # Cantidad x precio se revisa en float antes de multiplicar en int64
+        overflow = quantity.astype(np.float64) * unit_price.astype(np.float64) >= MAX_PRODUCT
+        quantity = np.where(overflow, 0, quantity)
+
+        gross = div_round(quantity * unit_price, SCALE)
+        discount = div_round(gross * column("discount"), SCALE * 100)
+        net = gross - discount
+        tax = div_round(net * column("tax"), SCALE * 100)
+
+        def per_invoice(values: np.ndarray) -> np.ndarray:
+            totals = np.zeros(len(invoices), dtype=np.int64)
+            np.add.at(totals, owner, values)
+            return totals
+
+        return {
+            "line_total": net + tax,
+            "subtotal": per_invoice(gross),
+            "total_discount": per_invoice(discount),
+            "total_taxes": per_invoice(tax),
+            "total": per_invoice(net + tax),
+            "overflow": per_invoice(overflow.astype(np.int64)) > 0,
+        }
+
+    def issue_invoices(self, invoices: List[Dict[str, Any]], range_id: Optional[str] = None,
+                       id_user: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Emite un lote de facturas con sus ítems: valida todo el lote en una pasada, calcula los
+        totales de todas las líneas con NumPy, asigna números del rango (invoice_numbers),
+        genera CUFE y QR por lote (invoice_code_issuer) y guarda facturas e ítems con dos
+        bulk_insert_mappings en una sola transacción.
+        Las facturas inválidas se reportan en errors (por índice) y no impiden emitir las demás.
+        :param invoices: Datos de cada factura (campos de InvoiceIssueRequest).
+        :param range_id: Rango de numeración para las facturas sin invoice_number.
+        :param id_user: Si se indica, solo se aceptan clientes de ese usuario.
+        :return: Resumen con las facturas creadas y los errores por factura.
+        :raises NumberingRangeExhausted: Si el rango no alcanza para el lote.
+        :raises NumberingRangeNotFound: Si range_id no existe.
+        :raises SQLAlchemyError: Si ocurre un error al guardar en la base de datos.
+        """
+        errors: Dict[int, List[str]] = {}
+        valid = self._validate(invoices, range_id, errors, id_user)
+
+        indexes = list(valid)
+        created: List[Dict[str, Any]] = []
+        if not indexes:
+            return self._summary(created, invoices, errors)
+
+        values = self._compute([valid[index] for index in indexes])
+        out_of_range = values["overflow"] | (values["subtotal"] > MAX_AMOUNT_CENTS) | \
+            (values["total"] > MAX_AMOUNT_CENTS)
+        if out_of_range.any():
+            # Caso raro: se descartan esas facturas y se recalcula el resto del lote
+            for position in np.flatnonzero(out_of_range).tolist():
+                errors[indexes[position]] = ["Importes fuera del rango permitido"]
+            indexes = [index for index in indexes if index not in errors]
+            if not indexes:
+                return self._summary(created, invoices, errors)
+            values = self._compute([valid[index] for index in indexes])
+
+        # Números del rango solo para las facturas válidas que no traen uno
+        missing = [index for index in indexes if valid[index].invoice_number is None]
+        numbers: List[str] = []
+        if missing:
+            numbers = invoice_numbers.take(range_id, len(missing))
+        assigned = dict(zip(missing, numbers))
+        number_of = {index: valid[index].invoice_number or assigned[index] for index in indexes}
+
+        issue_date = datetime.now()
+        columns = {key: [from_cents(cents) for cents in values[key].tolist()]
+                   for key in ("subtotal", "total_discount", "total_taxes", "total", "line_total")}
+        codes = invoice_code_issuer.issue(
+            [{"invoice_number": number_of[index], "total": columns["total"][position],
+              "total_taxes": columns["total_taxes"][position], "client_id": valid[index].client_id}
+             for position, index in enumerate(indexes)],
+            issued_at=issue_date,
+        )
+
+        invoice_rows, item_rows = [], []
+        line = 0
+        for position, index in enumerate(indexes):
+            invoice = valid[index]
+            invoice_id = str(uuid.uuid4())
+            invoice_rows.append({
+                "id": invoice_id,
+                "createdAt": issue_date,
+                "updatedAt": issue_date,
+                "id_client": invoice.id_client,
+                "invoice_number": number_of[index],
+                "invoice_type": invoice.invoice_type,
+                "cufe": codes[position]["cufe"],
+                "qr_code": codes[position]["qr"],
+                "issue_date": issue_date,
+                "payment_due_date": invoice.payment_due_date,
+                "client_name": invoice.client_name,
+                "client_id": invoice.client_id,
+                "client_email": invoice.client_email,
+                "subtotal": columns["subtotal"][position],
+                "total_discount": columns["total_discount"][position],
+                "total_taxes": columns["total_taxes"][position],
+                "total": columns["total"][position],
+                "tax_withholding": invoice.tax_withholding,
+                "ica_withholding": invoice.ica_withholding,
+                "status": invoice.status,
+                "attached_documents": json.dumps(invoice.attached_documents) if invoice.attached_documents is not None else None,
+                "payment_methods": json.dumps(invoice.payment_methods) if invoice.payment_methods is not None else None,
+            })
+            for item in invoice.items:
+                item_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "createdAt": issue_date,
+                    "updatedAt": issue_date,
+                    "invoice_id": invoice_id,
+                    "product_code": item.product_code,
+                    "product_name": item.product_name,
+                    "description": item.description,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "discount": item.discount,
+                    "tax": item.tax,
+                    "total": columns["line_total"][line],
+                })
+                line += 1
+            created.append({
+                "index": index,
+                "id": invoice_id,
+                "invoice_number": number_of[index],
+                "cufe": codes[position]["cufe"],
+                "subtotal": columns["subtotal"][position],
+                "total_taxes": columns["total_taxes"][position],
+                "total": columns["total"][position],
+            })
+
+        try:
+            self.db.bulk_insert_mappings(Invoice, invoice_rows)
+            self.db.bulk_insert_mappings(InvoiceItem, item_rows)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            # Los números quedan libres para el siguiente lote (o los recupera la conciliación)
+            if numbers:
+                invoice_numbers.give_back(range_id, numbers)
+            raise SQLAlchemyError(f"Error al guardar las facturas: {e}")
+
+        return self._summary(created, invoices, errors)
+
+    @staticmethod
+    def _summary(created: List[Dict[str, Any]], invoices: List[Dict[str, Any]],
+                 errors: Dict[int, List[str]]) -> Dict[str, Any]:
+        return {
+            "count": len(created),
+            "total": sum((item["total"] for item in created), from_cents(0)),
+            "created": created,
+            "errors": [
+                {
+                    "index": index,
+                    "invoice_number": invoices[index].get("invoice_number") if isinstance(invoices[index], dict) else None,
+                    "errors": messages,
+                }
+                for index, messages in sorted(errors.items())
+            ],
+        }
@@ -128,4 +128,4 @@ class InvoicesReceiptsLogic:
             "bank_transfer": "Yes"  # Transferencia bancaria
         }
 
-        return payment_methods
\ No newline at end of file
+        return payment_methods
@@ -4,28 +4,21 @@ from sqlalchemy.orm import Session
 from src.models.login import User, Login  # Importa los modelos User y Login
 from src.schemas.login_schema import UserSchema, LoginJsonSchema  # Importa los esquemas para serialización
 from typing import Optional, Dict, Any
+from src.services.login_audit import login_audit
 
 class LoginLogic:
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def register_login(self, user_id: str) -> Login:
+    def register_login(self, user_id: str, email: str) -> Dict[str, Any]:
         """
-        Registra un nuevo inicio de sesión en la tabla login.
+        Registra un nuevo inicio de sesión en la tabla login. El evento se encola y se guarda
+        por lotes en segundo plano, así que el login no espera su propio commit.
         :param user_id: ID del usuario que inició sesión.
-        :return: Objeto Login creado.
-        :raises SQLAlchemyError: Si ocurre un error al guardar en la base de datos.
+        :param email: Correo electrónico del usuario.
+        :return: Fila encolada (id, id_user, email, login_date).
         """
-        new_login = Login(id_user=user_id, login_date=datetime.now(timezone.utc))
-
-        try:
-            self.db.add(new_login)
-            self.db.commit()
-            self.db.refresh(new_login)
-            return new_login
-        except SQLAlchemyError as e:
-            self.db.rollback()
-            raise SQLAlchemyError(f"Error al registrar el inicio de sesión: {e}")
+        return login_audit.record(user_id, email, datetime.now(timezone.utc))
 
     def get_user_by_email(self, email: str) -> Optional[User]:
         """
@@ -85,4 +78,4 @@ class LoginLogic:
             "title": "Términos y Condiciones",
             "content": "Aquí van los términos y condiciones del servicio..."
         }
-        return terms_and_conditions
\ No newline at end of file
+        return terms_and_conditions
@@ -0,0 +1,144 @@
+# src/business_logic/nomina_batch_logic.py
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.models.nomina import Nomina, TipoContrato
+from src.business_logic.payroll_rates import MONTH_DAYS, PayrollRates, compute_payroll, get_payroll_rates
+from src.utils.money import from_cents, to_cents, to_decimal
+
+# Horas que se cargan como columnas (arreglos) en la liquidación
+PAY_RUN_HOURS = ("extra_day_hours", "extra_night_hours", "sunday_hours", "holiday_hours")
+
+
+class NominaBatchLogic:
+    LOOKUP_CHUNK = 500  # Tamaño de los lotes de IN (...) al buscar nóminas existentes
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def _existing_employees(self, id_user: str, period: str, employee_ids: List[str]) -> List[str]:
+        """Empleados del usuario que ya tienen nómina en el periodo (consultas IN por lotes)."""
+        existing = []
+        for start in range(0, len(employee_ids), self.LOOKUP_CHUNK):
+            chunk = employee_ids[start:start + self.LOOKUP_CHUNK]
+            rows = self.db.query(Nomina.employee_id).filter(
+                Nomina.id_user == id_user,
+                Nomina.period == period,
+                Nomina.employee_id.in_(chunk),
+            ).all()
+            existing.extend(row.employee_id for row in rows)
+        return existing
+
+    def create_pay_run(self, id_user: str, period: str, employees: List[Dict[str, Any]],
+                       rates: Optional[PayrollRates] = None) -> Dict[str, Any]:
+        """
+        Liquida y guarda la nómina de un periodo para una lista de empleados.
+        Los cálculos se hacen sobre arreglos int64 de NumPy en centavos (sin float) y las
+        filas se insertan con un único bulk insert, sin crear objetos ORM por empleado.
+        :param id_user: ID del usuario (contador) asociado a las nóminas.
+        :param period: Periodo en formato YYYY-MM.
+        :param employees: Datos de cada empleado (campos de PayRunEmployee).
+        :param rates: Tasas a aplicar (por defecto las del periodo, en caché).
+        :return: Resumen con los totales y el ID de cada nómina creada.
+        :raises ValueError: Si hay empleados repetidos o que ya tienen nómina en el periodo.
+        :raises SQLAlchemyError: Si ocurre un error al guardar en la base de datos.
+        """
+        rates = rates or get_payroll_rates(period)
+
+        employee_ids = [employee["employee_id"] for employee in employees]
+        if len(set(employee_ids)) != len(employee_ids):
+            raise ValueError("La liquidación contiene empleados repetidos.")
+        existing = self._existing_employees(id_user, period, employee_ids)
+        if existing:
+            raise ValueError(f"Ya existe nómina en el periodo {period} para: {', '.join(sorted(existing))}")
+
+        def column(name: str, default: Any = 0) -> np.ndarray:
+            return np.fromiter((to_cents(employee.get(name, default)) for employee in employees),
+                               dtype=np.int64, count=len(employees))
+
+        values = compute_payroll(
+            rates,
+            base_cents=column("base_salary"),
+            days=column("days_worked", MONTH_DAYS),
+            hours={name: column(name) for name in PAY_RUN_HOURS},
+            deductions_cents=column("deductions"),
+            transport_override_cents=np.fromiter(
+                (-1 if employee.get("transport_allowance") is None else to_cents(employee["transport_allowance"])
+                 for employee in employees),
+                dtype=np.int64, count=len(employees),
+            ),
+        )
+
+        # Centavos a Decimal una sola vez por columna (valores exactos para Numeric(12, 2))
+        columns = {key: [from_cents(cents) for cents in value.tolist()] for key, value in values.items()}
+        now = datetime.now()
+        mappings = []
+        for i, employee in enumerate(employees):
+            mappings.append({
+                "id": str(uuid.uuid4()),
+                "createdAt": now,
+                "updatedAt": now,
+                "id_user": id_user,
+                "period": period,
+                "employee_id": employee["employee_id"],
+                "employee_name": employee["employee_name"],
+                "email": employee["email"],
+                "cargo": employee.get("cargo"),
+                "contract_type": TipoContrato(employee["contract_type"]),
+
+                # Salarios e ingresos (horas_extras guarda el valor pagado por horas extras)
+                "salario_base": to_decimal(employee["base_salary"]),
+                "horas_extras": columns["extra_pay"][i],
+                "transporte": columns["transport"][i],
+                "total_ingresos": columns["total_gross"][i],
+
+                # Tiempo trabajado
+                "days_worked": to_decimal(employee.get("days_worked", MONTH_DAYS)),
+                "night_hours": to_decimal(employee.get("night_hours", 0.0)),
+                "extra_day_hours": to_decimal(employee.get("extra_day_hours", 0.0)),
+                "extra_night_hours": to_decimal(employee.get("extra_night_hours", 0.0)),
+                "sunday_hours": to_decimal(employee.get("sunday_hours", 0.0)),
+                "holiday_hours": to_decimal(employee.get("holiday_hours", 0.0)),
+
+                # Deducciones y aportes
+                "health_contribution": columns["health"][i],
+                "pension_contribution": columns["pension"][i],
+                "solidarity_pension_fund": columns["solidarity"][i],
+                "deductions": to_decimal(employee.get("deductions", 0.0)),
+                "total_deducciones": columns["total_deductions"][i],
+
+                "total_neto": columns["total_net"][i],
+                "other_concepts": employee.get("other_concepts"),
+                "is_paid": False,
+            })
+
+        try:
+            self.db.bulk_insert_mappings(Nomina, mappings)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise SQLAlchemyError(f"Error al guardar la liquidación: {e}")
+
+        return {
+            "id_user": id_user,
+            "period": period,
+            "count": len(mappings),
+            "total_ingresos": from_cents(values["total_gross"].sum()),
+            "total_deducciones": from_cents(values["total_deductions"].sum()),
+            "total_neto": from_cents(values["total_net"].sum()),
+            "nominas": [
+                {
+                    "id": mapping["id"],
+                    "employee_id": mapping["employee_id"],
+                    "total_ingresos": mapping["total_ingresos"],
+                    "total_deducciones": mapping["total_deducciones"],
+                    "total_neto": mapping["total_neto"],
+                }
+                for mapping in mappings
+            ],
+        }
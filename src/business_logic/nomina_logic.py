@@ -1,47 +1,62 @@
 from datetime import datetime, timedelta
+from decimal import Decimal
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from src.models.nomina import Nomina  
-from src.schemas.nomina_schema import NominaSchema  
+from src.models.nomina import Nomina, TipoContrato
+from src.models.loading import with_heavy_columns
+from src.utils.money import to_decimal
+from src.business_logic.payroll_rates import MONTH_DAYS, MONTHLY_HOURS, calculate_payroll
 from typing import Optional, Dict, Any, List
+from src.business_logic.async_logic import AsyncLogic
 
 class NominaLogic:
-    # Constantes para cálculos
-    EXTRA_HOUR_RATE = 1.25  # Multiplicador por hora extra
-    LATE_PENALTY_RATE = 0.01  # Penalización por minuto tarde
-    DEFAULT_WORK_HOURS_MONTH = 160  # Horas laborales por mes (para cálculos)
+    # Penalización por minuto tarde (fracción del valor hora; Decimal: los montos se guardan en Numeric(12, 2))
+    LATE_PENALTY_RATE = Decimal("0.01")
+    # Campos que obligan a recalcular la liquidación al actualizar
+    PAYROLL_FIELDS = ("period", "salario_base", "days_worked", "extra_day_hours", "extra_night_hours",
+                      "sunday_hours", "holiday_hours", "retrasos", "transporte", "vacaciones", "deductions")
 
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def _calculate_payroll_values(self, nomina_data: Dict[str, Any]) -> Dict[str, float]:
-        """Calcula los valores derivados de la nómina."""
-        salario_base = nomina_data["salario_base"]
-        horas_extras = nomina_data.get("horas_extras", 0.0)
-        retrasos = nomina_data.get("retrasos", 0.0)
-        transporte = nomina_data.get("transporte", 0.0)
-        vacaciones = nomina_data.get("vacaciones", 0.0)
-        deductions = nomina_data.get("deductions", 0.0)
-        contributions = nomina_data.get("contributions", 0.0)
-
-        # Cálculo de valores
-        extra_pay = (salario_base / self.DEFAULT_WORK_HOURS_MONTH) * self.EXTRA_HOUR_RATE * horas_extras
-        late_penalty = (salario_base / self.DEFAULT_WORK_HOURS_MONTH / 60) * self.LATE_PENALTY_RATE * retrasos
+    def _calculate_payroll_values(self, nomina_data: Dict[str, Any]) -> Dict[str, Decimal]:
+        """
+        Calcula los valores derivados de la nómina con el mismo motor que la liquidación masiva
+        (calculate_payroll: tablas del periodo y valor hora sobre MONTHLY_HOURS). Vacaciones y
+        retrasos se suman aparte, redondeados a centavos (half-up).
+        """
+        salario_base = to_decimal(nomina_data["salario_base"])
+        days_worked = nomina_data.get("days_worked")
+        liquidacion = calculate_payroll(
+            nomina_data["period"],
+            salario_base,
+            days_worked=MONTH_DAYS if days_worked is None else days_worked,
+            extra_day_hours=nomina_data.get("extra_day_hours") or 0,
+            extra_night_hours=nomina_data.get("extra_night_hours") or 0,
+            sunday_hours=nomina_data.get("sunday_hours") or 0,
+            holiday_hours=nomina_data.get("holiday_hours") or 0,
+            deductions=nomina_data.get("deductions") or 0,
+            transport_allowance=nomina_data.get("transporte"),
+        )
+        retrasos = to_decimal(nomina_data.get("retrasos"))
+        vacaciones = to_decimal(nomina_data.get("vacaciones"))
+        late_penalty = to_decimal(salario_base * self.LATE_PENALTY_RATE * retrasos / (MONTHLY_HOURS * 60))
 
-        total_ingresos = salario_base + extra_pay + transporte + vacaciones
-        total_deducciones = late_penalty + deductions
-        total_neto = total_ingresos - total_deducciones + contributions
+        total_ingresos = liquidacion["total_gross"] + vacaciones
+        total_deducciones = liquidacion["total_deductions"] + late_penalty
 
         return {
-            "horas_extras": horas_extras,
-            "extra_pay": extra_pay,
+            "horas_extras": liquidacion["extra_pay"],  # valor pagado por horas extras, como en la liquidación masiva
             "retrasos": retrasos,
             "late_penalty": late_penalty,
-            "transporte": transporte,
+            "transporte": liquidacion["transport"],
             "vacaciones": vacaciones,
+            "health_contribution": liquidacion["health"],
+            "pension_contribution": liquidacion["pension"],
+            "solidarity_pension_fund": liquidacion["solidarity"],
             "total_ingresos": total_ingresos,
             "total_deducciones": total_deducciones,
-            "total_neto": total_neto
+            "total_neto": total_ingresos - total_deducciones
         }
 
     def create_nomina(self, nomina_data: Dict[str, Any]) -> Nomina:
@@ -50,9 +65,9 @@ class NominaLogic:
         
         Args:
             nomina_data: Diccionario con los datos de la nómina.
-                Campos requeridos: id_user, contract_type, period, employee_name, 
-                employee_id, email, salario_base, days_worked, 
-                health_contribution, pension_contribution
+                Campos requeridos: id_user, contract_type, period, employee_name,
+                employee_id, email, salario_base, days_worked
+                (aportes y totales se calculan con calculate_payroll)
             
         Returns:
             Objeto Nomina creado
@@ -76,7 +91,7 @@ class NominaLogic:
         # Crea una nueva nómina
         new_nomina = Nomina(
             id_user=nomina_data["id_user"],
-            contract_type=nomina_data["contract_type"],
+            contract_type=TipoContrato(nomina_data["contract_type"]),
             period=nomina_data["period"],
             employee_name=nomina_data["employee_name"],
             employee_id=nomina_data["employee_id"],
@@ -100,9 +115,9 @@ class NominaLogic:
             retrasos=calculated_values["retrasos"],
             
             # Deducciones y aportes
-            health_contribution=nomina_data["health_contribution"],
-            pension_contribution=nomina_data["pension_contribution"],
-            solidarity_pension_fund=nomina_data.get("solidarity_pension_fund", 0.0),
+            health_contribution=calculated_values["health_contribution"],
+            pension_contribution=calculated_values["pension_contribution"],
+            solidarity_pension_fund=calculated_values["solidarity_pension_fund"],
             deductions=nomina_data.get("deductions", 0.0),
             total_deducciones=calculated_values["total_deducciones"],
             
@@ -127,7 +142,7 @@ class NominaLogic:
 
     def get_nomina(self, nomina_id: str) -> Optional[Nomina]:
         """Obtiene una nómina por su ID."""
-        return self.db.query(Nomina).filter(Nomina.id == nomina_id).first()
+        return self.db.query(Nomina).options(with_heavy_columns()).filter(Nomina.id == nomina_id).first()
 
     def update_nomina(self, nomina_id: str, update_data: Dict[str, Any]) -> Optional[Nomina]:
         """
@@ -149,18 +164,12 @@ class NominaLogic:
             raise ValueError("Nómina no encontrada.")
 
         # Si se actualizan campos de cálculo, recalcular valores
-        if any(field in update_data for field in [
-            'salario_base', 'horas_extras', 'retrasos', 
-            'transporte', 'vacaciones', 'deductions', 'contributions'
-        ]):
+        if any(field in update_data for field in self.PAYROLL_FIELDS):
             # Combinar datos existentes con los nuevos
             nomina_data = {**nomina.__dict__, **update_data}
             calculated_values = self._calculate_payroll_values(nomina_data)
-            update_data.update({
-                'total_ingresos': calculated_values['total_ingresos'],
-                'total_deducciones': calculated_values['total_deducciones'],
-                'total_neto': calculated_values['total_neto']
-            })
+            calculated_values.pop('late_penalty')
+            update_data.update(calculated_values)
 
         try:
             for key, value in update_data.items():
@@ -187,11 +196,22 @@ class NominaLogic:
             self.db.rollback()
             raise SQLAlchemyError(f"Error al eliminar la nómina: {e}")
 
-    def get_nominas_by_employee(self, employee_id: str) -> List[Nomina]:
-        """Obtiene todas las nóminas de un empleado por su ID."""
-        return self.db.query(Nomina).filter(Nomina.employee_id == employee_id).all()
+    def get_nominas_by_employee(self, employee_id: str, id_user: Optional[str] = None) -> List[Nomina]:
+        """
+        Obtiene todas las nóminas de un empleado por su ID (con other_concepts, que va en la respuesta).
+        :param id_user: Limita la búsqueda a las nóminas de ese usuario (contador).
+        """
+        query = self.db.query(Nomina).options(with_heavy_columns()).filter(Nomina.employee_id == employee_id)
+        if id_user is not None:
+            query = query.filter(Nomina.id_user == id_user)
+        return query.all()
 
     def get_nominas_last_12_months(self) -> List[Nomina]:
         """Obtiene todas las nóminas de los últimos 12 meses."""
         twelve_months_ago = (datetime.now() - timedelta(days=365)).strftime("%Y-%m")
-        return self.db.query(Nomina).filter(Nomina.period >= twelve_months_ago).all()
\ No newline at end of file
+        return self.db.query(Nomina).options(with_heavy_columns()).filter(Nomina.period >= twelve_months_ago).all()
+
+
+class AsyncNominaLogic(AsyncLogic):
+    """Variante asíncrona de NominaLogic para consultas con AsyncSession (solo lectura: las escrituras usan NominaLogic)."""
+    logic_class = NominaLogic
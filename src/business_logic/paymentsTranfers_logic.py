@@ -122,4 +122,4 @@ class PaymentsTransfersLogic:
             if payment.barter == "Yes":
                 totals["barter"] += 1.0  # Aquí deberías sumar el valor real del pago
 
-        return totals
\ No newline at end of file
+        return totals
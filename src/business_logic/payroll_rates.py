@@ -0,0 +1,174 @@
+# src/business_logic/payroll_rates.py
+from decimal import Decimal
+from functools import lru_cache
+from math import lcm
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.utils.money import SCALE, apply_ratio, div_round, from_cents, ratio, to_cents
+
+# Salario mínimo mensual legal vigente (SMLV) por año
+SMLV_BY_YEAR = {
+    2023: "1160000",
+    2024: "1300000",
+    2025: "1423500",
+}
+
+# Auxilio de transporte mensual por año
+TRANSPORT_ALLOWANCE_BY_YEAR = {
+    2023: "140606",
+    2024: "162000",
+    2025: "200000",
+}
+
+# Multiplicadores del valor hora por tipo de hora
+OVERTIME_MULTIPLIERS = {
+    "extra_day_hours": "1.25",  # Hora extra diurna
+    "extra_night_hours": "1.75",  # Hora extra nocturna
+    "sunday_hours": "1.75",  # Hora dominical
+    "holiday_hours": "2.0",  # Hora festiva
+}
+
+MONTHLY_HOURS = 240  # Divisor del valor hora
+MONTH_DAYS = 30
+HEALTH_RATE = "0.04"  # Aporte a salud del empleado
+PENSION_RATE = "0.04"  # Aporte a pensión del empleado
+SOLIDARITY_RATE = "0.01"  # Fondo de solidaridad pensional
+SOLIDARITY_SMLV_LIMIT = 4  # Aplica a salarios mayores a 4 SMLV
+TRANSPORT_SMLV_LIMIT = 2  # Auxilio de transporte hasta 2 SMLV
+
+
+def _value_for_year(table: Dict[int, str], year: int) -> str:
+    """Valor vigente para el año: el del año o, si no está en la tabla, el del año anterior más cercano."""
+    known = [y for y in table if y <= year]
+    return table[max(known)] if known else table[min(table)]
+
+
+class PayrollRates:
+    """
+    Tabla de tasas de un periodo, precalculada en enteros: montos en centavos y tasas
+    como fracciones (numerador, denominador). Se construye una vez por periodo.
+    """
+
+    def __init__(self, period: str, smlv: Any, transport_allowance: Any):
+        self.period = period
+        self.smlv_cents = to_cents(smlv)
+        self.transport_cents = to_cents(transport_allowance)
+        self.solidarity_threshold_cents = SOLIDARITY_SMLV_LIMIT * self.smlv_cents
+        self.transport_threshold_cents = TRANSPORT_SMLV_LIMIT * self.smlv_cents
+
+        self.health = ratio(HEALTH_RATE)
+        self.pension = ratio(PENSION_RATE)
+        self.solidarity = ratio(SOLIDARITY_RATE)
+
+        # Multiplicadores llevados a un denominador común para redondear una sola vez
+        multipliers = {name: ratio(value) for name, value in OVERTIME_MULTIPLIERS.items()}
+        self.overtime_denominator = lcm(*(den for _, den in multipliers.values()))
+        self.overtime_numerators = {
+            name: num * (self.overtime_denominator // den) for name, (num, den) in multipliers.items()
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "smlv": from_cents(self.smlv_cents),
+            "transport_allowance": from_cents(self.transport_cents),
+            "overtime_multipliers": {name: Decimal(value) for name, value in OVERTIME_MULTIPLIERS.items()},
+            "health_rate": Decimal(HEALTH_RATE),
+            "pension_rate": Decimal(PENSION_RATE),
+            "solidarity_rate": Decimal(SOLIDARITY_RATE),
+        }
+
+
+@lru_cache(maxsize=128)
+def get_payroll_rates(period: str) -> PayrollRates:
+    """
+    Tasas del periodo (YYYY-MM), en caché. PAYROLL_SMLV y PAYROLL_TRANSPORT_ALLOWANCE
+    reemplazan los valores de la tabla si están configurados.
+    :raises ValueError: Si el periodo no tiene formato YYYY-MM.
+    """
+    try:
+        year = int(period[:4])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Periodo inválido: {period}") from e
+    smlv = settings.PAYROLL_SMLV or _value_for_year(SMLV_BY_YEAR, year)
+    transport = settings.PAYROLL_TRANSPORT_ALLOWANCE or _value_for_year(TRANSPORT_ALLOWANCE_BY_YEAR, year)
+    return PayrollRates(period, smlv, transport)
+
+
+def compute_payroll(rates: PayrollRates, base_cents: np.ndarray, days: np.ndarray,
+                    hours: Dict[str, np.ndarray], deductions_cents: np.ndarray,
+                    transport_override_cents: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Liquida la nómina de todos los empleados a la vez, en aritmética entera (int64).
+    Cada valor se redondea half-up a centavos una sola vez, así que recalcular la misma
+    liquidación da exactamente los mismos centavos.
+    :param rates: Tasas del periodo.
+    :param base_cents: Salario base mensual en centavos.
+    :param days: Días trabajados en centésimas.
+    :param hours: Horas por tipo (claves de OVERTIME_MULTIPLIERS), en centésimas.
+    :param deductions_cents: Otros descuentos en centavos.
+    :param transport_override_cents: Auxilio de transporte informado en centavos (-1 para calcularlo).
+    :return: Diccionario de arreglos int64 en centavos.
+    """
+    weighted_hours = sum(
+        hours[name] * numerator for name, numerator in rates.overtime_numerators.items()
+    )
+    extra_pay = div_round(base_cents * weighted_hours, rates.overtime_denominator * MONTHLY_HOURS * SCALE)
+
+    # Auxilio de transporte: solo para salarios de hasta 2 SMLV, proporcional a los días
+    computed_transport = np.where(
+        base_cents <= rates.transport_threshold_cents,
+        div_round(rates.transport_cents * days, MONTH_DAYS * SCALE),
+        0,
+    )
+    transport = np.where(transport_override_cents >= 0, transport_override_cents, computed_transport)
+
+    health = apply_ratio(base_cents, rates.health)
+    pension = apply_ratio(base_cents, rates.pension)
+    solidarity = np.where(base_cents > rates.solidarity_threshold_cents, apply_ratio(base_cents, rates.solidarity), 0)
+
+    total_gross = div_round(base_cents * days, MONTH_DAYS * SCALE) + transport + extra_pay
+    total_deductions = health + pension + solidarity + deductions_cents
+
+    return {
+        "extra_pay": extra_pay,
+        "transport": transport,
+        "health": health,
+        "pension": pension,
+        "solidarity": solidarity,
+        "total_gross": total_gross,
+        "total_deductions": total_deductions,
+        "total_net": total_gross - total_deductions,
+    }
+
+
+def calculate_payroll(period: str, base_salary: Any, days_worked: Any = MONTH_DAYS,
+                      extra_day_hours: Any = 0, extra_night_hours: Any = 0, sunday_hours: Any = 0,
+                      holiday_hours: Any = 0, deductions: Any = 0,
+                      transport_allowance: Optional[Any] = None) -> Dict[str, Decimal]:
+    """
+    Liquidación de un solo empleado con el mismo motor que la liquidación masiva.
+    :return: Valores liquidados como Decimal con 2 decimales.
+    """
+    def column(value: Any) -> np.ndarray:
+        return np.array([to_cents(value)], dtype=np.int64)
+
+    values = compute_payroll(
+        get_payroll_rates(period),
+        base_cents=column(base_salary),
+        days=column(days_worked),
+        hours={
+            "extra_day_hours": column(extra_day_hours),
+            "extra_night_hours": column(extra_night_hours),
+            "sunday_hours": column(sunday_hours),
+            "holiday_hours": column(holiday_hours),
+        },
+        deductions_cents=column(deductions),
+        transport_override_cents=np.array(
+            [-1 if transport_allowance is None else to_cents(transport_allowance)], dtype=np.int64
+        ),
+    )
+    return {key: from_cents(value[0]) for key, value in values.items()}
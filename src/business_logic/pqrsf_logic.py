@@ -1,8 +1,10 @@
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from src.models.pqrsf import PQRSF  # Importa el modelo PQRSF
+from src.models.loading import with_heavy_columns
 from src.schemas.pqrsf_schema import PQRSFJsonSchema  # Importa el esquema para serialización
 from typing import Optional, Dict, Any, List
+from src.services.blob_store import blob_store
 
 class PQRSFLogic:
     def __init__(self, db_session: Session):
@@ -35,7 +37,7 @@ class PQRSFLogic:
         :param pqrsf_id: ID de la solicitud PQRSF.
         :return: Objeto PQRSF si existe, None si no se encuentra.
         """
-        return self.db.query(PQRSF).filter(PQRSF.id == pqrsf_id).first()
+        return self.db.query(PQRSF).options(with_heavy_columns()).filter(PQRSF.id == pqrsf_id).first()
 
     def update_pqrsf(self, pqrsf_id: str, update_data: Dict[str, Any]) -> Optional[PQRSF]:
         """
@@ -73,6 +75,9 @@ class PQRSFLogic:
             return False
 
         try:
+            # Los adjuntos quedan sin esta referencia; el recolector borra los que ya nadie usa
+            blob_store.release(self.db, [item.get("sha256") for item in pqrsf.archivos or []
+                                         if isinstance(item, dict)])
             self.db.delete(pqrsf)
             self.db.commit()
             return True
@@ -85,7 +90,7 @@ class PQRSFLogic:
         Obtiene todas las solicitudes PQRSF.
         :return: Lista de objetos PQRSF.
         """
-        return self.db.query(PQRSF).all()
+        return self.db.query(PQRSF).options(with_heavy_columns()).all()
 
     def process_pqrsf(self, pqrsf_id: str) -> Dict[str, Any]:
         """
@@ -103,4 +108,4 @@ class PQRSFLogic:
             "message": f"La solicitud PQRSF de tipo {pqrsf.pqrsf_type} ha sido procesada."
         }
 
-        return processing_result
\ No newline at end of file
+        return processing_result
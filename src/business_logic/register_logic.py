@@ -92,4 +92,4 @@ class RegisterLogic:
             return True
         except SQLAlchemyError as e:
             self.db.rollback()
-            raise SQLAlchemyError(f"Error al eliminar el usuario: {e}")
\ No newline at end of file
+            raise SQLAlchemyError(f"Error al eliminar el usuario: {e}")
@@ -113,4 +113,4 @@ class SuppliersLogic:
         :param user_id: ID del usuario (contador).
         :return: Lista de objetos Supplier.
         """
-        return self.db.query(Supplier).filter(Supplier.id_user == user_id).all()
\ No newline at end of file
+        return self.db.query(Supplier).filter(Supplier.id_user == user_id).all()
@@ -9,10 +9,75 @@ load_dotenv()
 class Settings(BaseSettings):
     # Configuración de base de datos
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() in ['true', 'on', '1']
+
+    # Pool de conexiones (bases de datos de servidor: PostgreSQL, MySQL, ...)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ['true', 'on', '1']
+    DB_POOL_USE_LIFO: bool = os.getenv("DB_POOL_USE_LIFO", "true").lower() in ['true', 'on', '1']
+
+    # Pool de conexiones para SQLite (archivo local)
+    SQLITE_POOL_SIZE: int = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+    SQLITE_MAX_OVERFLOW: int = int(os.getenv("SQLITE_MAX_OVERFLOW", "5"))
+
+    # Perfil SQLite: PRAGMAs aplicados a cada conexión nueva
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negativo = KiB
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Carril de escritura: una única conexión escritora y un pool de lectoras de solo lectura
+    SQLITE_WRITE_LANE: bool = os.getenv("SQLITE_WRITE_LANE", "true").lower() in ['true', 'on', '1']
+    # Espera máxima por la conexión escritora; pasado ese tiempo la petición responde 503
+    SQLITE_WRITER_TIMEOUT: float = float(os.getenv("SQLITE_WRITER_TIMEOUT", "2"))
+
+    # Presupuesto de consultas por petición (se registra en el log si se supera)
+    DB_QUERY_BUDGET: int = int(os.getenv("DB_QUERY_BUDGET", "25"))
+    DB_TIME_BUDGET_MS: float = float(os.getenv("DB_TIME_BUDGET_MS", "500"))
+
+    # Parámetros de nómina (Colombia): salario mínimo y auxilio de transporte mensuales.
+    # 0 = usar la tabla por año de src/business_logic/payroll_rates.py
+    PAYROLL_SMLV: int = int(os.getenv("PAYROLL_SMLV", "0"))
+    PAYROLL_TRANSPORT_ALLOWANCE: int = int(os.getenv("PAYROLL_TRANSPORT_ALLOWANCE", "0"))
+
+    # Generación de PDFs de nómina en procesos aparte (0 = un proceso por núcleo)
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", "0"))
+    NOMINA_PDF_DIR: str = os.getenv("NOMINA_PDF_DIR", "storage/nominas")
+    # Caché de PDFs por contenido: tamaño máximo en disco antes de descartar los menos usados
+    NOMINA_PDF_CACHE_MAX_MB: int = int(os.getenv("NOMINA_PDF_CACHE_MAX_MB", "512"))
+    # Códigos QR de facturas en procesos aparte (0 = un proceso por núcleo) con versión fija
+    QR_WORKERS: int = int(os.getenv("QR_WORKERS", "0"))
+    QR_VERSION: int = int(os.getenv("QR_VERSION", "14"))
+    # Numeración de facturas: números reservados por bloque y vigencia de la reserva (segundos)
+    INVOICE_NUMBER_BLOCK_SIZE: int = int(os.getenv("INVOICE_NUMBER_BLOCK_SIZE", "50"))
+    INVOICE_NUMBER_LEASE_SECONDS: int = int(os.getenv("INVOICE_NUMBER_LEASE_SECONDS", "3600"))
+
+    # Almacén de archivos por contenido (SHA-256): directorio y espera antes de borrar los que no tienen referencias
+    BLOB_STORE_DIR: str = os.getenv("BLOB_STORE_DIR", "storage/blobs")
+    BLOB_STORAGE_BACKEND: str = os.getenv("BLOB_STORAGE_BACKEND", "local")
+    BLOB_GC_GRACE_SECONDS: int = int(os.getenv("BLOB_GC_GRACE_SECONDS", "86400"))
+
+    # Adjuntos de PQRSF: límites por archivo, por petición (suma de todo el formulario) y cantidad
+    PQRSF_MAX_FILE_MB: int = int(os.getenv("PQRSF_MAX_FILE_MB", "10"))
+    PQRSF_MAX_REQUEST_MB: int = int(os.getenv("PQRSF_MAX_REQUEST_MB", "25"))
+    PQRSF_MAX_FILES: int = int(os.getenv("PQRSF_MAX_FILES", "10"))
+    # Tamaño máximo del PDF de factura de un generador
+    GENERATOR_PDF_MAX_MB: int = int(os.getenv("GENERATOR_PDF_MAX_MB", "20"))
     
     # Configuración de autenticación
     SECRET_KEY: str = os.getenv("SECRET_KEY", "secret-key-default")
-    ALGORITHM: str = "HS256"
+    # HS256/HS384/HS512 firman con SECRET_KEY; ES256 o EdDSA firman con JWT_PRIVATE_KEY (PEM, o la ruta
+    # en JWT_PRIVATE_KEY_FILE) y publican la clave pública en /auth/jwks.json (requieren cryptography)
+    ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
+    JWT_PRIVATE_KEY: str = os.getenv("JWT_PRIVATE_KEY", "")
+    JWT_PRIVATE_KEY_FILE: str = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+    JWT_PUBLIC_KEY: str = os.getenv("JWT_PUBLIC_KEY", "")
+    JWT_PUBLIC_KEY_FILE: str = os.getenv("JWT_PUBLIC_KEY_FILE", "")
+    # Tolerancia en segundos para exp/nbf/iat (diferencias de reloj entre servicios)
+    JWT_LEEWAY_SECONDS: int = int(os.getenv("JWT_LEEWAY_SECONDS", "0"))
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(
         default=30,
         alias="ACCESS_TOKEN_EXPIRE_MINUTES"
@@ -22,6 +87,31 @@ class Settings(BaseSettings):
         alias="REFRESH_TOKEN_EXPIRE_MINUTES"
     )
 
+    # Hash de contraseñas (werkzeug). Al cambiar el método, los hashes se actualizan en el siguiente login
+    PASSWORD_HASH_METHOD: str = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000")
+    # Hilos dedicados al hash y máximo de operaciones en espera antes de rechazar con 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    # Caché en memoria de tokens verificados y datos de usuario (entradas y vigencia máxima)
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+    # Lista de revocación de tokens: capacidad inicial y tasa de falsos positivos del filtro de Bloom,
+    # y cada cuántos segundos se leen las revocaciones hechas por otros procesos
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE: float = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+    REVOCATION_SYNC_SECONDS: int = int(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+    # Auditoría de inicios de sesión: se guardan por lotes de N eventos o cada tantos segundos
+    LOGIN_AUDIT_BATCH_SIZE: int = int(os.getenv("LOGIN_AUDIT_BATCH_SIZE", "200"))
+    LOGIN_AUDIT_FLUSH_SECONDS: float = float(os.getenv("LOGIN_AUDIT_FLUSH_SECONDS", "1.0"))
+    LOGIN_AUDIT_MAX_QUEUE: int = int(os.getenv("LOGIN_AUDIT_MAX_QUEUE", "10000"))
+    # Límite de intentos de login por IP y por email en una ventana deslizante, y ráfaga por IP.
+    # LOGIN_RATE_BACKEND: "memory" (por proceso) o "sql" (contadores compartidos en la base de datos)
+    LOGIN_RATE_BACKEND: str = os.getenv("LOGIN_RATE_BACKEND", "memory")
+    LOGIN_RATE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_RATE_WINDOW_SECONDS", "60"))
+    LOGIN_RATE_LIMIT_PER_IP: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30"))
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = int(os.getenv("LOGIN_RATE_LIMIT_PER_EMAIL", "5"))
+    LOGIN_RATE_BURST: int = int(os.getenv("LOGIN_RATE_BURST", "10"))
+
     # Configuración de email
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "")
@@ -36,6 +126,24 @@ class Settings(BaseSettings):
     MAIL_PASSWORD: str = os.getenv('MAIL_PASSWORD', '')
     MAIL_DEFAULT_SENDER: str = os.getenv('MAIL_DEFAULT_SENDER', '')
 
+    # Outbox de correos: transporte ("sendgrid", "smtp" o "local"; vacío = sendgrid si hay API key,
+    # smtp si hay usuario SMTP, local en otro caso), tamaño de lote, intervalo del despachador y reintentos
+    EMAIL_TRANSPORT: str = os.getenv("EMAIL_TRANSPORT", "")
+    EMAIL_BATCH_SIZE: int = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+    EMAIL_DISPATCH_INTERVAL_SECONDS: float = float(os.getenv("EMAIL_DISPATCH_INTERVAL_SECONDS", "2.0"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+    EMAIL_RETRY_BASE_SECONDS: int = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+    EMAIL_RETRY_MAX_SECONDS: int = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+    # Envíos en paralelo por lote (cada uno con su propia conexión persistente al proveedor)
+    EMAIL_CONCURRENCY: int = int(os.getenv("EMAIL_CONCURRENCY", "4"))
+    # Transporte local (desarrollo y pruebas): guarda cada correo como .eml en este directorio
+    EMAIL_LOCAL_DIR: str = os.getenv("EMAIL_LOCAL_DIR", "storage/emails")
+    # Días que se conservan las filas enviadas o fallidas del outbox (0 = no se borran)
+    EMAIL_OUTBOX_RETENTION_DAYS: int = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "30"))
+
+    # Envío masivo de comprobantes de nómina: nóminas leídas y encoladas por tanda
+    PAYROLL_MAIL_CHUNK_SIZE: int = int(os.getenv("PAYROLL_MAIL_CHUNK_SIZE", "200"))
+
     class Config:
         env_file = ".env"
         extra = "ignore"  # Permite ignorar variables extra no definidas
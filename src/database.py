@@ -1,15 +1,301 @@
 ## src\database.py
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.sql.dml import UpdateBase
+
+from starlette.datastructures import MutableHeaders
+
+from src.config import Settings, settings
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto esperan los workers al pedir una conexión."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+class WriteLaneBusy(PoolTimeoutError):
+    """La conexión escritora de SQLite no se liberó dentro de SQLITE_WRITER_TIMEOUT."""
+
+
+class WriterQueuePool(InstrumentedQueuePool):
+    """
+    Pool de la conexión escritora: la espera se corta pronto (SQLITE_WRITER_TIMEOUT) con
+    WriteLaneBusy, que la aplicación responde como 503, en lugar de retener al worker
+    (o al event loop, si la escritura se hace desde una ruta async) durante DB_POOL_TIMEOUT.
+    """
+
+    def connect(self):
+        try:
+            return super().connect()
+        except WriteLaneBusy:
+            raise
+        except PoolTimeoutError as e:
+            raise WriteLaneBusy("La base de datos está ocupada con otra escritura; intente de nuevo.") from e
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url) -> bool:
+    return _is_sqlite(url) and url.database in (None, "", ":memory:")
+
+
+def uses_sqlite_write_lane(config: Settings = settings) -> bool:
+    """Indica si se separan escrituras (una conexión) y lecturas (pool de solo lectura)."""
+    url = make_url(config.DATABASE_URL)
+    return config.SQLITE_WRITE_LANE and _is_sqlite(url) and not _is_sqlite_memory(url)
+
+
+def build_engine_options(config: Settings = settings, role: str = "default") -> Dict[str, Any]:
+    """
+    Calcula los argumentos de create_engine según el tipo de base de datos.
+    :param config: Configuración de la aplicación.
+    :param role: "default", o "writer"/"reader" para el carril de escritura de SQLite.
+    :return: Diccionario con las opciones del engine y del pool.
+    """
+    url = make_url(config.DATABASE_URL)
+    options: Dict[str, Any] = {"echo": config.DB_ECHO}
+
+    if _is_sqlite_memory(url):
+        # Una única conexión compartida: cada conexión nueva sería otra base vacía
+        options.update(
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    elif _is_sqlite(url):
+        # SQLite en archivo: pool pequeño, abrir conexiones es barato pero no gratis.
+        # El escritor usa una sola conexión: SQLite solo admite un escritor a la vez y
+        # así las escrituras esperan en el pool en lugar de chocar con "database is locked".
+        is_writer = role == "writer"
+        options.update(
+            poolclass=WriterQueuePool if is_writer else InstrumentedQueuePool,
+            pool_size=1 if is_writer else config.SQLITE_POOL_SIZE,
+            max_overflow=0 if is_writer else config.SQLITE_MAX_OVERFLOW,
+            pool_timeout=config.SQLITE_WRITER_TIMEOUT if is_writer else config.DB_POOL_TIMEOUT,
+            pool_pre_ping=False,
+            connect_args={"check_same_thread": False},
+        )
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+            pool_use_lifo=config.DB_POOL_USE_LIFO,
+        )
+    return options
+
+
+def _sqlite_pragmas(config: Settings, read_only: bool = False) -> list:
+    pragmas = [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def apply_sqlite_profile(target_engine, config: Settings = settings, read_only: bool = False) -> None:
+    """
+    Registra los PRAGMAs del perfil SQLite (WAL, synchronous, mmap, caché, busy_timeout)
+    para que se apliquen en cada conexión nueva del engine.
+    :param target_engine: Engine de SQLite.
+    :param config: Configuración de la aplicación.
+    :param read_only: Si True, las conexiones quedan en modo query_only.
+    """
+    pragmas = _sqlite_pragmas(config, read_only)
+
+    @event.listens_for(target_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def create_db_engine(config: Settings = settings, role: str = "default"):
+    """
+    Crea el engine de SQLAlchemy a partir de la configuración (DATABASE_URL y DB_*).
+    :param config: Configuración de la aplicación.
+    :param role: "default", o "writer"/"reader" para el carril de escritura de SQLite.
+    :return: Engine configurado con el pool adecuado.
+    """
+    new_engine = create_engine(config.DATABASE_URL, **build_engine_options(config, role))
+    url = make_url(config.DATABASE_URL)
+    if _is_sqlite(url) and not _is_sqlite_memory(url):
+        apply_sqlite_profile(new_engine, config, read_only=role == "reader")
+    return new_engine
+
+
+# Drivers asíncronos equivalentes a cada backend síncrono
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def async_database_url(config: Settings = settings) -> str:
+    """
+    Convierte DATABASE_URL en su variante asíncrona (sqlite+aiosqlite, postgresql+asyncpg, ...).
+    :param config: Configuración de la aplicación.
+    :return: URL con driver asíncrono.
+    :raises ValueError: Si el backend no tiene un driver asíncrono conocido.
+    """
+    url = make_url(config.DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para '{backend}'.")
+    return str(url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"))
+
+
+def create_async_db_engine(config: Settings = settings):
+    """
+    Crea el engine asíncrono con el mismo perfil de pool que el engine síncrono de lectura.
+    Con SQLite en archivo sus conexiones son de solo lectura (query_only): las escrituras
+    pasan por la conexión escritora del engine síncrono, nunca por aquí.
+    :param config: Configuración de la aplicación.
+    :return: AsyncEngine.
+    """
+    options = build_engine_options(config, role="reader")
+    if options.get("poolclass") is InstrumentedQueuePool:
+        options["poolclass"] = AsyncAdaptedQueuePool
+    new_engine = create_async_engine(async_database_url(config), **options)
+    url = make_url(config.DATABASE_URL)
+    if _is_sqlite(url) and not _is_sqlite_memory(url):
+        apply_sqlite_profile(new_engine.sync_engine, config, read_only=True)
+    return new_engine
+
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"  
+@lru_cache(maxsize=1)
+def get_async_engine():
+    """Engine asíncrono compartido; se crea al primer uso para no exigir el driver si no se usa."""
+    return create_async_db_engine(settings)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    return sessionmaker(
+        get_async_engine(),
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+class RoutingSession(Session):
+    """
+    Sesión que envía las lecturas al pool de solo lectura y las escrituras a la
+    conexión escritora. Una vez que la transacción escribe, el resto de la
+    transacción sigue en el escritor para leer sus propios cambios.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("write_lane") or self._flushing or isinstance(clause, UpdateBase):
+            self.info["write_lane"] = True
+            return engine
+        return read_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_write_lane(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("write_lane", None)
+
+
+def get_all_pool_stats() -> Dict[str, Any]:
+    """Estado de todos los pools: el principal (escritor) y, si existe, el de lectura."""
+    stats = {"engine": get_pool_stats(engine)}
+    if read_engine is not engine:
+        stats["read_engine"] = get_pool_stats(read_engine)
+    return stats
+
+
+def get_pool_stats(target_engine=None) -> Dict[str, Any]:
+    """
+    Devuelve el estado del pool de conexiones del engine.
+    :param target_engine: Engine a inspeccionar (por defecto el engine principal).
+    :return: Diccionario con conexiones en uso, overflow y tiempos de espera.
+    """
+    pool = (target_engine or engine).pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update(
+                checkouts=checkouts,
+                timeouts=pool.timeouts,
+                wait_total_ms=round(pool.wait_total * 1000, 3),
+                wait_max_ms=round(pool.wait_max * 1000, 3),
+                wait_avg_ms=round(pool.wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+            )
+    return stats
+
+
+if uses_sqlite_write_lane(settings):
+    engine = create_db_engine(settings, role="writer")
+    read_engine = create_db_engine(settings, role="reader")
+    SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+else:
+    engine = create_db_engine(settings)
+    read_engine = engine
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
@@ -26,13 +312,133 @@ def init_db():
     from src.models.dianVerification import DianVerification  # importa tus modelos aquí
     from src.models.clients import Client  # importa tus modelos aquí
     from src.models.forgot_password import PasswordResetToken  # importa tus modelos aquí
+    from src.models.revoked_token import RevokedToken  # importa tus modelos aquí
+    from src.models.rate_limit import RateLimitCounter  # importa tus modelos aquí
+    from src.models.email_outbox import EmailOutbox  # importa tus modelos aquí
+    from src.models.blob import Blob  # importa tus modelos aquí
+    from src.models.invoice_numbering import InvoiceNumberRange, InvoiceNumberBlock  # importa tus modelos aquí
     from src.models.generator import  Generator # importa tus modelos aquí
 
     Base.metadata.create_all(bind=engine)
 
+class QueryStats:
+    """Consultas, tiempo de base de datos y sesiones abiertas durante una petición."""
+    __slots__ = ("queries", "db_time", "sessions")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sessions = 0
+
+    @property
+    def db_time_ms(self) -> float:
+        return self.db_time * 1000
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    """Estadísticas de la petición en curso (None fuera de una petición HTTP)."""
+    return _query_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started_at = getattr(context, "_query_started_at", None)
+    if stats is not None and started_at is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started_at
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ASGI que mide las consultas de cada petición, las publica en las
+    cabeceras Server-Timing / X-DB-Queries y registra las peticiones que superan
+    el presupuesto configurado (DB_QUERY_BUDGET, DB_TIME_BUDGET_MS).
+    Las respuestas en streaming (StreamingResponse, FileResponse) no llevan las cabeceras:
+    se envían antes de que corra el cuerpo y sus números estarían incompletos; esas
+    peticiones solo se registran al terminar.
+    """
+
+    def __init__(self, app, query_budget: Optional[int] = None, time_budget_ms: Optional[float] = None):
+        self.app = app
+        self.query_budget = settings.DB_QUERY_BUDGET if query_budget is None else query_budget
+        self.time_budget_ms = settings.DB_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        started_at = time.perf_counter()
+        pending_start = None
+
+        async def send_with_timing(message):
+            # El inicio de la respuesta se retiene hasta el primer fragmento del cuerpo: si es el
+            # único (more_body falso) la respuesta está completa y se agregan las cabeceras
+            nonlocal pending_start
+            if message["type"] == "http.response.start":
+                pending_start = message
+                return
+            if pending_start is not None and message["type"] == "http.response.body":
+                start, pending_start = pending_start, None
+                if not message.get("more_body", False):
+                    total_ms = (time.perf_counter() - started_at) * 1000
+                    headers = MutableHeaders(scope=start)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.db_time_ms:.2f};desc="{stats.queries} queries", app;dur={total_ms:.2f}',
+                    )
+                    headers.append("X-DB-Queries", str(stats.queries))
+                await send(start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _query_stats.reset(token)
+            if stats.queries > self.query_budget or stats.db_time_ms > self.time_budget_ms:
+                logger.warning(
+                    "Presupuesto de base de datos superado: %s %s -> %d consultas, %.1f ms en BD, %d sesiones",
+                    scope.get("method"), scope.get("path"), stats.queries, stats.db_time_ms, stats.sessions,
+                )
+
+
 def get_db():
+    """
+    Dependencia única de sesión por petición. Cuenta las sesiones abiertas en la
+    petición y avisa si una ruta cierra la sesión con cambios sin confirmar.
+    """
     db = SessionLocal()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.sessions += 1
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        if db.new or db.dirty or db.deleted:
+            logger.warning("Sesión cerrada con cambios sin confirmar; se descartan.")
+        db.close()
+
+async def get_async_db():
+    """Dependencia con AsyncSession de solo lectura: las consultas no bloquean el event loop."""
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.sessions += 1
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+
@@ -7,16 +7,37 @@ import os
 from datetime import datetime
 import sqlite3
 from typing import Optional
-from src.database import Base, engine
+from src.database import Base, engine, get_all_pool_stats, QueryBudgetMiddleware, WriteLaneBusy
 from pydantic import BaseModel
 from src.models.register import User 
-from src.database import init_db
+from src.database import init_db, dispose_async_engine, SessionLocal
+import asyncio
+from src.services.nomina_pdf_service import pdf_queue
+from src.services.password_service import password_hasher
+from src.services.auth_cache import token_cache, user_cache
+from src.services.token_revocation import revocation_list
+from src.services.login_audit import login_audit
+from src.services.rate_limiter import login_rate_limiter
+from src.services.email_outbox import email_dispatcher
+from src.services.payroll_mail_service import payroll_mailer
+from src.services.blob_store import blob_store
+from src.services.invoice_code_service import invoice_code_issuer
+from src.services.invoice_number_service import invoice_numbers
 from src.routes import (
     pqrsf_routes,
     register_routes,
     login_routes,
     forgot_password_routes,
-    auth_routes
+    auth_routes,
+    export_routes,
+    invoice_numbering_routes,
+    invoice_issue_routes,
+    clients_routes,
+    suppliers_routes,
+    taxes_routes,
+    generator_routes,
+    dianVerification_routes,
+    nomina_routes
 )
 
 Base.metadata.create_all(bind=engine)
@@ -32,8 +53,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries"],
 )
 
+# Conteo de consultas y tiempo de BD por petición (cabeceras Server-Timing)
+app.add_middleware(QueryBudgetMiddleware)
+
+# La conexión escritora de SQLite sigue ocupada: se responde 503 en vez de esperar DB_POOL_TIMEOUT
+@app.exception_handler(WriteLaneBusy)
+async def write_lane_busy_handler(request, exc: WriteLaneBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # Configuración para archivos estáticos
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -44,12 +74,46 @@ async def startup_event():
     init_db()
     print("Base de datos lista.")
 
+    # Lista de revocación de tokens en memoria; después se sincroniza en segundo plano
+    db = SessionLocal()
+    try:
+        revocation_list.load(db)
+    finally:
+        db.close()
+    app.state.revocation_sync = asyncio.create_task(revocation_list.run_sync_loop())
+
+    # Despachador del outbox de correos (envía también lo que quedó pendiente de ejecuciones anteriores)
+    email_dispatcher.start()
+
+    # Borra del almacén por contenido los archivos que ya no tienen referencias
+    blob_store.collect_in_background()
+
+    # Recupera los números de factura de bloques que quedaron sin usar (ej. un proceso que se cayó)
+    invoice_numbers.reconcile_in_background()
+
     # Crear directorio para uploads si no existe
     os.makedirs("uploads", exist_ok=True)
     
     # Inicializar conexión a SQLite para nóminas
     init_nominas_db()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    sync_task = getattr(app.state, "revocation_sync", None)
+    if sync_task is not None:
+        sync_task.cancel()
+    await dispose_async_engine()
+    # Antes que el pool de PDFs: el envío de comprobantes espera sus renders
+    payroll_mailer.shutdown()
+    pdf_queue.shutdown()
+    invoice_code_issuer.shutdown()
+    # Devuelve la parte sin entregar de los bloques de numeración
+    invoice_numbers.shutdown()
+    password_hasher.shutdown()
+    # Guarda los inicios de sesión que sigan en cola
+    login_audit.shutdown()
+    email_dispatcher.shutdown()
+
 def init_nominas_db():
     """Inicializa la base de datos SQLite para nóminas"""
     """
@@ -84,12 +148,71 @@ app.include_router(register_routes.router)
 app.include_router(login_routes.router)
 app.include_router(forgot_password_routes.router)
 app.include_router(auth_routes.router)
+app.include_router(export_routes.router)
+app.include_router(invoice_numbering_routes.router)
+app.include_router(invoice_issue_routes.router)
+app.include_router(clients_routes.router)
+app.include_router(suppliers_routes.router)
+app.include_router(taxes_routes.router)
+app.include_router(generator_routes.router)
+app.include_router(dianVerification_routes.router)
+app.include_router(nomina_routes.router)
 
 # Ruta principal
 @app.get("/")
 def read_root():
     return {"message": "Sistema DIAN - Backend"}
 
+# Estado de los pools de conexiones (conexiones en uso, overflow, tiempos de espera)
+@app.get("/health/db-pool")
+def db_pool_stats():
+    return get_all_pool_stats()
+
+# Estado del pool de hash de contraseñas (operaciones en cola, rechazos, tiempos de espera)
+@app.get("/health/password-hasher")
+def password_hasher_stats():
+    return password_hasher.stats()
+
+# Aciertos y fallos de la caché de tokens verificados y de usuarios
+@app.get("/health/auth-cache")
+def auth_cache_stats():
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+# Cola de auditoría de inicios de sesión (eventos pendientes, lotes guardados, descartes)
+@app.get("/health/login-audit")
+def login_audit_stats():
+    return login_audit.stats()
+
+# Límites de intentos de login (configuración y rechazos)
+@app.get("/health/login-rate-limit")
+def login_rate_limit_stats():
+    return login_rate_limiter.stats()
+
+# Outbox de correos (pendientes, enviados, fallidos), transporte en uso y envíos de comprobantes
+@app.get("/health/email-outbox")
+def email_outbox_stats():
+    return {**email_dispatcher.stats(), "payroll_mail": payroll_mailer.stats()}
+
+# Almacén de archivos por contenido (blobs, referencias y bytes ahorrados por deduplicación)
+@app.get("/health/blobs")
+def blob_store_stats():
+    return blob_store.stats()
+
+# Generación de CUFE y códigos QR por lotes (workers, versión del QR, tiempo por factura)
+@app.get("/health/invoice-codes")
+def invoice_code_stats():
+    return invoice_code_issuer.stats()
+
+# Asignador de números de factura (bloques en memoria y números entregados)
+@app.get("/health/invoice-numbers")
+def invoice_number_stats():
+    return invoice_numbers.stats()
+
+# Tamaño de la lista de revocación y del filtro de Bloom
+@app.get("/health/revocation")
+def revocation_stats():
+    return revocation_list.stats()
+
 # Ruta para descargar guía
 PDF_PATH = os.path.join(
     os.path.dirname(__file__), "public", "assets", "Guía Completa del Sistema de Contabilidad DIAN-Colombia.pdf")
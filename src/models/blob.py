@@ -0,0 +1,24 @@
+# src/models/blob.py
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index
+from ..database import Base
+
+
+class Blob(Base):
+    """
+    Archivo guardado en el almacén por contenido (src/services/blob_store.py), identificado por
+    su SHA-256. Las tablas que usan archivos guardan solo el digest; refcount cuenta cuántas
+    referencias hay y, cuando llega a 0, el recolector borra el archivo tras un periodo de gracia.
+    """
+    __tablename__ = "blobs"
+
+    digest = Column(String(64), primary_key=True)  # SHA-256 en hexadecimal
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=True)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # último cambio de refcount
+
+    __table_args__ = (
+        Index("ix_blobs_refcount_updated_at", "refcount", "updated_at"),
+    )
@@ -58,13 +58,13 @@ class ClientJsonSchema(Schema):
     created_at = fields.DateTime()
 
 # Función para crear un nuevo cliente
-def create_client(id_user, name, person_type, tax_id, document_type, identification_number, business_reason, email, contact_number, address, city, regime_type, status='active'):
+def create_client(db, id_user, name, person_type, tax_id, document_type, identification_number, business_reason, email, contact_number, address, city, regime_type, status='active'):
     """
     Crea un nuevo cliente en la tabla clients.
     Retorna el objeto Client si el registro es exitoso.
     """
     # Verifica si el cliente ya existe (por ejemplo, por NIT o correo electrónico)
-    existing_client = Client.query.filter((Client.tax_id == tax_id) | (Client.email == email)).first()
+    existing_client = db.query(Client).filter((Client.tax_id == tax_id) | (Client.email == email)).first()
     if existing_client:
         raise ValueError("El cliente ya está registrado.")
 
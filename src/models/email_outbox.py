@@ -0,0 +1,39 @@
+# src/models/email_outbox.py
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index
+from ..database import Base
+
+
+class EmailOutbox(Base):
+    """
+    Cola persistente de correos salientes. Las rutas solo insertan filas; el despachador de
+    src/services/email_outbox.py las envía por lotes y reintenta con espera exponencial.
+    Estados: pending -> sending -> sent, o failed al agotar los intentos.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(50), nullable=True)  # ej. "password_reset", "payroll_slip"
+    job_id = Column(String(36), nullable=True, index=True)  # envío masivo al que pertenece
+    reference_id = Column(String(36), nullable=True, index=True)  # ej. id de la nómina del comprobante
+    to_email = Column(String(255), nullable=False)
+    to_name = Column(String(255), nullable=True)
+    subject = Column(String(255), nullable=True)
+    body_text = Column(Text, nullable=True)
+    body_html = Column(Text, nullable=True)
+    template_id = Column(String(100), nullable=True)  # plantilla dinámica de SendGrid
+    template_data = Column(JSON(none_as_null=True), nullable=True)  # None se guarda como NULL de SQL
+    attachments = Column(JSON, nullable=True)  # [{"path", "filename", "content_type"}]
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Próximo intento; mientras se envía marca el fin del lease (si el proceso muere, se reintenta)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String(36), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
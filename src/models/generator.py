@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, LargeBinary
+from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, BigInteger
 from .model import Model, Base
 from marshmallow import Schema, fields
 
@@ -12,15 +12,18 @@ class Generator(Model, Base):
     electronic_invoice = Column(String(5))
     cufe = Column(String(255))
     qr_code = Column(String(255))
-    invoice_pdf = Column(LargeBinary)
+    invoice_pdf_sha256 = Column(String(64), nullable=True)  # Clave del PDF en el almacén (blob_store)
+    invoice_pdf_size = Column(BigInteger, nullable=True)  # Tamaño en bytes del PDF
 
-    def __init__(self, id_payment_transfer, electronic_invoice, cufe, qr_code, invoice_pdf):
+    def __init__(self, id_payment_transfer, electronic_invoice, cufe, qr_code, invoice_pdf_sha256=None,
+                 invoice_pdf_size=None):
         Model.__init__(self)
         self.id_payment_transfer = id_payment_transfer
         self.electronic_invoice = electronic_invoice
         self.cufe = cufe
         self.qr_code = qr_code
-        self.invoice_pdf = invoice_pdf
+        self.invoice_pdf_sha256 = invoice_pdf_sha256
+        self.invoice_pdf_size = invoice_pdf_size
 
 class GeneratorJsonSchema(Schema):
     id = fields.Str()
@@ -28,4 +31,5 @@ class GeneratorJsonSchema(Schema):
     electronic_invoice = fields.Str()
     cufe = fields.Str()
     qr_code = fields.Str()
-    invoice_pdf = fields.Raw()
\ No newline at end of file
+    invoice_pdf_sha256 = fields.Str()
+    invoice_pdf_size = fields.Int()
\ No newline at end of file
@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime, timezone
 from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Numeric, Integer, Text
 from .model import Model, Base
+from .loading import heavy_column
 from marshmallow import Schema, fields, validate
 
 class Invoice(Model, Base):
@@ -14,7 +15,7 @@ class Invoice(Model, Base):
     invoice_number = Column(String(50), unique=True, nullable=False)
     invoice_type = Column(String(20), nullable=False)  # Factura electrónica, nómina, etc.
     cufe = Column(String(100), unique=True)  # Código Único de Factura Electrónica
-    qr_code = Column(Text)  # Datos del QR
+    qr_code = heavy_column(Text)  # Datos del QR (se carga al accederlo)
     
     # Fechas
     issue_date = Column(DateTime, nullable=False, default=datetime.now(timezone.utc))
@@ -39,10 +40,10 @@ class Invoice(Model, Base):
     status = Column(String(20), default='draft')  # draft, sent, paid, cancelled
     
     # Documentos adjuntos
-    attached_documents = Column(Text)  # JSON con rutas de documentos
+    attached_documents = heavy_column(Text)  # JSON con rutas de documentos
     
     # Métodos de pago
-    payment_methods = Column(Text)  # JSON con métodos de pago
+    payment_methods = heavy_column(Text)  # JSON con métodos de pago
     
     def __init__(self, **kwargs):
         Model.__init__(self)
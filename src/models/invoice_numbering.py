@@ -0,0 +1,55 @@
+# src/models/invoice_numbering.py
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey, Index, UniqueConstraint
+from ..database import Base
+
+
+class InvoiceNumberRange(Base):
+    """
+    Rango de numeración autorizado por una resolución DIAN para un emisor (NIT) y prefijo.
+    high_water es el último número entregado en un bloque: el siguiente bloque empieza en
+    high_water + 1 (los números sin usar de bloques anteriores se reutilizan, ver InvoiceNumberBlock).
+    """
+    __tablename__ = "invoice_number_ranges"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    issuer_nit = Column(String(20), nullable=False)
+    resolution_number = Column(String(50), nullable=False)
+    prefix = Column(String(10), nullable=False, default="")
+    range_start = Column(BigInteger, nullable=False)
+    range_end = Column(BigInteger, nullable=False)
+    high_water = Column(BigInteger, nullable=False)  # range_start - 1 mientras no se entregue ninguno
+    valid_from = Column(DateTime, nullable=True)
+    valid_to = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("issuer_nit", "resolution_number", "prefix", name="uq_invoice_number_ranges_resolution"),
+    )
+
+
+class InvoiceNumberBlock(Base):
+    """
+    Bloque de números consecutivos [first_number, last_number] de un rango.
+    status: leased (lo usa un proceso, owner), closed (ya no se usa; last_number es el último
+    número entregado) y free (números nunca entregados, disponibles para el próximo bloque).
+    issued_through es el último número entregado de un bloque leased (first_number - 1 si
+    todavía no se entregó ninguno): se guarda en cada entrega, antes de devolver los números.
+    """
+    __tablename__ = "invoice_number_blocks"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    range_id = Column(String(36), ForeignKey("invoice_number_ranges.id"), nullable=False)
+    first_number = Column(BigInteger, nullable=False)
+    last_number = Column(BigInteger, nullable=False)
+    issued_through = Column(BigInteger, nullable=True)
+    status = Column(String(20), nullable=False, default="leased")
+    owner = Column(String(64), nullable=True)
+    leased_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_invoice_number_blocks_range_status", "range_id", "status", "first_number"),
+    )
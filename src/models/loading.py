@@ -0,0 +1,27 @@
+# src/models/loading.py
+from typing import List
+
+from sqlalchemy import Column
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import deferred, undefer_group
+
+# Grupo de las columnas pesadas (JSON, texto largo) de todos los modelos
+HEAVY_GROUP = "heavy"
+
+
+def heavy_column(*args, **kwargs):
+    """
+    Columna pesada: no va en el SELECT de la fila, se carga al accederla por primera vez
+    (una consulta por objeto). Quien la vaya a leer en muchas filas usa with_heavy_columns().
+    """
+    return deferred(Column(*args, **kwargs), group=HEAVY_GROUP)
+
+
+def with_heavy_columns():
+    """Opción de consulta que carga las columnas pesadas junto con la fila: query.options(with_heavy_columns())."""
+    return undefer_group(HEAVY_GROUP)
+
+
+def light_fields(model) -> List[str]:
+    """Nombres de las columnas que se cargan con la fila (sin las pesadas), ej. para los listados."""
+    return [prop.key for prop in sa_inspect(model).column_attrs if not prop.deferred]
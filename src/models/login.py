@@ -45,14 +45,7 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
     
 # Función para registrar un nuevo inicio de sesión
+# (se encola en la auditoría de logins y se guarda por lotes en segundo plano)
 def register_login(db: Session, user_id: str, email: str, name: str = None, identification: str = None):
-    new_login = Login(
-        id_user=user_id,
-        email=email,
-        name=name,
-        identification=identification,
-        login_date=datetime.now(timezone.utc)
-    )
-    db.add(new_login)
-    db.commit()
-    return new_login
\ No newline at end of file
+    from src.services.login_audit import login_audit
+    return login_audit.record(user_id, email, datetime.now(timezone.utc))
\ No newline at end of file
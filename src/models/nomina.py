@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime, timezone
 from sqlalchemy import Column, String, Enum, DateTime, ForeignKey, Float, Numeric, Boolean, JSON
 from .model import Model, Base
+from .loading import heavy_column
 from marshmallow import Schema, fields
 from sqlalchemy.dialects.postgresql import ARRAY
 from enum import Enum as PyEnum
@@ -54,11 +55,17 @@ class Nomina(Model, Base):
     total_deducciones = Column(Numeric(12, 2), default=0.0) 
     
     # Otros campos
-    other_concepts = Column(JSON)  # Conceptos adicionales
+    other_concepts = heavy_column(JSON)  # Conceptos adicionales (se carga al accederlo)
     total_neto = Column(Numeric(12, 2), nullable=False)  # total_net renombrado
     is_paid = Column(Boolean, default=False)
     payment_date = Column(DateTime, nullable=True)
-    pdf_url = Column(String, nullable=True)
+    pdf_url = Column(String, nullable=True)  # ruta de descarga en la API
+    pdf_sha256 = Column(String(64), nullable=True)  # PDF en el almacén por contenido (blob_store)
+
+    def __init__(self, **kwargs):
+        Model.__init__(self)
+        for key, value in kwargs.items():
+            setattr(self, key, value)
 
 def create_nomina(id_user, contract_type, period, employee_name, employee_id, email, 
                  salario_base, days_worked, health_contribution, pension_contribution,
@@ -4,6 +4,7 @@ import os
 import shutil
 from sqlalchemy import Column, Integer, String, DateTime, JSON
 from .model import Model, Base
+from .loading import heavy_column
 from datetime import datetime
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import List
@@ -16,7 +17,7 @@ class PQRSF(Base):
     numero_radicado = Column(String(36), unique=True, index=True)
     tipo = Column(String) 
     mensaje = Column(String)
-    archivos = Column(JSON)  # Lista de nombres de archivos
+    archivos = heavy_column(JSON)  # [{"sha256", "nombre", "content_type", "size"}] (almacén por contenido)
     fecha = Column(DateTime, default=datetime.utcnow)
     estado = Column(String, default="pendiente")
     respuesta = Column(String, nullable=True) 
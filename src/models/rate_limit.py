@@ -0,0 +1,15 @@
+# src/models/rate_limit.py
+from sqlalchemy import Column, String, Integer
+from ..database import Base
+
+
+class RateLimitCounter(Base):
+    """
+    Contador de intentos por clave (ej. "ip:1.2.3.4", "email:a@b.co") y ventana fija de tiempo.
+    Lo usa el backend SQL del limitador de login para compartir los contadores entre procesos.
+    """
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    window_start = Column(Integer, primary_key=True, index=True)  # segundos UNIX, múltiplo de la ventana
+    count = Column(Integer, nullable=False, default=0)
@@ -3,12 +3,12 @@ import uuid
 from datetime import datetime, timezone
 from sqlalchemy import Column, String, Enum, DateTime
 from sqlalchemy.orm import Session, relationship 
-from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv  
 import os
 from typing import Optional, Dict, Any
 from src.database import Base
 from src.models.base import Model
+from src.services.password_service import check_password, hash_password
 
 
 load_dotenv()
@@ -46,11 +46,11 @@ class User(Base):
 
     def set_password(self, password: str) -> None:
         """Encripta y establece la contraseña del usuario."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def verify_password(self, password: str) -> bool:
         """Verifica si la contraseña proporcionada coincide con la almacenada."""
-        return check_password_hash(self.password_hash, password)
+        return check_password(self.password_hash, password)
 
     @classmethod
     def get_by_email(cls, session: Session, email: str) -> Optional['User']:
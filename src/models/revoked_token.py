@@ -0,0 +1,26 @@
+# src/models/revoked_token.py
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Index
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """
+    Lista de revocación de JWT. Cada fila revoca un token concreto (jti) o, si jti es nulo,
+    todos los tokens del sujeto y tipo emitidos antes de revoked_at (ej. al cambiar la contraseña).
+    Las filas se pueden borrar cuando vence expires_at: para entonces el token ya expiró.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    jti = Column(String(64), unique=True, nullable=True)
+    subject = Column(String(255), nullable=False)
+    token_type = Column(String(50), nullable=False, default="access")
+    reason = Column(String(50), nullable=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_revoked_tokens_subject_type", "subject", "token_type"),
+    )
@@ -60,13 +60,13 @@ class SupplierJsonSchema(Schema):
     created_at = fields.DateTime()
 
 # Función para crear un nuevo proveedor
-def create_supplier(id_user, name, person_type, tax_id, document_type, identification_number, business_reason, email, contact_number, address, city, regime_type, status='active'):
+def create_supplier(db, id_user, name, person_type, tax_id, document_type, identification_number, business_reason, email, contact_number, address, city, regime_type, status='active'):
     """
     Crea un nuevo proveedor en la tabla suppliers.
     Retorna el objeto Supplier si el registro es exitoso.
     """
     # Verifica si el proveedor ya existe (por ejemplo, por NIT o correo electrónico)
-    existing_supplier = Supplier.query.filter((Supplier.tax_id == tax_id) | (Supplier.email == email)).first()
+    existing_supplier = db.query(Supplier).filter((Supplier.tax_id == tax_id) | (Supplier.email == email)).first()
     if existing_supplier:
         raise ValueError("El proveedor ya está registrado.")
 
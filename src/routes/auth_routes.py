@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from ..schemas.auth_schemas import Token
-from src.services.auth_service import authenticate_user, create_access_token, get_password_hash
-from ..utils.security import create_access_token
+from src.services.auth_service import authenticate_user_async, get_password_hash
+from src.services.jwt_service import create_access_token, jwt_core
+from src.services.password_service import PasswordHasherBusy
+from src.services.auth_cache import cache_claims, get_cached_claims, get_user_summary
+from src.services.token_revocation import revocation_list
+from src.services.login_audit import login_audit
+from src.services.rate_limiter import RateLimitExceeded, login_rate_limiter
 from datetime import timedelta, datetime
 from ..config import settings
 from src.schemas.auth_schemas import LoginRequest, Token
@@ -19,10 +25,29 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
     login_data: LoginRequest,
+    request: Request,
     db: Session = Depends (get_db)
     ):
 
-    user = authenticate_user(db, login_data.email, login_data.password)
+    # Los intentos por encima del límite se rechazan antes de verificar la contraseña
+    # (en el threadpool: con LOGIN_RATE_BACKEND=sql los contadores se escriben en la base de datos)
+    try:
+        await run_in_threadpool(login_rate_limiter.check, request.client.host if request.client else None, login_data.email)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    try:
+        user = await authenticate_user_async(db, login_data.email, login_data.password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     
     if not user:
         raise HTTPException(
@@ -32,6 +57,10 @@ async def login_for_access_token(
         )
     
     
+    await run_in_threadpool(login_rate_limiter.login_succeeded, user.email)
+    # Auditoría del login: se encola y se guarda por lotes en segundo plano
+    login_audit.record(str(user.id), user.email)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email},
@@ -62,30 +91,84 @@ async def verify_token(token: str = Depends(get_token_from_header)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+    # Token ya verificado: se evita decodificar y verificar la firma otra vez
+    payload = get_cached_claims(token)
+    if payload is None:
+        try:
+            payload = jwt_core.verify(token)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token expired"
+            )
+        except jwt.PyJWTError:
+            raise credentials_exception
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        return payload
-    except jwt.ExpiredSignatureError:
+        cache_claims(token, payload)
+    # La revocación se consulta en memoria en cada uso, también con claims en caché
+    if revocation_list.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+def get_current_user(current_user: dict = Depends(verify_token), db: Session = Depends(get_db)) -> dict:
+    """
+    Resumen (caché) del usuario del token.
+    :raises HTTPException: 401 si el usuario ya no existe.
+    """
+    user = get_user_summary(db, current_user.get("sub"))
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token expired"
+            detail="Usuario no encontrado",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    except jwt.JWTError:
-        raise credentials_exception
+    return user
+
+def get_current_user_id(user: dict = Depends(get_current_user)) -> str:
+    """Id del usuario (contador) autenticado: dueño de sus clientes, proveedores, nóminas, etc."""
+    return user["id"]
+
+def require_permissions(*allowed: str):
+    """
+    Dependencia que exige uno de los permisos dados (columna users.permissions).
+    :raises HTTPException: 403 si el usuario no lo tiene.
+    """
+    def dependency(user: dict = Depends(get_current_user)) -> dict:
+        if user.get("permissions") not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tiene permisos para esta operación",
+            )
+        return user
+    return dependency
+
+@router.post("/logout")
+def logout(
+    payload: dict = Depends(verify_token),
+    token: str = Depends(get_token_from_header),
+    db: Session = Depends(get_db),
+):
+    """Revoca el token de la petición hasta su expiración (el commit corre en el threadpool)."""
+    revocation_list.revoke_token(db, payload, reason="logout", token=token)
+    return {"message": "Sesión cerrada correctamente"}
+
+# Claves públicas para que otros servicios verifiquen los tokens sin consultar este (ES256/EdDSA)
+@router.get("/jwks.json")
+async def jwks():
+    return jwt_core.jwks()
 
 @router.get("/verify")
-async def verify_token_endpoint(
+def verify_token_endpoint(
     current_user: dict = Depends(verify_token), 
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == current_user.get("sub")).first()
+    user = get_user_summary(db, current_user.get("sub"))
     
     if not user:
         raise HTTPException(
@@ -96,7 +179,7 @@ async def verify_token_endpoint(
     return {
         "is_valid": True,
         "user_info": {
-            "email": user.email,
-            "name": f"{user.first_name} {user.last_name}",
+            "email": user["email"],
+            "name": user["name"],
         }
     }
\ No newline at end of file
@@ -3,27 +3,27 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from ..models.clients import Client, create_client
 from ..schemas.clients_schema import ClientRequest, ClientResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, get_db
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, owner_filter
+from .auth_routes import get_current_user_id
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(ClientResponse.model_fields)
 
 # Endpoint para crear un nuevo cliente
 @router.post("/clients", response_model=ClientResponse)
-async def create_new_client(client: ClientRequest, db: SessionLocal = Depends(get_db)):
+def create_new_client(client: ClientRequest, user_id: str = Depends(get_current_user_id),
+                      db: SessionLocal = Depends(get_db)):
     try:
         # Crear un nuevo cliente
         new_client = create_client(
-            id_user=client.id_user,
+            db,
+            id_user=user_id,
             name=client.name,
             person_type=client.person_type.value,
             tax_id=client.tax_id,
@@ -47,36 +47,40 @@ async def create_new_client(client: ClientRequest, db: SessionLocal = Depends(ge
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todos los clientes
-@router.get("/clients", response_model=List[ClientResponse])
-async def get_all_clients(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todos los clientes (paginado por cursor, con proyección de campos)
+@router.get("/clients", response_model=PageResponse)
+def get_all_clients(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id),
+                    db: SessionLocal = Depends(get_db)):
     try:
-        clients = db.query(Client).all()
-        return clients
+        return paginate_or_400(db, Client, page, LIST_FIELDS, filters=[owner_filter(Client, user_id)])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para obtener un cliente por ID
 @router.get("/clients/{client_id}", response_model=ClientResponse)
-async def get_client_by_id(client_id: str, db: SessionLocal = Depends(get_db)):
+def get_client_by_id(client_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        client = db.query(Client).filter(Client.id == client_id).first()
+        client = get_owned(db, Client, client_id, user_id)
         if not client:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
         return client
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para actualizar un cliente
 @router.put("/clients/{client_id}", response_model=ClientResponse)
-async def update_client(client_id: str, client: ClientRequest, db: SessionLocal = Depends(get_db)):
+def update_client(client_id: str, client: ClientRequest, user_id: str = Depends(get_current_user_id),
+                  db: SessionLocal = Depends(get_db)):
     try:
-        existing_client = db.query(Client).filter(Client.id == client_id).first()
+        existing_client = get_owned(db, Client, client_id, user_id)
         if not existing_client:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
         # Actualizar los campos del cliente
-        existing_client.id_user = client.id_user
         existing_client.name = client.name
         existing_client.person_type = client.person_type.value
         existing_client.tax_id = client.tax_id
@@ -93,21 +97,25 @@ async def update_client(client_id: str, client: ClientRequest, db: SessionLocal
         db.commit()
         db.refresh(existing_client)
         return existing_client
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para eliminar un cliente
 @router.delete("/clients/{client_id}")
-async def delete_client(client_id: str, db: SessionLocal = Depends(get_db)):
+def delete_client(client_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        client = db.query(Client).filter(Client.id == client_id).first()
+        client = get_owned(db, Client, client_id, user_id)
         if not client:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
         db.delete(client)
         db.commit()
         return {"message": "Cliente eliminado correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
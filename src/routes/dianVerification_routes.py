@@ -3,22 +3,26 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from ..models.dianVerification import DianVerification
 from ..schemas.dianVerification_schema import DianVerificationRequest, DianVerificationResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, is_owned, owner_filter
+from ..models.generator import Generator
+from .auth_routes import get_current_user_id
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(DianVerificationResponse.model_fields)
 
 # Endpoint para crear una nueva verificación DIAN
 @router.post("/dian-verifications", response_model=DianVerificationResponse)
-async def create_dian_verification(verification: DianVerificationRequest, db: SessionLocal = Depends(get_db)):
+def create_dian_verification(verification: DianVerificationRequest, user_id: str = Depends(get_current_user_id),
+                             db: SessionLocal = Depends(get_db)):
     try:
+        # Solo se asocia a un generador del usuario
+        if not is_owned(db, Generator, verification.id_generator, user_id):
+            raise HTTPException(status_code=404, detail="Generador no encontrado")
         # Crear una nueva verificación DIAN
         new_verification = DianVerification(
             id_generator=verification.id_generator,
@@ -29,37 +33,47 @@ async def create_dian_verification(verification: DianVerificationRequest, db: Se
         db.commit()
         db.refresh(new_verification)
         return new_verification
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todas las verificaciones DIAN
-@router.get("/dian-verifications", response_model=List[DianVerificationResponse])
-async def get_all_dian_verifications(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todas las verificaciones DIAN (paginado por cursor, con proyección de campos)
+@router.get("/dian-verifications", response_model=PageResponse)
+def get_all_dian_verifications(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id),
+                               db: SessionLocal = Depends(get_db)):
     try:
-        verifications = db.query(DianVerification).all()
-        return verifications
+        return paginate_or_400(db, DianVerification, page, LIST_FIELDS, filters=[owner_filter(DianVerification, user_id)])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para obtener una verificación DIAN por ID
 @router.get("/dian-verifications/{verification_id}", response_model=DianVerificationResponse)
-async def get_dian_verification_by_id(verification_id: str, db: SessionLocal = Depends(get_db)):
+def get_dian_verification_by_id(verification_id: str, user_id: str = Depends(get_current_user_id),
+                                db: SessionLocal = Depends(get_db)):
     try:
-        verification = db.query(DianVerification).filter(DianVerification.id == verification_id).first()
+        verification = get_owned(db, DianVerification, verification_id, user_id)
         if not verification:
             raise HTTPException(status_code=404, detail="Verificación DIAN no encontrada")
         return verification
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para actualizar una verificación DIAN
 @router.put("/dian-verifications/{verification_id}", response_model=DianVerificationResponse)
-async def update_dian_verification(verification_id: str, verification: DianVerificationRequest, db: SessionLocal = Depends(get_db)):
+def update_dian_verification(verification_id: str, verification: DianVerificationRequest,
+                             user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        existing_verification = db.query(DianVerification).filter(DianVerification.id == verification_id).first()
+        existing_verification = get_owned(db, DianVerification, verification_id, user_id)
         if not existing_verification:
             raise HTTPException(status_code=404, detail="Verificación DIAN no encontrada")
+        if not is_owned(db, Generator, verification.id_generator, user_id):
+            raise HTTPException(status_code=404, detail="Generador no encontrado")
 
         # Actualizar los campos de la verificación DIAN
         existing_verification.id_generator = verification.id_generator
@@ -69,21 +83,26 @@ async def update_dian_verification(verification_id: str, verification: DianVerif
         db.commit()
         db.refresh(existing_verification)
         return existing_verification
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para eliminar una verificación DIAN
 @router.delete("/dian-verifications/{verification_id}")
-async def delete_dian_verification(verification_id: str, db: SessionLocal = Depends(get_db)):
+def delete_dian_verification(verification_id: str, user_id: str = Depends(get_current_user_id),
+                             db: SessionLocal = Depends(get_db)):
     try:
-        verification = db.query(DianVerification).filter(DianVerification.id == verification_id).first()
+        verification = get_owned(db, DianVerification, verification_id, user_id)
         if not verification:
             raise HTTPException(status_code=404, detail="Verificación DIAN no encontrada")
 
         db.delete(verification)
         db.commit()
         return {"message": "Verificación DIAN eliminada correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
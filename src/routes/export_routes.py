@@ -0,0 +1,51 @@
+# src/routes/export_routes.py
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..models.clients import Client
+from ..models.suppliers import Supplier
+from ..models.nomina import Nomina
+from ..models.invoice import Invoice
+from ..utils.export import EXPORT_MEDIA_TYPES, stream_export
+from ..utils.ownership import owner_filter
+from .auth_routes import get_current_user_id
+
+router = APIRouter()
+
+# Colecciones exportables
+EXPORT_MODELS = {
+    "clients": Client,
+    "suppliers": Supplier,
+    "nominas": Nomina,
+    "invoices": Invoice,
+}
+
+# Exportación completa de una colección (conciliación con el ERP); solo los registros del usuario autenticado
+@router.get("/export/{resource}")
+def export_collection(
+    resource: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato de salida: ndjson o csv"),
+    fields: Optional[str] = Query(None, description="Columnas a exportar separadas por coma (por defecto todas)"),
+    user_id: str = Depends(get_current_user_id),
+):
+    model = EXPORT_MODELS.get(resource)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Colección no exportable: {resource}")
+
+    table_columns = [column.key for column in model.__table__.columns]
+    columns = [name.strip() for name in fields.split(",") if name.strip()] if fields else table_columns
+    unknown = [name for name in columns if name not in table_columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no permitidos: {', '.join(unknown)}")
+
+    filters = [owner_filter(model, user_id)]
+
+    filename = f"{resource}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(model, columns, format, filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 router = APIRouter()
 
 @router.post("/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest,db: Session = Depends(get_db)
+def forgot_password(request: ForgotPasswordRequest,db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.email == request.email).first()
     if not user:
@@ -19,20 +19,17 @@ async def forgot_password(request: ForgotPasswordRequest,db: Session = Depends(g
     
     reset_token = create_reset_token(user.email)
     
+    # El correo se encola en el outbox y se envía en segundo plano: no se espera al proveedor
     try:
-        await send_password_reset_email(
+        send_password_reset_email(
+            db,
             email=user.email,
             token=reset_token,
-            user_name=user.name
+            user_name=f"{user.first_name} {user.last_name}"
         )
         return {"message": "Correo enviado exitosamente"}
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al enviar el correo: {str(e)}"
-        )
-
-    except Exception as e:  # Añadido bloque except
+        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error al enviar el correo: {str(e)}"
@@ -1,119 +1,222 @@
 # src/routes/generator_routes.py
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from ..models.generator import Generator
+from ..models.paymentsTransfers import PaymentsTransfers
 from ..schemas.generator_schema import GeneratorRequest, GeneratorResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, WriteLaneBusy, get_db
+from ..config import settings
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, is_owned, owner_filter
+from ..utils.file_response import range_response
+from ..services.blob_store import blob_store
+from ..services.upload_service import StreamingUpload, UploadRejected
+from .auth_routes import get_current_user_id
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+# Del PDF solo se guardan la clave y el tamaño: se descarga desde /generators/{id}/pdf
+LIST_FIELDS = list(GeneratorResponse.model_fields)
+
+# Esquema del cuerpo para la documentación (el PDF se lee en streaming, sin File)
+PDF_FORM_SCHEMA = {
+    "requestBody": {
+        "required": False,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"invoice_pdf": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+async def receive_invoice_pdf(request: Request) -> Optional[StreamingUpload]:
+    """
+    Recibe el PDF del cuerpo multipart escribiéndolo a disco mientras llega (sin cargarlo
+    en memoria), con límite de tamaño y validación de la firma PDF.
+    :return: La carga recibida, o None si la petición no trae archivo.
+    :raises HTTPException: Si el archivo se rechaza (413, 415, 400).
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return None
+    upload = StreamingUpload(
+        blob_store,
+        max_file_bytes=settings.GENERATOR_PDF_MAX_MB * 1024 * 1024,
+        max_request_bytes=settings.GENERATOR_PDF_MAX_MB * 1024 * 1024 + 64 * 1024,
+        max_files=1,
+        allowed_extensions=[".pdf"],
+    )
     try:
-        yield db
-    finally:
-        db.close()
+        await upload.receive(request)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if not upload.files:
+        return None
+    return upload
 
 # Endpoint para crear un nuevo generador
-@router.post("/generators", response_model=GeneratorResponse)
+@router.post("/generators", response_model=GeneratorResponse, openapi_extra=PDF_FORM_SCHEMA)
 async def create_generator(
+    request: Request,
     id_payment_transfer: str,
     electronic_invoice: str,
     cufe: str,
     qr_code: str,
-    invoice_pdf: Optional[UploadFile] = File(None),
+    user_id: str = Depends(get_current_user_id),
     db: SessionLocal = Depends(get_db)
 ):
+    upload = await receive_invoice_pdf(request)
+    fields = dict(
+        id_payment_transfer=id_payment_transfer,
+        electronic_invoice=electronic_invoice,
+        cufe=cufe,
+        qr_code=qr_code,
+    )
     try:
-        # Leer el archivo PDF si se proporciona
-        pdf_content = None
-        if invoice_pdf:
-            pdf_content = await invoice_pdf.read()
-
-        # Crear un nuevo generador
-        new_generator = Generator(
-            id_payment_transfer=id_payment_transfer,
-            electronic_invoice=electronic_invoice,
-            cufe=cufe,
-            qr_code=qr_code,
-            invoice_pdf=pdf_content
-        )
-        db.add(new_generator)
-        db.commit()
-        db.refresh(new_generator)
-        return new_generator
+        return await run_in_threadpool(save_generator, db, upload, fields, user_id)
+    except (HTTPException, WriteLaneBusy):
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todos los generadores
-@router.get("/generators", response_model=List[GeneratorResponse])
-async def get_all_generators(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todos los generadores (paginado por cursor, con proyección de campos)
+@router.get("/generators", response_model=PageResponse)
+def get_all_generators(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id),
+                       db: SessionLocal = Depends(get_db)):
     try:
-        generators = db.query(Generator).all()
-        return generators
+        return paginate_or_400(db, Generator, page, LIST_FIELDS, filters=[owner_filter(Generator, user_id)])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para obtener un generador por ID
 @router.get("/generators/{generator_id}", response_model=GeneratorResponse)
-async def get_generator_by_id(generator_id: str, db: SessionLocal = Depends(get_db)):
+def get_generator_by_id(generator_id: str, user_id: str = Depends(get_current_user_id),
+                        db: SessionLocal = Depends(get_db)):
     try:
-        generator = db.query(Generator).filter(Generator.id == generator_id).first()
+        generator = get_owned(db, Generator, generator_id, user_id)
         if not generator:
             raise HTTPException(status_code=404, detail="Generador no encontrado")
         return generator
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para actualizar un generador
-@router.put("/generators/{generator_id}", response_model=GeneratorResponse)
+@router.put("/generators/{generator_id}", response_model=GeneratorResponse, openapi_extra=PDF_FORM_SCHEMA)
 async def update_generator(
+    request: Request,
     generator_id: str,
     id_payment_transfer: str,
     electronic_invoice: str,
     cufe: str,
     qr_code: str,
-    invoice_pdf: Optional[UploadFile] = File(None),
+    user_id: str = Depends(get_current_user_id),
     db: SessionLocal = Depends(get_db)
 ):
+    upload = await receive_invoice_pdf(request)
+    fields = dict(
+        id_payment_transfer=id_payment_transfer,
+        electronic_invoice=electronic_invoice,
+        cufe=cufe,
+        qr_code=qr_code,
+    )
     try:
-        existing_generator = db.query(Generator).filter(Generator.id == generator_id).first()
-        if not existing_generator:
-            raise HTTPException(status_code=404, detail="Generador no encontrado")
+        return await run_in_threadpool(save_generator, db, upload, fields, user_id, generator_id)
+    except (HTTPException, WriteLaneBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Leer el archivo PDF si se proporciona
-        pdf_content = None
-        if invoice_pdf:
-            pdf_content = await invoice_pdf.read()
+def save_generator(db: SessionLocal, upload: Optional[StreamingUpload], fields: dict, user_id: str,
+                   generator_id: Optional[str] = None) -> Generator:
+    """
+    Crea o actualiza un generador y confirma la referencia a su PDF en una sola transacción.
+    Se ejecuta entera en el threadpool, así la escritura no sigue abierta mientras la
+    petición vuelve al event loop.
+    :param upload: PDF recibido, o None si no se envió.
+    :param fields: Columnas del generador (id_payment_transfer, electronic_invoice, cufe, qr_code).
+    :param user_id: Usuario autenticado: el generador y su pago deben ser suyos.
+    :param generator_id: Generador a actualizar; None para crear uno nuevo.
+    :return: El generador guardado.
+    :raises HTTPException: 404 si el generador o el pago no existen o no son del usuario.
+    """
+    try:
+        if not is_owned(db, PaymentsTransfers, fields["id_payment_transfer"], user_id):
+            raise HTTPException(status_code=404, detail="Pago o transferencia no encontrado")
+        if generator_id is None:
+            generator = Generator(**fields)
+            db.add(generator)
+        else:
+            generator = get_owned(db, Generator, generator_id, user_id)
+            if not generator:
+                raise HTTPException(status_code=404, detail="Generador no encontrado")
+            for name, value in fields.items():
+                setattr(generator, name, value)
 
-        # Actualizar los campos del generador
-        existing_generator.id_payment_transfer = id_payment_transfer
-        existing_generator.electronic_invoice = electronic_invoice
-        existing_generator.cufe = cufe
-        existing_generator.qr_code = qr_code
-        if pdf_content:
-            existing_generator.invoice_pdf = pdf_content
+        # En la tabla quedan la clave y el tamaño; al reemplazarlo se libera la referencia al anterior
+        if upload:
+            pdf, = upload.commit(db)
+            if generator_id is not None:
+                blob_store.release(db, [generator.invoice_pdf_sha256])
+            generator.invoice_pdf_sha256 = pdf["sha256"]
+            generator.invoice_pdf_size = pdf["size"]
 
         db.commit()
-        db.refresh(existing_generator)
-        return existing_generator
-    except Exception as e:
+        db.refresh(generator)
+        return generator
+    except Exception:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        if upload:
+            upload.discard()
+        raise
 
 # Endpoint para eliminar un generador
 @router.delete("/generators/{generator_id}")
-async def delete_generator(generator_id: str, db: SessionLocal = Depends(get_db)):
+def delete_generator(generator_id: str, user_id: str = Depends(get_current_user_id),
+                     db: SessionLocal = Depends(get_db)):
     try:
-        generator = db.query(Generator).filter(Generator.id == generator_id).first()
+        generator = get_owned(db, Generator, generator_id, user_id)
         if not generator:
             raise HTTPException(status_code=404, detail="Generador no encontrado")
 
+        blob_store.release(db, [generator.invoice_pdf_sha256])
         db.delete(generator)
         db.commit()
         return {"message": "Generador eliminado correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Endpoint para descargar el PDF de un generador, en streaming y con soporte de Range
+@router.get("/generators/{generator_id}/pdf")
+def download_generator_pdf(generator_id: str, request: Request, user_id: str = Depends(get_current_user_id),
+                           db: SessionLocal = Depends(get_db)):
+    row = db.query(Generator.invoice_pdf_sha256, Generator.invoice_pdf_size).filter(
+        Generator.id == generator_id, owner_filter(Generator, user_id)
+    ).first()
+    if not row or not row.invoice_pdf_sha256 or not blob_store.exists(row.invoice_pdf_sha256):
+        raise HTTPException(status_code=404, detail="PDF no encontrado")
+    digest, size = row
+    if size is None:
+        size = blob_store.size(digest)  # filas anteriores a invoice_pdf_size
+    # El contenido de un digest nunca cambia: sirve de ETag
+    return range_response(
+        request,
+        lambda: blob_store.open(digest),
+        size,
+        etag=digest,
+        media_type="application/pdf",
+        filename=f"factura_{generator_id}.pdf",
+    )
@@ -0,0 +1,28 @@
+# src/routes/invoice_issue_routes.py
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..schemas.invoice_issue_schema import InvoiceBatchRequest, InvoiceBatchResponse
+from ..database import get_db
+from ..business_logic.invoice_batch_logic import InvoiceBatchLogic
+from ..services.invoice_number_service import NumberingRangeExhausted, NumberingRangeNotFound
+from .auth_routes import get_current_user_id
+
+router = APIRouter(prefix="/facturas", tags=["Facturas"])
+
+# Endpoint para emitir un lote de facturas con sus ítems (p. ej. las ventas POS del día)
+# en una sola transacción; las facturas inválidas (o de clientes de otro usuario) se reportan
+# en errors sin detener el resto
+@router.post("/lote", response_model=InvoiceBatchResponse)
+def issue_invoice_batch(batch: InvoiceBatchRequest, user_id: str = Depends(get_current_user_id),
+                        db: Session = Depends(get_db)):
+    try:
+        return InvoiceBatchLogic(db).issue_invoices(batch.invoices, range_id=batch.range_id, id_user=user_id)
+    except NumberingRangeExhausted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except NumberingRangeNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
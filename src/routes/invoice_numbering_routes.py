@@ -0,0 +1,67 @@
+# src/routes/invoice_numbering_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..models.invoice_numbering import InvoiceNumberRange
+from ..schemas.invoice_numbering_schema import (
+    InvoiceNumberRangeRequest, InvoiceNumberRangeResponse, InvoiceNumbersResponse,
+)
+from ..database import get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..services.invoice_number_service import NumberingRangeExhausted, NumberingRangeNotFound, invoice_numbers
+from .auth_routes import get_current_user, require_permissions
+
+router = APIRouter(prefix="/numeracion", tags=["Numeración de facturas"])
+
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(InvoiceNumberRangeResponse.model_fields)
+# Permisos para registrar resoluciones y conciliar la numeración
+NUMBERING_ADMIN_PERMISSIONS = ("total",)
+
+# Endpoint para registrar un rango de numeración autorizado (resolución DIAN)
+@router.post("/rangos", response_model=InvoiceNumberRangeResponse)
+def create_number_range(number_range: InvoiceNumberRangeRequest,
+                        user: dict = Depends(require_permissions(*NUMBERING_ADMIN_PERMISSIONS)),
+                        db: Session = Depends(get_db)):
+    if number_range.range_end < number_range.range_start:
+        raise HTTPException(status_code=400, detail="range_end debe ser mayor o igual que range_start")
+    new_range = InvoiceNumberRange(
+        **number_range.model_dump(),
+        high_water=number_range.range_start - 1,
+    )
+    try:
+        db.add(new_range)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="La resolución ya está registrada para ese emisor y prefijo")
+    db.refresh(new_range)
+    return new_range
+
+# Endpoint para listar los rangos de numeración (paginado por cursor)
+@router.get("/rangos", response_model=PageResponse)
+def get_number_ranges(page: PageParams = Depends(page_params), user: dict = Depends(get_current_user),
+                      db: Session = Depends(get_db)):
+    return paginate_or_400(db, InvoiceNumberRange, page, LIST_FIELDS)
+
+# Endpoint para reservar los siguientes números de un rango
+# (quedan entregados aunque no terminen en una factura)
+@router.post("/rangos/{range_id}/siguientes", response_model=InvoiceNumbersResponse)
+async def take_invoice_numbers(range_id: str, cantidad: int = Query(1, ge=1, le=10000),
+                               user: dict = Depends(get_current_user)):
+    try:
+        numbers = await run_in_threadpool(invoice_numbers.take, range_id, cantidad)
+    except NumberingRangeExhausted as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except NumberingRangeNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"range_id": range_id, "numbers": numbers}
+
+# Endpoint para recuperar los números nunca entregados de los bloques abandonados
+@router.post("/conciliar")
+async def reconcile_invoice_numbers(range_id: Optional[str] = None,
+                                    user: dict = Depends(require_permissions(*NUMBERING_ADMIN_PERMISSIONS))):
+    return await run_in_threadpool(invoice_numbers.reconcile, range_id)
@@ -3,17 +3,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from ..models.invoice import InvoicesReceipts
 from ..schemas.invoices_schema import InvoiceRequest, InvoiceResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(InvoiceResponse.model_fields)
 
 # Endpoint para crear una nueva factura/recibo
 @router.post("/invoices-receipts", response_model=InvoiceResponse)
@@ -39,12 +36,13 @@ async def create_invoice_receipt(invoice: InvoiceRequest, db: SessionLocal = Dep
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todas las facturas/recibos
-@router.get("/invoices-receipts", response_model=List[InvoiceResponse])
-async def get_all_invoices_receipts(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todas las facturas/recibos (paginado por cursor, con proyección de campos)
+@router.get("/invoices-receipts", response_model=PageResponse)
+async def get_all_invoices_receipts(page: PageParams = Depends(page_params), db: SessionLocal = Depends(get_db)):
     try:
-        invoices_receipts = db.query(InvoicesReceipts).all()
-        return invoices_receipts
+        return paginate_or_400(db, InvoicesReceipts, page, LIST_FIELDS)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,223 +1,197 @@
 # src/routes/nomina_routes.py
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from io import BytesIO
-import datetime
-import os
-from typing import List
-from ..models.nomina import Nomina, create_nomina
-from ..schemas.nomina_schema import NominaRequest, NominaResponse
-from ..database import SessionLocal
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, Response
+from datetime import datetime
+from typing import List, Optional
+from ..models.nomina import Nomina
+from ..models.loading import with_heavy_columns
+from ..schemas.nomina_schema import NominaCreate, NominaResponse, PayRunRequest, PayRunResponse
+from ..database import SessionLocal, get_db, get_async_db
+from sqlalchemy.orm import Session
+from ..business_logic.nomina_logic import AsyncNominaLogic
+from ..business_logic.nomina_batch_logic import NominaBatchLogic
+from ..services.nomina_pdf_service import nomina_pdf_payload, pdf_cache_key, pdf_queue
+from ..services.blob_store import blob_store
+from ..services.payroll_mail_service import KIND as PAYROLL_SLIP_KIND, PayrollMailJobRunning, payroll_mailer
+from ..models.email_outbox import EmailOutbox
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, owned_ids
+from .auth_routes import get_current_user_id
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/nominas", tags=["Nóminas"])
 
-# Configuración
-PDF_STORAGE = "storage/nominas"
-os.makedirs(PDF_STORAGE, exist_ok=True)
-
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# Endpoint para crear una nueva nómina
-@router.post("/nomina", response_model=NominaResponse)
-async def create_new_nomina(nomina: NominaRequest, db: SessionLocal = Depends(get_db)):
+# Endpoint para crear la nómina de un empleado (mismo motor y columnas que la liquidación masiva)
+@router.post("/", response_model=NominaResponse)
+def create_nomina(
+    nomina_data: NominaCreate,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
     try:
-        # Crear una nueva nómina
-        new_nomina = create_nomina(
-            id_user=nomina.id_user,
-            contract_type=nomina.contract_type.value,
-            period=nomina.period,
-            employee_name=nomina.employee_name,
-            salary=nomina.salary,
-            deductions=nomina.deductions,
-            email=nomina.email,
-            contributions=nomina.contributions
+        result = NominaBatchLogic(db).create_pay_run(
+            id_user=user_id,
+            period=nomina_data.period,
+            employees=[nomina_data.model_dump()],
         )
-        db.add(new_nomina)
-        db.commit()
-        db.refresh(new_nomina)
-        return new_nomina
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        db.rollback()
+    except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener una nómina por ID
-@router.post("/", response_model=NominaResponse)
-async def create_nomina(
-    nomina_data: Union[NominaRequest, NominaCreate],
-    db: Session = Depends(get_db)
-):
+    nomina = db.query(Nomina).options(with_heavy_columns()).filter(Nomina.id == result["nominas"][0]["id"]).one()
+    # Generar PDF en segundo plano (pdf_url se guarda cuando termina)
+    pdf_queue.submit([nomina_pdf_payload(nomina)], user_id)
+    return nomina
+
+# Endpoint para liquidar la nómina de toda la empresa en un periodo (cálculo vectorizado + bulk insert)
+@router.post("/liquidacion", response_model=PayRunResponse)
+def create_pay_run(pay_run: PayRunRequest, generar_pdf: bool = False,
+                   user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
     try:
-        # Cálculos de ley colombiana
-        health = nomina_data.base_salary * 0.04
-        pension = nomina_data.base_salary * 0.04
-        solidarity = 0
-        
-        if nomina_data.base_salary > 4 * 1160000:  # 4 SMLV 2023
-            solidarity = nomina_data.base_salary * 0.01
-        
-        # Cálculo de horas extras
-        extra_payments = (
-            (nomina_data.extra_day_hours * (nomina_data.base_salary / 240) * 1.25) +
-            (nomina_data.extra_night_hours * (nomina_data.base_salary / 240) * 1.75) +
-            (nomina_data.sunday_hours * (nomina_data.base_salary / 240) * 1.75) +
-            (nomina_data.holiday_hours * (nomina_data.base_salary / 240) * 2.0)
-        )
-        
-        total_gross = (
-            nomina_data.base_salary * (nomina_data.days_worked / 30) +
-            nomina_data.transport_allowance +
-            extra_payments
-        )
-        
-        total_deductions = (
-            health + pension + solidarity + 
-            nomina_data.deductions
+        result = NominaBatchLogic(db).create_pay_run(
+            id_user=user_id,
+            period=pay_run.period,
+            employees=[employee.model_dump() for employee in pay_run.employees],
         )
-        
-        total_net = total_gross - total_deductions
-        
-        # Crear registro en BD
-        nomina = Nomina(
-            id_user=nomina_data.id_user,
-            contract_type=nomina_data.contract_type.value,
-            period=nomina_data.period,
-            employee_id=nomina_data.employee_id,
-            employee_name=nomina_data.employee_name,
-            base_salary=nomina_data.base_salary,
-            transport_allowance=nomina_data.transport_allowance,
-            days_worked=nomina_data.days_worked,
-            night_hours=nomina_data.night_hours,
-            extra_day_hours=nomina_data.extra_day_hours,
-            extra_night_hours=nomina_data.extra_night_hours,
-            sunday_hours=nomina_data.sunday_hours,
-            holiday_hours=nomina_data.holiday_hours,
-            health_contribution=health,
-            pension_contribution=pension,
-            solidarity_pension_fund=solidarity,
-            deductions=nomina_data.deductions,
-            other_concepts=nomina_data.other_concepts,
-            total_gross=total_gross,
-            total_net=total_net
-        )
-        
-        db.add(nomina)
-        db.commit()
-        db.refresh(nomina)
-        
-        # Generar PDF
-        pdf_path = f"{PDF_STORAGE}/nomina_{nomina.id}.pdf"
-        generate_pdf(nomina, pdf_path)
-        
-        # Actualizar con URL del PDF
-        nomina.pdf_url = pdf_path
-        db.commit()
-        
-        return nomina
-        
-    except Exception as e:
-        db.rollback()
+        if generar_pdf:
+            result["pdf_job_id"] = queue_period_pdfs(db, pay_run.period, user_id).id
+        return result
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-def generate_pdf(nomina: Nomina, output_path: str):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    
-    # Encabezado
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(100, 750, f"NÓMINA DE PAGO - {nomina.period}")
-    
-    # Información empleado
-    c.setFont("Helvetica", 12)
-    y = 700
-    c.drawString(100, y, f"Empleado: {nomina.employee_name} ({nomina.employee_id})")
-    y -= 20
-    c.drawString(100, y, f"Tipo Contrato: {nomina.contract_type}")
-    y -= 20
-    c.drawString(100, y, f"Días trabajados: {nomina.days_worked}")
-    
-    # Detalles de pago
-    y -= 40
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(100, y, "DESGLOSE DE PAGOS")
-    y -= 30
-    
-    # Tabla de conceptos
-    concepts = [
-        ("Salario básico", nomina.base_salary),
-        ("Auxilio transporte", nomina.transport_allowance),
-        ("Horas extras diurnas", (nomina.extra_day_hours * (nomina.base_salary / 240) * 1.25)),
-        ("Horas extras nocturnas", (nomina.extra_night_hours * (nomina.base_salary / 240) * 1.75)),
-        ("Horas dominicales/festivas", ((nomina.sunday_hours + nomina.holiday_hours) * (nomina.base_salary / 240) * 1.75)),
-        ("Total Devengado", nomina.total_gross),
-        ("", ""),
-        ("Aportes Salud", nomina.health_contribution),
-        ("Aportes Pensión", nomina.pension_contribution),
-        ("Fondo Solidaridad Pensional", nomina.solidarity_pension_fund),
-        ("Otros descuentos", nomina.deductions),
-        ("Total Deducciones", (nomina.health_contribution + nomina.pension_contribution + nomina.solidarity_pension_fund + nomina.deductions)),
-        ("", ""),
-        ("NETO A PAGAR", nomina.total_net)
-    ]
-    
-    c.setFont("Helvetica", 12)
-    for concept, value in concepts:
-        c.drawString(100, y, concept)
-        c.drawString(400, y, f"${value:,.2f}" if value != "" else "")
-        y -= 20
-    
-    # Pie de página
-    y -= 30
-    c.drawString(100, y, "Firma empleador: __________________________")
-    y -= 20
-    c.drawString(100, y, "Firma empleado: __________________________")
-    
-    c.save()
-    with open(output_path, "wb") as f:
-        f.write(buffer.getvalue())
+def queue_period_pdfs(db: Session, period: str, id_user: str):
+    """Encola los PDFs de las nóminas del periodo del usuario (lectura por lotes con yield_per)."""
+    query = db.query(Nomina).filter(Nomina.period == period, Nomina.id_user == id_user)
+    return pdf_queue.submit((nomina_pdf_payload(nomina) for nomina in query.yield_per(500)), id_user)
+
+# Endpoint para generar (o regenerar) el PDF de una nómina en segundo plano
+@router.post("/{nomina_id}/pdf", status_code=202)
+def queue_nomina_pdf(nomina_id: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    nomina = get_owned(db, Nomina, nomina_id, user_id)
+    if not nomina:
+        raise HTTPException(status_code=404, detail="Nómina no encontrada")
+    return pdf_queue.submit([nomina_pdf_payload(nomina)], user_id).as_dict()
+
+# Endpoint para generar en paralelo los PDFs de todas las nóminas de un periodo
+@router.post("/pdf/periodo/{period}", status_code=202)
+def queue_period_nomina_pdfs(period: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    job = queue_period_pdfs(db, period, user_id)
+    if not job.nomina_ids:
+        raise HTTPException(status_code=404, detail="No hay nóminas en el periodo")
+    return job.as_dict()
+
+# Endpoint para consultar el estado de un trabajo de PDFs
+@router.get("/pdf/jobs/{job_id}")
+def get_pdf_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    job = pdf_queue.get_job(job_id)
+    if not job or job.id_user != user_id:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job.as_dict()
+
+# Campos del estado por destinatario de un envío de comprobantes
+RECIPIENT_FIELDS = ["id", "reference_id", "to_email", "to_name", "status", "attempts",
+                    "last_error", "sent_at", "created_at"]
+
+def payroll_mail_filters(job_id: str, user_id: str) -> list:
+    """Correos de comprobantes del trabajo que corresponden a nóminas del usuario."""
+    return [EmailOutbox.job_id == job_id, EmailOutbox.kind == PAYROLL_SLIP_KIND,
+            EmailOutbox.reference_id.in_(owned_ids(Nomina, user_id))]
+
+# Endpoint para enviar por correo los comprobantes (PDF adjunto) de las nóminas del usuario en un periodo
+@router.post("/correos/periodo/{period}", status_code=202)
+def send_period_payroll_slips(period: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    query = db.query(Nomina.id).filter(Nomina.period == period, Nomina.id_user == user_id)
+    if query.first() is None:
+        raise HTTPException(status_code=404, detail="No hay nóminas en el periodo")
+    try:
+        return payroll_mailer.start(period, user_id).as_dict()
+    except PayrollMailJobRunning as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+
+# Endpoint para consultar el avance de un envío de comprobantes (conteo por estado en el outbox)
+@router.get("/correos/jobs/{job_id}")
+def get_payroll_mail_job(job_id: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    by_status = dict(
+        db.query(EmailOutbox.status, func.count(EmailOutbox.id))
+        .filter(*payroll_mail_filters(job_id, user_id))
+        .group_by(EmailOutbox.status).all()
+    )
+    job = payroll_mailer.get_job(job_id)
+    if job is not None and job.id_user != user_id:
+        job = None
+    if job is None and not by_status:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    summary = job.as_dict() if job else {"job_id": job_id, "status": None}
+    summary["emails"] = by_status
+    return summary
+
+# Endpoint para listar el estado de cada destinatario de un envío (paginado, opcionalmente por estado)
+@router.get("/correos/jobs/{job_id}/destinatarios")
+def list_payroll_mail_recipients(job_id: str, status: Optional[str] = None,
+                                 page: PageParams = Depends(page_params),
+                                 user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    filters = payroll_mail_filters(job_id, user_id)
+    if status:
+        filters.append(EmailOutbox.status == status)
+    return paginate_or_400(db, EmailOutbox, page, RECIPIENT_FIELDS, filters)
 
 # Endpoint para eliminar una nómina
 @router.delete("/nomina/{nomina_id}")
-async def delete_nomina(nomina_id: str, db: SessionLocal = Depends(get_db)):
+def delete_nomina(nomina_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        nomina = db.query(Nomina).filter(Nomina.id == nomina_id).first()
+        nomina = get_owned(db, Nomina, nomina_id, user_id)
         if not nomina:
             raise HTTPException(status_code=404, detail="Nómina no encontrada")
 
+        blob_store.release(db, [nomina.pdf_sha256])
         db.delete(nomina)
         db.commit()
         return {"message": "Nómina eliminada correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
+# Descarga del PDF: se sirve desde la caché por contenido y solo se genera si la nómina cambió
 @router.get("/{nomina_id}/pdf", response_class=FileResponse)
-async def download_nomina_pdf(nomina_id: str, db: Session = Depends(get_db)):
-    nomina = db.query(Nomina).filter(Nomina.id == nomina_id).first()
-    if not nomina or not nomina.pdf_url:
+def download_nomina_pdf(nomina_id: str, request: Request, user_id: str = Depends(get_current_user_id),
+                        db: Session = Depends(get_db)):
+    nomina = get_owned(db, Nomina, nomina_id, user_id)
+    if not nomina:
         raise HTTPException(status_code=404, detail="Nómina no encontrada")
-    
+
+    payload = nomina_pdf_payload(nomina)
+    etag = f'"{pdf_cache_key(payload)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        pdf_path = pdf_queue.render_cached(payload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"No se pudo generar el PDF: {e}")
+
     return FileResponse(
-        nomina.pdf_url,
-        filename=f"nomina_{nomina.employee_id}_{nomina.period}.pdf"
+        pdf_path,
+        media_type="application/pdf",
+        filename=f"nomina_{nomina.employee_id}_{nomina.period}.pdf",
+        headers=headers,
     )
 
 @router.get("/empleado/{employee_id}", response_model=List[NominaResponse])
-async def get_employee_nominas(employee_id: str, db: Session = Depends(get_db)):
-    return db.query(Nomina).filter(Nomina.employee_id == employee_id).all()
+async def get_employee_nominas(employee_id: str, user_id: str = Depends(get_current_user_id),
+                               db: AsyncSession = Depends(get_async_db)):
+    return await AsyncNominaLogic(db).get_nominas_by_employee(employee_id, id_user=user_id)
 
 @router.post("/{nomina_id}/pagar")
-async def mark_as_paid(nomina_id: str, db: Session = Depends(get_db)):
-    nomina = db.query(Nomina).filter(Nomina.id == nomina_id).first()
+def mark_as_paid(nomina_id: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    nomina = get_owned(db, Nomina, nomina_id, user_id)
     if not nomina:
         raise HTTPException(status_code=404, detail="Nómina no encontrada")
     
@@ -1,81 +1,154 @@
 # src/routes/pqrsf_routes.py
 import uuid 
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from ..models.pqrsf import PQRSF
+from ..models.loading import light_fields, with_heavy_columns
 from ..schemas.pqrsf_schema import PQRSFRequest, PQRSFResponse
-from ..database import SessionLocal, get_db
+from ..database import SessionLocal, WriteLaneBusy, get_db
+from ..config import settings
+from ..services.blob_store import blob_store
+from ..services.upload_service import StreamingUpload, UploadRejected
+from ..utils.file_response import range_response
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from .auth_routes import require_permissions
 from sqlalchemy.orm import Session
 from src.models.pqrsf import PQRSF  # Asegúrate que este modelo existe
 import os
-import shutil
 from datetime import datetime
 from typing import List
 from pydantic import EmailStr
 
 router = APIRouter(prefix="/pqrsf", tags=["PQRSF"])
 
+# Campos que pueden devolver los listados
+LIST_FIELDS = [column.key for column in PQRSF.__table__.columns]
+
+# Las PQRSF se radican sin autenticación, pero solo las lee quien las atiende (permiso total)
+PQRSF_READ_PERMISSIONS = ("total",)
+
+# Directorio anterior de adjuntos (ruta completa en archivos); los nuevos van al almacén por contenido
 UPLOAD_DIR = "uploads/pqrsf"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-conf = ConnectionConfig(
-    MAIL_USERNAME="tu_correo@gmail.com",
-    MAIL_PASSWORD="tu_contraseña",
-    MAIL_FROM="tu_correo@gmail.com",
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_STARTTLS=True,  # Nuevo parámetro requerido
-    MAIL_SSL_TLS=False,  # Nuevo parámetro requerido
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
+# Esquema del formulario para la documentación (el cuerpo se lee en streaming, sin Form/File)
+PQRSF_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["tipo", "mensaje"],
+                    "properties": {
+                        "tipo": {"type": "string"},
+                        "mensaje": {"type": "string"},
+                        "archivos": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                }
+            }
+        },
+    }
+}
+
+@router.post("/", openapi_extra=PQRSF_FORM_SCHEMA)
+async def crear_pqrsf(request: Request, db: Session = Depends(get_db)):
+    # Los archivos se escriben mientras llegan, con límites de tamaño y validación del contenido
+    upload = StreamingUpload(
+        blob_store,
+        max_file_bytes=settings.PQRSF_MAX_FILE_MB * 1024 * 1024,
+        max_request_bytes=settings.PQRSF_MAX_REQUEST_MB * 1024 * 1024,
+        max_files=settings.PQRSF_MAX_FILES,
+    )
+    try:
+        await upload.receive(request)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    tipo = upload.fields.get("tipo")
+    mensaje = upload.fields.get("mensaje")
+    if not tipo or mensaje is None:
+        await run_in_threadpool(upload.discard)
+        raise HTTPException(status_code=422, detail="Los campos tipo y mensaje son obligatorios")
 
-@router.post("/")
-async def crear_pqrsf(
-    background_tasks: BackgroundTasks,
-    tipo: str = Form(...),
-    mensaje: str = Form(...),
-    archivos: List[UploadFile] = File([]),  # Lista de archivos (opcional)
-    db: Session = Depends(get_db)
-):
     try:
-        nombres_archivos = []
-        for archivo in archivos:
-            if not archivo.filename.lower().endswith(('.pdf', '.doc', '.docx', '.jpg', '.jpeg', '.png')):
-                continue  # O devuelve un error 400
-            
-            file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{archivo.filename}")
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(archivo.file, buffer)
-            nombres_archivos.append(file_path)
+        nueva_pqrsf = await run_in_threadpool(guardar_pqrsf, db, upload, tipo, mensaje)
+    except WriteLaneBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al procesar PQRSF: {str(e)}"
+        )
+
+    return {
+        "status": "success",
+        "message": "PQRSF registrada correctamente",
+        "data": {
+            "id": nueva_pqrsf.id,
+            "tipo": nueva_pqrsf.tipo,
+            "fecha": nueva_pqrsf.fecha
+        }
+    }
 
+def guardar_pqrsf(db: Session, upload: StreamingUpload, tipo: str, mensaje: str) -> PQRSF:
+    """
+    Confirma las referencias de los adjuntos y guarda la PQRSF en una sola transacción.
+    Se ejecuta entera en el threadpool: la transacción de escritura no queda abierta
+    mientras la petición vuelve al event loop.
+    """
+    try:
+        # Solo se guardan los digests; las referencias se confirman con la PQRSF
+        archivos = upload.commit(db)
         nueva_pqrsf = PQRSF(
             tipo=tipo,
             mensaje=mensaje,
-            archivos=nombres_archivos,  # Asegúrate de que sea JSON-compatible
+            archivos=archivos,
             fecha=datetime.utcnow(),
             estado="recibido"
         )
         db.add(nueva_pqrsf)
         db.commit()
         db.refresh(nueva_pqrsf)
-
-        return {
-            "status": "success",
-            "message": "PQRSF registrada correctamente",
-            "data": {
-                "id": nueva_pqrsf.id,
-                "tipo": nueva_pqrsf.tipo,
-                "fecha": nueva_pqrsf.fecha
-            }
-        }
-    except Exception as e:
+        return nueva_pqrsf
+    except Exception:
         db.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al procesar PQRSF: {str(e)}"
-        )
+        upload.discard()
+        raise
 
-    finally:
-        db.close()
\ No newline at end of file
+# Listado de solicitudes PQRSF (paginado por cursor; los adjuntos solo si se piden en fields)
+@router.get("/", response_model=PageResponse)
+def listar_pqrsf(
+    page: PageParams = Depends(page_params),
+    user: dict = Depends(require_permissions(*PQRSF_READ_PERMISSIONS)),
+    db: Session = Depends(get_db),
+):
+    return paginate_or_400(db, PQRSF, page, LIST_FIELDS, default_fields=light_fields(PQRSF))
+
+# Descarga de un adjunto de una PQRSF desde el almacén por contenido
+@router.get("/{pqrsf_id}/archivos/{sha256}")
+def descargar_archivo_pqrsf(
+    pqrsf_id: int,
+    sha256: str,
+    request: Request,
+    user: dict = Depends(require_permissions(*PQRSF_READ_PERMISSIONS)),
+    db: Session = Depends(get_db),
+):
+    pqrsf = db.query(PQRSF).options(with_heavy_columns()).filter(PQRSF.id == pqrsf_id).first()
+    if not pqrsf:
+        raise HTTPException(status_code=404, detail="PQRSF no encontrada")
+    archivo = next((item for item in pqrsf.archivos or []
+                    if isinstance(item, dict) and item.get("sha256") == sha256), None)
+    if archivo is None or not blob_store.exists(sha256):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    # El contenido de un digest nunca cambia: sirve de ETag
+    return range_response(
+        request,
+        lambda: blob_store.open(sha256),
+        archivo.get("size") or blob_store.size(sha256),
+        etag=sha256,
+        media_type=archivo.get("content_type") or "application/octet-stream",
+        filename=archivo.get("nombre"),
+    )
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from src.database import get_db
 from src.models.register import User
 from src.schemas.register_schema import UserJsonSchema
+from src.services.password_service import PasswordHasherBusy, hash_password, password_hasher
 
 router = APIRouter()
 
@@ -17,6 +18,12 @@ def create_user(register: UserJsonSchema, db: Session = Depends(get_db)):
     if existing_user_email or existing_user_id:
         raise HTTPException(status_code=400, detail="El Usuario ya se encuentra registrado.")
 
+    # Hash de la contraseña en el pool dedicado (acotado)
+    try:
+        password_hash = password_hasher.run_sync(hash_password, register.password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
     # Crear un nuevo usuario
     db_user = User(
         first_name=register.first_name,
@@ -25,9 +32,9 @@ def create_user(register: UserJsonSchema, db: Session = Depends(get_db)):
         identification_number=register.identification_number,
         email=register.email,
         permissions=register.permissions,  # Ahora los permisos se reciben desde el esquema
-        password=register.password,  # La contraseña se encriptará automáticamente en el modelo
         status=register.status
     )
+    db_user.password_hash = password_hash
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
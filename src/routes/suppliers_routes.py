@@ -3,25 +3,26 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from ..models.suppliers import Supplier, create_supplier
 from ..schemas.suppliers_schema import SupplierRequest, SupplierResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, owner_filter
+from .auth_routes import get_current_user_id
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(SupplierResponse.model_fields)
 
 # Endpoint para crear un nuevo proveedor
 @router.post("/suppliers", response_model=SupplierResponse)
-async def create_new_supplier(supplier: SupplierRequest, db: SessionLocal = Depends(get_db)):
+def create_new_supplier(supplier: SupplierRequest, user_id: str = Depends(get_current_user_id),
+                        db: SessionLocal = Depends(get_db)):
     try:
         # Crear un nuevo proveedor
         new_supplier = create_supplier(
-            id_user=supplier.id_user,
+            db,
+            id_user=user_id,
             name=supplier.name,
             person_type=supplier.person_type.value,
             tax_id=supplier.tax_id,
@@ -45,36 +46,41 @@ async def create_new_supplier(supplier: SupplierRequest, db: SessionLocal = Depe
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todos los proveedores
-@router.get("/suppliers", response_model=List[SupplierResponse])
-async def get_all_suppliers(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todos los proveedores (paginado por cursor, con proyección de campos)
+@router.get("/suppliers", response_model=PageResponse)
+def get_all_suppliers(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id),
+                      db: SessionLocal = Depends(get_db)):
     try:
-        suppliers = db.query(Supplier).all()
-        return suppliers
+        return paginate_or_400(db, Supplier, page, LIST_FIELDS, filters=[owner_filter(Supplier, user_id)])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para obtener un proveedor por ID
 @router.get("/suppliers/{supplier_id}", response_model=SupplierResponse)
-async def get_supplier_by_id(supplier_id: str, db: SessionLocal = Depends(get_db)):
+def get_supplier_by_id(supplier_id: str, user_id: str = Depends(get_current_user_id),
+                       db: SessionLocal = Depends(get_db)):
     try:
-        supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+        supplier = get_owned(db, Supplier, supplier_id, user_id)
         if not supplier:
             raise HTTPException(status_code=404, detail="Proveedor no encontrado")
         return supplier
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para actualizar un proveedor
 @router.put("/suppliers/{supplier_id}", response_model=SupplierResponse)
-async def update_supplier(supplier_id: str, supplier: SupplierRequest, db: SessionLocal = Depends(get_db)):
+def update_supplier(supplier_id: str, supplier: SupplierRequest, user_id: str = Depends(get_current_user_id),
+                    db: SessionLocal = Depends(get_db)):
     try:
-        existing_supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+        existing_supplier = get_owned(db, Supplier, supplier_id, user_id)
         if not existing_supplier:
             raise HTTPException(status_code=404, detail="Proveedor no encontrado")
 
         # Actualizar los campos del proveedor
-        existing_supplier.id_user = supplier.id_user
         existing_supplier.name = supplier.name
         existing_supplier.person_type = supplier.person_type.value
         existing_supplier.tax_id = supplier.tax_id
@@ -91,21 +97,25 @@ async def update_supplier(supplier_id: str, supplier: SupplierRequest, db: Sessi
         db.commit()
         db.refresh(existing_supplier)
         return existing_supplier
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para eliminar un proveedor
 @router.delete("/suppliers/{supplier_id}")
-async def delete_supplier(supplier_id: str, db: SessionLocal = Depends(get_db)):
+def delete_supplier(supplier_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+        supplier = get_owned(db, Supplier, supplier_id, user_id)
         if not supplier:
             raise HTTPException(status_code=404, detail="Proveedor no encontrado")
 
         db.delete(supplier)
         db.commit()
         return {"message": "Proveedor eliminado correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
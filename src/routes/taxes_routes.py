@@ -1,24 +1,27 @@
 # src/routes/taxes_routes.py
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from ..models.taxes import Tax
+from ..models.taxes import Taxes as Tax
 from ..schemas.taxes_schema import TaxRequest, TaxResponse
-from ..database import SessionLocal
+from ..database import SessionLocal, get_db
+from ..schemas.pagination_schema import PageResponse
+from ..utils.pagination import PageParams, page_params, paginate_or_400
+from ..utils.ownership import get_owned, is_owned, owner_filter
+from ..models.invoice import Invoice
+from .auth_routes import get_current_user_id
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Campos que pueden devolver los listados (y los que se devuelven por defecto)
+LIST_FIELDS = list(TaxResponse.model_fields)
 
 # Endpoint para crear un nuevo impuesto
 @router.post("/taxes", response_model=TaxResponse)
-async def create_tax(tax: TaxRequest, db: SessionLocal = Depends(get_db)):
+def create_tax(tax: TaxRequest, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
+        # Solo se asocia a una factura de un cliente del usuario
+        if not is_owned(db, Invoice, tax.id_invoice_receipt, user_id):
+            raise HTTPException(status_code=404, detail="Factura no encontrada")
         # Crear un nuevo impuesto
         new_tax = Tax(
             id_invoice_receipt=tax.id_invoice_receipt,
@@ -32,37 +35,46 @@ async def create_tax(tax: TaxRequest, db: SessionLocal = Depends(get_db)):
         db.commit()
         db.refresh(new_tax)
         return new_tax
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para obtener todos los impuestos
-@router.get("/taxes", response_model=List[TaxResponse])
-async def get_all_taxes(db: SessionLocal = Depends(get_db)):
+# Endpoint para obtener todos los impuestos (paginado por cursor, con proyección de campos)
+@router.get("/taxes", response_model=PageResponse)
+def get_all_taxes(page: PageParams = Depends(page_params), user_id: str = Depends(get_current_user_id),
+                  db: SessionLocal = Depends(get_db)):
     try:
-        taxes = db.query(Tax).all()
-        return taxes
+        return paginate_or_400(db, Tax, page, LIST_FIELDS, filters=[owner_filter(Tax, user_id)])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para obtener un impuesto por ID
 @router.get("/taxes/{tax_id}", response_model=TaxResponse)
-async def get_tax_by_id(tax_id: str, db: SessionLocal = Depends(get_db)):
+def get_tax_by_id(tax_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        tax = db.query(Tax).filter(Tax.id == tax_id).first()
+        tax = get_owned(db, Tax, tax_id, user_id)
         if not tax:
             raise HTTPException(status_code=404, detail="Impuesto no encontrado")
         return tax
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para actualizar un impuesto
 @router.put("/taxes/{tax_id}", response_model=TaxResponse)
-async def update_tax(tax_id: str, tax: TaxRequest, db: SessionLocal = Depends(get_db)):
+def update_tax(tax_id: str, tax: TaxRequest, user_id: str = Depends(get_current_user_id),
+               db: SessionLocal = Depends(get_db)):
     try:
-        existing_tax = db.query(Tax).filter(Tax.id == tax_id).first()
+        existing_tax = get_owned(db, Tax, tax_id, user_id)
         if not existing_tax:
             raise HTTPException(status_code=404, detail="Impuesto no encontrado")
+        if not is_owned(db, Invoice, tax.id_invoice_receipt, user_id):
+            raise HTTPException(status_code=404, detail="Factura no encontrada")
 
         # Actualizar los campos del impuesto
         existing_tax.id_invoice_receipt = tax.id_invoice_receipt
@@ -75,21 +87,25 @@ async def update_tax(tax_id: str, tax: TaxRequest, db: SessionLocal = Depends(ge
         db.commit()
         db.refresh(existing_tax)
         return existing_tax
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para eliminar un impuesto
 @router.delete("/taxes/{tax_id}")
-async def delete_tax(tax_id: str, db: SessionLocal = Depends(get_db)):
+def delete_tax(tax_id: str, user_id: str = Depends(get_current_user_id), db: SessionLocal = Depends(get_db)):
     try:
-        tax = db.query(Tax).filter(Tax.id == tax_id).first()
+        tax = get_owned(db, Tax, tax_id, user_id)
         if not tax:
             raise HTTPException(status_code=404, detail="Impuesto no encontrado")
 
         db.delete(tax)
         db.commit()
         return {"message": "Impuesto eliminado correctamente"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
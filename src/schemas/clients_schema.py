@@ -26,7 +26,7 @@ class Status(str, Enum):
 
 # Modelo de solicitud para crear un cliente
 class ClientRequest(BaseModel):
-    id_user: str = Field(..., description="ID del usuario (contador) asociado al cliente")
+    id_user: Optional[str] = Field(None, description="Se ignora: el cliente queda asociado al usuario del token")
     name: str = Field(..., description="Nombre del cliente")
     person_type: PersonType = Field(..., description="Tipo de persona (Natural, Jurídica, Empresa)")
     tax_id: str = Field(..., description="NIT o Cédula con dígito de verificación")
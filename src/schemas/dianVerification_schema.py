@@ -1,5 +1,5 @@
 # src/schemas/dianVerification_schema.py
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 
 # Modelo de solicitud para crear una verificación DIAN
@@ -14,4 +14,4 @@ class DianVerificationResponse(BaseModel):
     id_generator: str = Field(..., description="ID del generador asociado a la verificación")
     requirements_check: str = Field(..., description="Verificación de requisitos (Sí/No)")
     copy_sent_to_client: str = Field(..., description="Copia enviada al cliente (Sí/No)")
-    created_at: datetime = Field(..., description="Fecha de creación de la verificación DIAN")
\ No newline at end of file
+    created_at: datetime = Field(..., validation_alias=AliasChoices("created_at", "createdAt"), description="Fecha de creación de la verificación DIAN")
\ No newline at end of file
@@ -1,5 +1,5 @@
 # src/schemas/generator_schema.py
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -18,5 +18,6 @@ class GeneratorResponse(BaseModel):
     electronic_invoice: str = Field(..., description="Factura electrónica (Sí/No)")
     cufe: str = Field(..., description="Código Único de Factura Electrónica (CUFE)")
     qr_code: str = Field(..., description="Código QR de la factura")
-    invoice_pdf: Optional[bytes] = Field(None, description="PDF de la factura en formato binario")
-    created_at: datetime = Field(..., description="Fecha de creación del generador")
\ No newline at end of file
+    invoice_pdf_sha256: Optional[str] = Field(None, description="SHA-256 del PDF (se descarga en /generators/{id}/pdf)")
+    invoice_pdf_size: Optional[int] = Field(None, description="Tamaño del PDF en bytes")
+    created_at: datetime = Field(..., validation_alias=AliasChoices("created_at", "createdAt"), description="Fecha de creación del generador")
\ No newline at end of file
@@ -0,0 +1,57 @@
+# src/schemas/invoice_issue_schema.py
+from pydantic import BaseModel, Field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+# Ítem (línea) de una factura a emitir
+class InvoiceItemRequest(BaseModel):
+    product_code: Optional[str] = Field(None, max_length=50, description="Código del producto")
+    product_name: str = Field(..., min_length=1, max_length=100, description="Nombre del producto")
+    description: Optional[str] = Field(None, description="Descripción de la línea")
+    quantity: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2, description="Cantidad")
+    unit_price: Decimal = Field(..., ge=0, max_digits=12, decimal_places=2, description="Precio unitario")
+    discount: Decimal = Field(Decimal("0"), ge=0, le=100, decimal_places=2, description="Descuento (%)")
+    tax: Decimal = Field(Decimal("0"), ge=0, le=100, decimal_places=2, description="Impuesto (%)")
+
+# Factura a emitir (los totales se calculan a partir de los ítems)
+class InvoiceIssueRequest(BaseModel):
+    id_client: str = Field(..., description="ID del cliente")
+    invoice_number: Optional[str] = Field(None, max_length=50, description="Número de factura (si se omite se toma del rango)")
+    invoice_type: str = Field("factura_electronica", max_length=20, description="Tipo de documento")
+    client_name: str = Field(..., max_length=100, description="Nombre del cliente")
+    client_id: str = Field(..., max_length=50, description="NIT/Cédula del cliente")
+    client_email: Optional[str] = Field(None, max_length=100, description="Correo del cliente")
+    payment_due_date: Optional[datetime] = Field(None, description="Fecha de vencimiento")
+    tax_withholding: Decimal = Field(Decimal("0"), ge=0, max_digits=12, decimal_places=2, description="Retefuente")
+    ica_withholding: Decimal = Field(Decimal("0"), ge=0, max_digits=12, decimal_places=2, description="ReteICA")
+    status: str = Field("draft", max_length=20, description="Estado inicial")
+    attached_documents: Optional[List[Any]] = Field(None, description="Documentos adjuntos")
+    payment_methods: Optional[List[Any]] = Field(None, description="Métodos de pago")
+    items: List[InvoiceItemRequest] = Field(..., min_length=1, description="Ítems de la factura")
+
+# Lote de facturas (cada una se valida por separado: las inválidas se reportan sin detener el resto)
+class InvoiceBatchRequest(BaseModel):
+    range_id: Optional[str] = Field(None, description="Rango de numeración para las facturas sin invoice_number")
+    invoices: List[Dict[str, Any]] = Field(..., min_length=1, description="Facturas (campos de InvoiceIssueRequest)")
+
+class InvoiceBatchItem(BaseModel):
+    index: int
+    id: str
+    invoice_number: str
+    cufe: str
+    subtotal: Decimal
+    total_taxes: Decimal
+    total: Decimal
+
+class InvoiceBatchError(BaseModel):
+    index: int
+    invoice_number: Optional[str] = None
+    errors: List[str]
+
+# Resultado de la emisión masiva
+class InvoiceBatchResponse(BaseModel):
+    count: int
+    total: Decimal
+    created: List[InvoiceBatchItem]
+    errors: List[InvoiceBatchError]
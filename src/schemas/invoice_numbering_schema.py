@@ -0,0 +1,32 @@
+# src/schemas/invoice_numbering_schema.py
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+# Modelo de solicitud para registrar un rango de numeración (resolución DIAN)
+class InvoiceNumberRangeRequest(BaseModel):
+    issuer_nit: str = Field(..., description="NIT del emisor")
+    resolution_number: str = Field(..., description="Número de la resolución de facturación")
+    prefix: str = Field("", max_length=10, description="Prefijo autorizado (puede ser vacío)")
+    range_start: int = Field(..., ge=1, description="Primer número autorizado")
+    range_end: int = Field(..., ge=1, description="Último número autorizado")
+    valid_from: Optional[datetime] = Field(None, description="Inicio de vigencia de la resolución")
+    valid_to: Optional[datetime] = Field(None, description="Fin de vigencia de la resolución")
+
+# Modelo de respuesta para el rango de numeración
+class InvoiceNumberRangeResponse(BaseModel):
+    id: str = Field(..., description="ID del rango")
+    issuer_nit: str = Field(..., description="NIT del emisor")
+    resolution_number: str = Field(..., description="Número de la resolución de facturación")
+    prefix: str = Field(..., description="Prefijo autorizado")
+    range_start: int = Field(..., description="Primer número autorizado")
+    range_end: int = Field(..., description="Último número autorizado")
+    high_water: int = Field(..., description="Último número reservado en un bloque")
+    valid_from: Optional[datetime] = Field(None, description="Inicio de vigencia")
+    valid_to: Optional[datetime] = Field(None, description="Fin de vigencia")
+    created_at: datetime = Field(..., description="Fecha de registro del rango")
+
+# Números entregados por el asignador
+class InvoiceNumbersResponse(BaseModel):
+    range_id: str
+    numbers: List[str]
@@ -1,6 +1,7 @@
 # src/schemas/nomina_schema.py
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import AliasChoices, BaseModel, Field
+from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum
 from typing import List, Optional
 
@@ -12,45 +13,40 @@ class ContractType(str, Enum):
     INDEFINIDO = "indefinido"
     APRENDIZ = "aprendiz"
 class NominaCreate(BaseModel):
-    id_user: str
+    id_user: Optional[str] = Field(None, description="Se ignora: la nómina queda asociada al usuario del token")
     contract_type: ContractType
-    period: str = Field(..., regex=r'^\d{4}-\d{2}$')
+    period: str = Field(..., pattern=r'^\d{4}-\d{2}$')
     employee_id: str
     employee_name: str
-    base_salary: float
-    transport_allowance: float = 0.0
-    days_worked: float
-    night_hours: float = 0.0
-    extra_day_hours: float = 0.0
-    extra_night_hours: float = 0.0
-    sunday_hours: float = 0.0
-    holiday_hours: float = 0.0
-    deductions: float = 0.0
+    email: str
+    cargo: Optional[str] = None
+    base_salary: Decimal = Field(..., gt=0, decimal_places=2)
+    transport_allowance: Optional[Decimal] = Field(None, ge=0, description="Si se omite se calcula según el SMLV")
+    days_worked: Decimal = Field(..., ge=0, le=30, decimal_places=2)
+    night_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    extra_day_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    extra_night_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    sunday_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    holiday_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    deductions: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
     other_concepts: Optional[List[str]] = None
 
-# Modelo de solicitud para crear una nómina
-class NominaRequest(BaseModel):
-    id_user: str = Field(..., description="ID del usuario (contador) asociado a la nómina")
-    contract_type: ContractType = Field(..., description="Tipo de contrato (obra_labor, prestacion_servicios, fijo, indefinido, aprendiz)")
-    period: str = Field(..., description="Periodo de la nómina (formato YYYY-MM)")
-    employee_name: str = Field(..., description="Nombre del empleado")
-    salary: float = Field(..., description="Salario bruto del empleado")
-    deductions: float = Field(default=0.0, description="Deducciones (sanciones, descuentos, etc.)")
-    email: str = Field(..., description="Correo electrónico del empleado")
-    contributions: float = Field(..., description="Aportes (salud, pensión, ARL, etc.)")
-
 # Modelo de respuesta para la nómina
+# (los campos renombrados en el modelo se leen con su nombre de columna)
 class NominaResponse(NominaCreate):
     id: str
-    health_contribution: float
-    pension_contribution: float
-    solidarity_pension_fund: float
-    total_gross: float
-    total_net: float
+    id_user: str
+    base_salary: Decimal = Field(..., validation_alias=AliasChoices("base_salary", "salario_base"))
+    transport_allowance: Decimal = Field(Decimal("0"), validation_alias=AliasChoices("transport_allowance", "transporte"))
+    health_contribution: Decimal
+    pension_contribution: Decimal
+    solidarity_pension_fund: Decimal
+    total_gross: Decimal = Field(..., validation_alias=AliasChoices("total_gross", "total_ingresos"))
+    total_net: Decimal = Field(..., validation_alias=AliasChoices("total_net", "total_neto"))
     is_paid: bool
-    payment_date: Optional[date]
+    payment_date: Optional[datetime]
     pdf_url: Optional[str]
-    created_at: datetime
+    created_at: datetime = Field(..., validation_alias=AliasChoices("created_at", "createdAt"))
 
     class Config:
         schema_extra = {
@@ -63,4 +59,46 @@ class NominaResponse(NominaCreate):
                 "salario_base": 2500000,
                 # ... etc ...
             }
-        }
\ No newline at end of file
+        }
+
+# Empleado dentro de una liquidación masiva de nómina
+class PayRunEmployee(BaseModel):
+    employee_id: str = Field(..., description="Cédula del empleado")
+    employee_name: str = Field(..., description="Nombre del empleado")
+    email: str = Field(..., description="Correo electrónico del empleado")
+    cargo: Optional[str] = Field(None, description="Cargo del empleado")
+    contract_type: ContractType = Field(..., description="Tipo de contrato")
+    base_salary: Decimal = Field(..., gt=0, decimal_places=2, description="Salario base mensual")
+    days_worked: Decimal = Field(Decimal("30"), ge=0, le=30, decimal_places=2, description="Días trabajados en el periodo")
+    night_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    extra_day_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    extra_night_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    sunday_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    holiday_hours: Decimal = Field(Decimal("0"), ge=0, decimal_places=2)
+    transport_allowance: Optional[Decimal] = Field(None, ge=0, description="Auxilio de transporte (si se omite se calcula según el SMLV)")
+    deductions: Decimal = Field(Decimal("0"), ge=0, decimal_places=2, description="Otros descuentos")
+    other_concepts: Optional[List[str]] = None
+
+# Modelo de solicitud para liquidar la nómina de toda la empresa en un periodo
+class PayRunRequest(BaseModel):
+    id_user: Optional[str] = Field(None, description="Se ignora: las nóminas quedan asociadas al usuario del token")
+    period: str = Field(..., pattern=r'^\d{4}-\d{2}$', description="Periodo de la nómina (formato YYYY-MM)")
+    employees: List[PayRunEmployee] = Field(..., min_length=1, description="Empleados a liquidar")
+
+class PayRunItem(BaseModel):
+    id: str
+    employee_id: str
+    total_ingresos: Decimal
+    total_deducciones: Decimal
+    total_neto: Decimal
+
+# Modelo de respuesta de la liquidación masiva
+class PayRunResponse(BaseModel):
+    id_user: str
+    period: str
+    count: int
+    total_ingresos: Decimal
+    total_deducciones: Decimal
+    total_neto: Decimal
+    nominas: List[PayRunItem]
+    pdf_job_id: Optional[str] = Field(None, description="Trabajo de generación de PDFs (si se pidió generar_pdf)")
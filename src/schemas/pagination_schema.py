@@ -0,0 +1,10 @@
+# src/schemas/pagination_schema.py
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+# Modelo de respuesta para los listados paginados por cursor
+class PageResponse(BaseModel):
+    items: List[Dict[str, Any]] = Field(..., description="Registros de la página con los campos solicitados")
+    next_cursor: Optional[str] = Field(None, description="Cursor para pedir la siguiente página (None si es la última)")
+    limit: int = Field(..., description="Tamaño de la página")
+    total: Optional[int] = Field(None, description="Total de registros (solo si include_total=true)")
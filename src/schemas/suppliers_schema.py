@@ -1,6 +1,7 @@
 # src/schemas/suppliers_schema.py
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 from enum import Enum
 
 # Enums para validar los tipos de datos
@@ -25,7 +26,7 @@ class Status(str, Enum):
 
 # Modelo de solicitud para crear un proveedor
 class SupplierRequest(BaseModel):
-    id_user: str = Field(..., description="ID del usuario (contador) asociado al proveedor")
+    id_user: Optional[str] = Field(None, description="Se ignora: el proveedor queda asociado al usuario del token")
     name: str = Field(..., description="Nombre del proveedor")
     person_type: PersonType = Field(..., description="Tipo de persona (Natural, Jurídica, Empresa)")
     tax_id: str = Field(..., description="NIT o Cédula con dígito de verificación")
@@ -1,5 +1,5 @@
 # src/schemas/taxes_schema.py
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from datetime import datetime
 
 # Modelo de solicitud para crear un impuesto
@@ -20,4 +20,4 @@ class TaxResponse(BaseModel):
     withholding_tax_1: str = Field(..., description="Retención en la fuente 1 (Sí/No)")
     withholding_tax_varying: str = Field(..., description="Retención en la fuente variable (Sí/No)")
     commercial_debtors: str = Field(..., description="Deudores comerciales (Sí/No)")
-    created_at: datetime = Field(..., description="Fecha de creación del impuesto")
\ No newline at end of file
+    created_at: datetime = Field(..., validation_alias=AliasChoices("created_at", "createdAt"), description="Fecha de creación del impuesto")
\ No newline at end of file
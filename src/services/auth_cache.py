@@ -0,0 +1,162 @@
+# src/services/auth_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.register import User
+
+# Campos del usuario que, al cambiar, invalidan sus tokens y su resumen en caché
+USER_AUTH_FIELDS = ("status", "password_hash", "email", "first_name", "last_name", "permissions")
+
+
+def token_digest(token: str) -> str:
+    """Clave de caché del token: no se guarda el token en claro."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con vencimiento por entrada. Cada entrada vence en su propio
+    expires_at (ej. el exp del token) o a los ttl segundos, lo que ocurra primero.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # clave -> (valor, vence, grupo)
+        self._groups: Dict[str, Set[str]] = {}  # grupo (email) -> claves, para invalidar por usuario
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, group: Optional[str] = None, expires_at: Optional[float] = None) -> None:
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, deadline, group)
+            if group is not None:
+                self._groups.setdefault(group, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            keys = self._groups.get(entry[2])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[entry[2]]
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_group(self, group: str) -> None:
+        with self._lock:
+            for key in list(self._groups.get(group, ())):
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# Claims de tokens ya verificados (clave: digest del token, grupo: email del sub)
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+# Resumen del usuario resuelto por email (clave y grupo: email)
+user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def get_cached_claims(token: str) -> Optional[Dict[str, Any]]:
+    return token_cache.get(token_digest(token))
+
+
+def cache_claims(token: str, claims: Dict[str, Any]) -> None:
+    """Guarda los claims verificados hasta el exp del token (como máximo AUTH_CACHE_TTL_SECONDS)."""
+    exp = claims.get("exp")
+    token_cache.set(token_digest(token), claims, group=claims.get("sub"),
+                    expires_at=float(exp) if exp is not None else None)
+
+
+def user_summary(user: User) -> Dict[str, Any]:
+    return {
+        "id": str(user.id),
+        "email": user.email,
+        "name": f"{user.first_name} {user.last_name}",
+        "status": user.status,
+        "permissions": user.permissions,
+    }
+
+
+def get_user_summary(db: Session, email: str) -> Optional[Dict[str, Any]]:
+    """Resumen del usuario desde la caché; solo consulta la base de datos si no está."""
+    summary = user_cache.get(email)
+    if summary is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            return None
+        summary = user_summary(user)
+        user_cache.set(email, summary, group=email)
+    return summary
+
+
+def invalidate_user(email: str) -> None:
+    """Descarta los tokens y el resumen en caché del usuario."""
+    token_cache.invalidate_group(email)
+    user_cache.invalidate_group(email)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target):
+    state = sa_inspect(target)
+    changed = [field for field in USER_AUTH_FIELDS if state.attrs[field].history.has_changes()]
+    if not changed:
+        return
+    emails = {target.email}
+    if "email" in changed:
+        emails.update(state.attrs.email.history.deleted or ())
+    for email in emails:
+        invalidate_user(email)
+    # Se invalida otra vez tras el commit: una petición concurrente pudo volver a
+    # guardar en caché el estado anterior entre el flush y el commit
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("auth_invalidated_emails", set()).update(emails)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_user(target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for email in session.info.pop("auth_invalidated_emails", ()):
+        invalidate_user(email)
@@ -1,22 +1,20 @@
-import jwt  # PyJWT
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
-from ..utils.security import verify_password
 from ..config import settings 
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from src.models.register import User
 from src.models.login import Login
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.services.password_service import check_password, hash_password, password_hasher
+from src.services.jwt_service import jwt_core
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña plana coincide con el hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(hashed_password, plain_password)
 
 def get_password_hash(password: str) -> str:
     """Genera un hash de la contraseña"""
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def authenticate_user(db: Session, email: str, password: str):
     user = db.query(User).filter(User.email == email).first()
@@ -24,34 +22,37 @@ def authenticate_user(db: Session, email: str, password: str):
         return None
     return user
 
+def _find_user_detached(db: Session, email: str):
+    user = db.query(User).filter(User.email == email).first()
+    if user:
+        # Libera la conexión mientras se verifica: con muchos logins simultáneos, retenerla
+        # durante el hash agota el pool y bloquea a los demás esperando una conexión.
+        db.expunge(user)
+        db.commit()
+    return user
+
+def _save_password_hash(db: Session, user_id, new_hash: str) -> None:
+    db.query(User).filter(User.id == user_id).update({"password_hash": new_hash}, synchronize_session=False)
+    db.commit()
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """
+    Igual que authenticate_user, pero la verificación corre en el pool de hash y las
+    consultas en el threadpool (nada bloquea el event loop). Si el hash usa parámetros
+    antiguos se actualiza en el mismo login.
+    :raises PasswordHasherBusy: Si el pool de hash está saturado.
+    """
+    user = await run_in_threadpool(_find_user_detached, db, email)
+    if not user:
+        return None
+
+    valid, new_hash = await password_hasher.verify_and_rehash(user.password_hash, password)
+    if not valid:
+        return None
+    if new_hash:
+        await run_in_threadpool(_save_password_hash, db, user.id, new_hash)
+        user.password_hash = new_hash
+    return user
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-
-def decode_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token expirado")
-    except jwt.InvalidTokenError:
-        raise ValueError("Token inválido")
-
-def verify_token(token: str) -> dict:
-    """Verifica y decodifica un token JWT"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token expirado")
-    except jwt.InvalidTokenError:
-        raise ValueError("Token inválido")
\ No newline at end of file
+    return jwt_core.issue(data, expires_delta)
\ No newline at end of file
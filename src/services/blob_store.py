@@ -0,0 +1,268 @@
+# src/services/blob_store.py
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.blob import Blob
+from .storage_backend import StorageBackend, create_storage_backend
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: Any) -> bool:
+    return isinstance(value, str) and bool(_DIGEST_RE.match(value))
+
+
+def file_digest(path: str) -> Tuple[str, int]:
+    """SHA-256 y tamaño de un archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+class BlobStore:
+    """
+    Almacén de archivos por contenido: cada archivo se guarda una sola vez con su SHA-256
+    como clave en el backend (src/services/storage_backend.py) y las tablas guardan solo el
+    digest. Subir un archivo que ya existe es una consulta, sin escribirlo de nuevo.
+    Las referencias se cuentan en la tabla blobs dentro de la transacción del llamador
+    (add_refs / release), así que quedan consistentes con las filas que las usan; collect()
+    borra los archivos sin referencias tras grace_seconds.
+    """
+
+    def __init__(self, backend: StorageBackend, staging_dir: str, grace_seconds: int,
+                 session_factory=SessionLocal):
+        self.backend = backend
+        # Temporales locales mientras se recibe un archivo (con el backend local, en el mismo disco)
+        self.tmp_dir = staging_dir
+        self.grace_seconds = grace_seconds
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _check(digest: str) -> str:
+        """:raises ValueError: Si el digest no es un SHA-256 en hexadecimal (evita claves arbitrarias)."""
+        if not is_digest(digest):
+            raise ValueError(f"Digest inválido: {digest!r}")
+        return digest
+
+    def path(self, digest: str) -> str:
+        """
+        Ruta local del archivo (para adjuntarlo a un correo, por ejemplo).
+        :raises ValueError: Si el digest no es válido o el backend no es local.
+        """
+        path = self.backend.local_path(self._check(digest))
+        if path is None:
+            raise ValueError(f"El backend {self.backend.name} no tiene rutas locales")
+        return path
+
+    def exists(self, digest: str) -> bool:
+        return self.backend.exists(self._check(digest))
+
+    def size(self, digest: str) -> int:
+        return self.backend.size(self._check(digest))
+
+    def open(self, digest: str):
+        """Archivo binario del blob, con seek. :raises FileNotFoundError:"""
+        return self.backend.open(self._check(digest))
+
+    def new_tmp_path(self) -> str:
+        """Ruta temporal para escribir un archivo antes de ingresarlo."""
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4()}.part")
+
+    def put_file(self, source: str, digest: Optional[str] = None, move: bool = True) -> Tuple[str, int]:
+        """
+        Ingresa un archivo al almacén (no cuenta referencias: ver add_refs).
+        :param digest: SHA-256 ya calculado (ej. mientras se recibía); si no, se calcula.
+        :param move: Mover el archivo (True) o dejar el original en su sitio (False).
+        :return: (digest, tamaño).
+        """
+        if digest is None:
+            digest, size = file_digest(source)
+        else:
+            size = os.path.getsize(source)
+        # touch: si ya existía, el recolector no lo toma por huérfano mientras se confirma la referencia
+        if self.backend.touch(self._check(digest)):
+            if move:
+                os.remove(source)  # contenido repetido: no se escribe de nuevo
+        else:
+            self.backend.put_file(digest, source, move)
+        return digest, size
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        """Ingresa un contenido en memoria. :return: (digest, tamaño)."""
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.backend.touch(digest):
+            tmp_path = self.new_tmp_path()
+            with open(tmp_path, "wb") as tmp_file:
+                tmp_file.write(data)
+            self.backend.put_file(digest, tmp_path, move=True)
+        return digest, len(data)
+
+    # --- Referencias (en la transacción del llamador, sin commit) ---
+
+    def add_refs(self, db: Session, blobs: Iterable[Tuple[str, int, Optional[str]]]) -> None:
+        """
+        Suma una referencia por cada (digest, tamaño, content_type); crea las filas que falten.
+        Es un solo INSERT ... ON CONFLICT DO UPDATE para todo el lote.
+        """
+        counts: Counter = Counter()
+        info: Dict[str, Tuple[int, Optional[str]]] = {}
+        for digest, size, content_type in blobs:
+            counts[digest] += 1
+            info[digest] = (size, content_type)
+        if not counts:
+            return
+        now = datetime.utcnow()
+        rows = [{"digest": digest, "size": info[digest][0], "content_type": info[digest][1],
+                 "refcount": count, "created_at": now, "updated_at": now} for digest, count in counts.items()]
+        dialect = db.get_bind(mapper=Blob.__mapper__).dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = insert(Blob).values(rows)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["digest"],
+                set_={"refcount": Blob.refcount + statement.excluded.refcount,
+                      "updated_at": statement.excluded.updated_at},
+            ))
+            return
+        for row in rows:
+            updated = db.query(Blob).filter(Blob.digest == row["digest"]).update(
+                {"refcount": Blob.refcount + row["refcount"], "updated_at": now}, synchronize_session=False
+            )
+            if not updated:
+                db.add(Blob(**row))
+        db.flush()
+
+    def release(self, db: Session, digests: Iterable[Optional[str]]) -> None:
+        """Quita una referencia por cada digest (los None se ignoran). Una actualización por cantidad distinta."""
+        counts = Counter(digest for digest in digests if digest)
+        by_amount: Dict[int, List[str]] = {}
+        for digest, count in counts.items():
+            by_amount.setdefault(count, []).append(digest)
+        now = datetime.utcnow()
+        for amount, group in by_amount.items():
+            db.query(Blob).filter(Blob.digest.in_(group)).update(
+                {"refcount": Blob.refcount - amount, "updated_at": now}, synchronize_session=False
+            )
+
+    # --- Recolección ---
+
+    def collect(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Borra los blobs sin referencias desde hace más de grace_seconds, los archivos que
+        quedaron sin fila (ej. una transacción que no se confirmó) y los temporales viejos.
+        :return: Conteo de archivos borrados por tipo.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.grace_seconds)
+        cutoff_ts = time.time() - self.grace_seconds
+        removed = {"unreferenced": 0, "orphaned": 0, "temporary": 0}
+        db = self.session_factory()
+        try:
+            while True:
+                candidates = [digest for (digest,) in db.query(Blob.digest).filter(
+                    Blob.refcount <= 0, Blob.updated_at < cutoff
+                ).limit(batch_size)]
+                if not candidates:
+                    break
+                # Se repite la condición: una fila que recibió una referencia mientras tanto no se borra
+                db.query(Blob).filter(
+                    Blob.digest.in_(candidates), Blob.refcount <= 0, Blob.updated_at < cutoff
+                ).delete(synchronize_session=False)
+                db.commit()
+                kept = {digest for (digest,) in db.query(Blob.digest).filter(Blob.digest.in_(candidates))}
+                for digest in candidates:
+                    if digest in kept:
+                        continue
+                    # Un put_file posterior hace touch antes de volver a crear la fila: ese archivo
+                    # se está reutilizando y no se borra (si quedó sin fila, lo recoge la pasada de huérfanos)
+                    modified_at = self.backend.modified_at(digest)
+                    if modified_at is not None and modified_at >= cutoff_ts:
+                        continue
+                    if self.backend.delete(digest):
+                        removed["unreferenced"] += 1
+                if len(candidates) < batch_size:
+                    break
+
+            batch: List[str] = []
+            for key in self.backend.iter_keys(cutoff_ts, removed):
+                if not is_digest(key):
+                    continue
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    removed["orphaned"] += self._remove_orphans(db, batch)
+                    batch = []
+            removed["orphaned"] += self._remove_orphans(db, batch)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return removed
+
+    def collect_in_background(self) -> threading.Thread:
+        """Ejecuta collect() en un hilo aparte (recorre el almacén en disco) y registra el resultado."""
+        def run():
+            try:
+                removed = self.collect()
+                if any(removed.values()):
+                    logger.info("Almacén de archivos: borrados %s", removed)
+            except Exception:
+                logger.exception("Error recolectando el almacén de archivos")
+
+        thread = threading.Thread(target=run, name="blob-collect", daemon=True)
+        thread.start()
+        return thread
+
+    def _remove_orphans(self, db: Session, digests: List[str]) -> int:
+        if not digests:
+            return 0
+        known = {digest for (digest,) in db.query(Blob.digest).filter(Blob.digest.in_(digests))}
+        return sum(1 for digest in digests if digest not in known and self.backend.delete(digest))
+
+    def stats(self) -> Dict[str, Any]:
+        """Blobs guardados y bytes ahorrados por deduplicación (referencias adicionales al mismo contenido)."""
+        db = self.session_factory()
+        try:
+            count, stored, referenced, references = db.query(
+                func.count(Blob.digest),
+                func.coalesce(func.sum(Blob.size), 0),
+                func.coalesce(func.sum(Blob.size * Blob.refcount), 0),
+                func.coalesce(func.sum(Blob.refcount), 0),
+            ).one()
+        finally:
+            db.close()
+        return {
+            "blobs": count,
+            "references": references,
+            "stored_bytes": stored,
+            "referenced_bytes": referenced,
+            "saved_bytes": max(0, referenced - stored),
+        }
+
+
+blob_store = BlobStore(
+    create_storage_backend(settings.BLOB_STORAGE_BACKEND, settings.BLOB_STORE_DIR),
+    staging_dir=os.path.join(settings.BLOB_STORE_DIR, ".tmp"),
+    grace_seconds=settings.BLOB_GC_GRACE_SECONDS,
+)
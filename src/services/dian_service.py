@@ -7,14 +7,15 @@ import uuid
 import qrcode # type: ignore
 import base64
 
-def generate_cufe(invoice_data):
+def generate_cufe(invoice_data, issued_at=None):
     """
     Genera el Código Único de Factura Electrónica (CUFE) según especificaciones DIAN
+    :param issued_at: Fecha de expedición (por defecto, ahora).
     """
     # Datos requeridos para el CUFE
     required_data = {
         'invoice_number': invoice_data['invoice_number'],
-        'issue_date': datetime.now().strftime('%Y-%m-%d'),
+        'issue_date': (issued_at or datetime.now()).strftime('%Y-%m-%d'),
         'total': str(invoice_data['total']),
         'client_id': invoice_data['client_id'],
         'company_nit': '123456789-1',  # Reemplazar con NIT real de la empresa
@@ -28,21 +29,28 @@ def generate_cufe(invoice_data):
     
     return cufe
 
-def generate_qr_code(invoice_data):
+def qr_payload(invoice_data, cufe, issued_at=None):
     """
-    Genera el código QR con los datos de la factura según requerimientos DIAN
+    Contenido (JSON) del código QR de la factura, con el CUFE ya calculado
     """
     qr_data = {
         'id': str(uuid.uuid4()),
         'invoice_number': invoice_data['invoice_number'],
-        'issue_date': datetime.now().isoformat(),
-        'total': invoice_data['total'],
-        'total_taxes': invoice_data.get('total_taxes', 0),
-        'cufe': generate_cufe(invoice_data),
+        'issue_date': (issued_at or datetime.now()).isoformat(),
+        'total': str(invoice_data['total']),
+        'total_taxes': str(invoice_data.get('total_taxes', 0)),
+        'cufe': cufe,
         'company_nit': '123456789-1',  # Reemplazar con NIT real
         'company_name': 'Nombre de la Empresa'  # Reemplazar con nombre real
     }
-    
+    return json.dumps(qr_data)
+
+def generate_qr_code(invoice_data, cufe=None):
+    """
+    Genera el código QR con los datos de la factura según requerimientos DIAN (PNG en base64).
+    Para lotes de facturas usar services/invoice_code_service.py
+    :param cufe: CUFE ya calculado (si no, se calcula).
+    """
     # Generar QR
     qr = qrcode.QRCode(
         version=1,
@@ -50,7 +58,7 @@ def generate_qr_code(invoice_data):
         box_size=10,
         border=4,
     )
-    qr.add_data(json.dumps(qr_data))
+    qr.add_data(qr_payload(invoice_data, cufe or generate_cufe(invoice_data)))
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
@@ -0,0 +1,578 @@
+# src/services/email_outbox.py
+import base64
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage as MimeMessage
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.email_outbox import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class EmailTransportError(Exception):
+    """Error temporal del proveedor (red, 429, 5xx): el correo se reintenta."""
+
+
+class EmailPermanentError(EmailTransportError):
+    """El proveedor rechazó el correo (ej. dirección inválida): no se reintenta."""
+
+
+class OutgoingEmail:
+    """Datos de un correo listos para el transporte, sin depender de la sesión de base de datos."""
+
+    __slots__ = ("id", "to_email", "to_name", "subject", "body_text", "body_html", "template_id", "template_data",
+                 "attachments")
+
+    def __init__(self, id: str, to_email: str, to_name: Optional[str] = None, subject: Optional[str] = None,
+                 body_text: Optional[str] = None, body_html: Optional[str] = None,
+                 template_id: Optional[str] = None, template_data: Optional[Dict[str, Any]] = None,
+                 attachments: Optional[List[Dict[str, str]]] = None):
+        self.id = id
+        self.to_email = to_email
+        self.to_name = to_name
+        self.subject = subject
+        self.body_text = body_text
+        self.body_html = body_html
+        self.template_id = template_id
+        self.template_data = template_data
+        self.attachments = attachments or []
+
+    @classmethod
+    def from_row(cls, row: EmailOutbox) -> "OutgoingEmail":
+        return cls(row.id, row.to_email, row.to_name, row.subject, row.body_text, row.body_html,
+                   row.template_id, row.template_data, row.attachments)
+
+    def read_attachments(self) -> List[Tuple[str, str, bytes]]:
+        """
+        Contenido de los adjuntos, leído al enviar.
+        :return: Lista de (nombre, tipo MIME, bytes).
+        :raises EmailPermanentError: Si un archivo ya no existe.
+        """
+        files = []
+        for attachment in self.attachments:
+            try:
+                with open(attachment["path"], "rb") as attached:
+                    content = attached.read()
+            except OSError as e:
+                raise EmailPermanentError(f"Adjunto no disponible: {attachment['path']}") from e
+            files.append((attachment.get("filename") or os.path.basename(attachment["path"]),
+                          attachment.get("content_type") or "application/octet-stream", content))
+        return files
+
+    def to_mime(self, sender: str) -> MimeMessage:
+        message = MimeMessage()
+        message["From"] = sender
+        message["To"] = f"{self.to_name} <{self.to_email}>" if self.to_name else self.to_email
+        message["Subject"] = self.subject or ""
+        message["Message-ID"] = f"<{self.id}@outbox>"
+        message.set_content(self.body_text or "")
+        if self.body_html:
+            message.add_alternative(self.body_html, subtype="html")
+        for filename, content_type, content in self.read_attachments():
+            maintype, _, subtype = content_type.partition("/")
+            message.add_attachment(content, maintype=maintype, subtype=subtype or "octet-stream", filename=filename)
+        return message
+
+
+class SendGridTransport:
+    """
+    API v3 de SendGrid sobre una sola conexión HTTPS persistente (keep-alive), reutilizada entre
+    envíos y lotes. Los correos con la misma plantilla y sin adjuntos se envían en una sola
+    petición con una personalización por destinatario (hasta 1000); en SendGrid los adjuntos
+    son de la petición completa, así que los correos con adjuntos van uno por petición.
+    """
+
+    HOST = "api.sendgrid.com"
+    MAX_PERSONALIZATIONS = 1000
+
+    def __init__(self, api_key: str, sender: str, sender_name: str = "Soporte Sistema Contable", timeout: float = 10):
+        self.api_key = api_key
+        self.sender = {"email": sender, "name": sender_name}
+        self.timeout = timeout
+        self._connection: Optional[http.client.HTTPSConnection] = None
+        self.requests = 0
+
+    def _post(self, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPSConnection(self.HOST, timeout=self.timeout)
+            try:
+                self._connection.request("POST", "/v3/mail/send", body=payload, headers=headers)
+                response = self._connection.getresponse()
+                detail = response.read().decode("utf-8", "replace")
+                self.requests += 1
+                break
+            except (http.client.HTTPException, OSError) as e:
+                # La conexión reutilizada pudo cerrarse del lado del servidor: se reconecta una vez
+                self.close()
+                if attempt:
+                    raise EmailTransportError(f"SendGrid no disponible: {e}") from e
+        if response.status < 300:
+            return
+        if response.status == 429 or response.status >= 500:
+            raise EmailTransportError(f"SendGrid {response.status}: {detail}")
+        raise EmailPermanentError(f"SendGrid {response.status}: {detail}")
+
+    def _personalization(self, message: OutgoingEmail) -> Dict[str, Any]:
+        to = {"email": message.to_email}
+        if message.to_name:
+            to["name"] = message.to_name
+        personalization: Dict[str, Any] = {"to": [to]}
+        if message.template_data:
+            personalization["dynamic_template_data"] = message.template_data
+        return personalization
+
+    def _send_single(self, message: OutgoingEmail) -> None:
+        body: Dict[str, Any] = {"from": self.sender, "personalizations": [self._personalization(message)]}
+        if message.template_id:
+            body["template_id"] = message.template_id
+        else:
+            body["subject"] = message.subject or ""
+            body["content"] = [{"type": "text/plain", "value": message.body_text or ""}]
+            if message.body_html:
+                body["content"].append({"type": "text/html", "value": message.body_html})
+        if message.attachments:
+            body["attachments"] = [
+                {"content": base64.b64encode(content).decode("ascii"), "filename": filename,
+                 "type": content_type, "disposition": "attachment"}
+                for filename, content_type, content in message.read_attachments()
+            ]
+        self._post(body)
+
+    def send_batch(self, messages: List[OutgoingEmail]) -> Dict[str, Optional[Exception]]:
+        results: Dict[str, Optional[Exception]] = {}
+        by_template: Dict[str, List[OutgoingEmail]] = {}
+        for message in messages:
+            if message.template_id and not message.attachments:
+                by_template.setdefault(message.template_id, []).append(message)
+            else:
+                results[message.id] = self._send_or_error(message)
+
+        for template_id, group in by_template.items():
+            for start in range(0, len(group), self.MAX_PERSONALIZATIONS):
+                chunk = group[start:start + self.MAX_PERSONALIZATIONS]
+                try:
+                    self._post({
+                        "from": self.sender,
+                        "template_id": template_id,
+                        "personalizations": [self._personalization(message) for message in chunk],
+                    })
+                    results.update((message.id, None) for message in chunk)
+                except EmailPermanentError as e:
+                    if len(chunk) == 1:
+                        results[chunk[0].id] = e
+                        continue
+                    # Una dirección inválida rechaza la petición completa: se envían uno a uno para aislarla
+                    results.update((message.id, self._send_or_error(message)) for message in chunk)
+                except EmailTransportError as e:
+                    results.update((message.id, e) for message in chunk)
+        return results
+
+    def _send_or_error(self, message: OutgoingEmail) -> Optional[Exception]:
+        try:
+            self._send_single(message)
+            return None
+        except EmailTransportError as e:
+            return e
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class SMTPTransport:
+    """SMTP con una conexión abierta que se reutiliza entre lotes (se verifica con NOOP)."""
+
+    def __init__(self, server: str, port: int, use_tls: bool, username: str, password: str, sender: str,
+                 timeout: float = 10):
+        self.server = server
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls(context=ssl.create_default_context())
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+        return smtp
+
+    def send_batch(self, messages: List[OutgoingEmail]) -> Dict[str, Optional[Exception]]:
+        results: Dict[str, Optional[Exception]] = {}
+        for message in messages:
+            try:
+                self._connection().send_message(message.to_mime(self.sender))
+                results[message.id] = None
+            except EmailPermanentError as e:
+                results[message.id] = e
+            except smtplib.SMTPRecipientsRefused as e:
+                results[message.id] = EmailPermanentError(f"Destinatario rechazado: {e.recipients}")
+            except smtplib.SMTPResponseException as e:
+                error_class = EmailPermanentError if 500 <= e.smtp_code < 600 else EmailTransportError
+                results[message.id] = error_class(f"SMTP {e.smtp_code}: {e.smtp_error!r}")
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                results[message.id] = EmailTransportError(f"SMTP no disponible: {e}")
+        return results
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class LocalTransport:
+    """
+    Sustituto local de SMTP para desarrollo y pruebas: no sale a la red. Guarda los últimos
+    correos en memoria (sent) y, si hay directorio, cada uno como archivo .eml.
+    """
+
+    def __init__(self, directory: Optional[str] = None, sender: str = "no-reply@localhost", keep: int = 1000):
+        self.directory = directory
+        self.sender = sender
+        self.sent: Deque[OutgoingEmail] = deque(maxlen=keep)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send_batch(self, messages: List[OutgoingEmail]) -> Dict[str, Optional[Exception]]:
+        results: Dict[str, Optional[Exception]] = {}
+        for message in messages:
+            try:
+                mime = message.to_mime(self.sender)
+            except EmailPermanentError as e:
+                results[message.id] = e
+                continue
+            if self.directory:
+                with open(os.path.join(self.directory, f"{message.id}.eml"), "wb") as eml:
+                    eml.write(mime.as_bytes())
+            self.sent.append(message)
+            results[message.id] = None
+        return results
+
+    def close(self) -> None:
+        pass
+
+
+def create_transport(name: str = ""):
+    """Transporte según EMAIL_TRANSPORT (o el disponible si está vacío)."""
+    if not name:
+        name = "sendgrid" if settings.SENDGRID_API_KEY else "smtp" if settings.MAIL_USERNAME else "local"
+    if name == "sendgrid":
+        return SendGridTransport(settings.SENDGRID_API_KEY, settings.EMAIL_FROM)
+    if name == "smtp":
+        return SMTPTransport(settings.MAIL_SERVER, settings.MAIL_PORT, settings.MAIL_USE_TLS, settings.MAIL_USERNAME,
+                             settings.MAIL_PASSWORD, settings.MAIL_DEFAULT_SENDER or settings.EMAIL_FROM)
+    if name == "local":
+        return LocalTransport(settings.EMAIL_LOCAL_DIR, settings.EMAIL_FROM or "no-reply@localhost")
+    raise ValueError(f"EMAIL_TRANSPORT inválido: {name}")
+
+
+class EmailDispatcher:
+    """
+    Hilo de fondo que envía el outbox por lotes: toma hasta batch_size correos vencidos, los
+    reclama (status sending, con un lease por si el proceso muere), los envía sin retener la
+    conexión a la base de datos y guarda el resultado de todos con un solo bulk update.
+    Los errores temporales se reintentan con espera exponencial (retry_base * 2^intentos, con
+    jitter, hasta retry_max) y tras max_attempts el correo queda en failed.
+    Cada lote se reparte en hasta concurrency partes que se envían en paralelo, cada una con
+    un transporte de un pool (conexiones persistentes, creadas a medida que se necesitan).
+    Al quedar sent o failed se borra el contenido del correo (cuerpos y template_data pueden
+    llevar enlaces o tokens de un solo uso), y las filas más antiguas que retention_days se
+    eliminan (purge, como mucho una vez cada PURGE_INTERVAL_SECONDS).
+    """
+
+    LEASE_SECONDS = 300
+    PURGE_INTERVAL_SECONDS = 3600
+    PURGE_BATCH_SIZE = 500
+    # Contenido que se borra de la fila cuando el correo ya no se va a enviar
+    SCRUBBED_FIELDS = {"body_text": None, "body_html": None, "template_data": None}
+
+    def __init__(self, transport_factory, batch_size: int, interval: float, max_attempts: int,
+                 retry_base: int, retry_max: int, concurrency: int = 1, retention_days: int = 0,
+                 session_factory=SessionLocal):
+        self.transport_factory = transport_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.concurrency = max(1, concurrency)
+        self.retention_days = retention_days
+        self.session_factory = session_factory
+        self._last_purge = 0.0
+        self._transports: "queue.LifoQueue" = queue.LifoQueue()
+        self._all_transports: List[Any] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.purged = 0
+
+    def _acquire_transport(self):
+        try:
+            return self._transports.get_nowait()
+        except queue.Empty:
+            transport = self.transport_factory()
+            with self._lock:
+                self._all_transports.append(transport)
+            return transport
+
+    def _send_chunk(self, messages: List[OutgoingEmail]) -> Dict[str, Optional[Exception]]:
+        """Envía una parte del lote con un transporte del pool; un fallo general afecta solo a esa parte."""
+        transport = self._acquire_transport()
+        try:
+            return transport.send_batch(messages)
+        except Exception as e:
+            logger.exception("El transporte de correo falló")
+            return {message.id: EmailTransportError(str(e)) for message in messages}
+        finally:
+            self._transports.put(transport)
+
+    def _send(self, messages: List[OutgoingEmail]) -> Dict[str, Optional[Exception]]:
+        workers = min(self.concurrency, len(messages))
+        if workers == 1:
+            return self._send_chunk(messages)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="email-send")
+        size = -(-len(messages) // workers)
+        results: Dict[str, Optional[Exception]] = {}
+        for chunk_results in self._executor.map(
+            self._send_chunk, [messages[i:i + size] for i in range(0, len(messages), size)]
+        ):
+            results.update(chunk_results)
+        return results
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Despierta al despachador (ej. tras encolar un correo) en lugar de esperar al intervalo."""
+        self.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            try:
+                while not self._stopping and self.dispatch_once() == self.batch_size:
+                    pass
+                if time.monotonic() - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    self.purge()
+            except Exception:
+                logger.exception("Error despachando el outbox de correos")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _claim(self, db: Session) -> Tuple[List[OutgoingEmail], Dict[str, int]]:
+        """Reclama un lote de correos vencidos. :return: (correos, intentos previos por id)."""
+        now = datetime.utcnow()
+        due = (EmailOutbox.status.in_(("pending", "sending")), EmailOutbox.next_attempt_at <= now)
+        ids = [row_id for (row_id,) in db.query(EmailOutbox.id).filter(*due)
+               .order_by(EmailOutbox.next_attempt_at).limit(self.batch_size)]
+        if not ids:
+            return [], {}
+        token = str(uuid.uuid4())
+        db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids), *due).update({
+            "status": "sending",
+            "claim_token": token,
+            "next_attempt_at": now + timedelta(seconds=self.LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        rows = db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).all()
+        return [OutgoingEmail.from_row(row) for row in rows], {row.id: row.attempts for row in rows}
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def dispatch_once(self) -> int:
+        """
+        Envía un lote de correos vencidos.
+        :return: Número de correos procesados (enviados, reintentados o fallidos).
+        """
+        with self._dispatch_lock:
+            db = self.session_factory()
+            try:
+                messages, attempts = self._claim(db)
+                db.close()  # no se retiene la conexión mientras se habla con el proveedor
+                if not messages:
+                    return 0
+                results = self._send(messages)
+
+                now = datetime.utcnow()
+                mappings = []
+                for message in messages:
+                    error = results.get(message.id, EmailTransportError("Sin resultado del transporte"))
+                    count = attempts[message.id] + 1
+                    mapping = {"id": message.id, "attempts": count, "claim_token": None}
+                    if error is None:
+                        mapping.update(status="sent", sent_at=now, last_error=None, **self.SCRUBBED_FIELDS)
+                        self.sent += 1
+                    elif isinstance(error, EmailPermanentError) or count >= self.max_attempts:
+                        mapping.update(status="failed", last_error=str(error), **self.SCRUBBED_FIELDS)
+                        self.failed += 1
+                    else:
+                        mapping.update(status="pending", last_error=str(error), next_attempt_at=now + self._backoff(count))
+                        self.retried += 1
+                    mappings.append(mapping)
+                db.bulk_update_mappings(EmailOutbox, mappings)
+                db.commit()
+                self.batches += 1
+                return len(messages)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def purge(self) -> int:
+        """
+        Borra el contenido de las filas sent y failed que todavía lo tengan (guardadas antes de
+        limpiarlo al enviar) y elimina por lotes las creadas hace más de retention_days.
+        :return: Filas eliminadas.
+        """
+        done = EmailOutbox.status.in_(("sent", "failed"))
+        removed = 0
+        db = self.session_factory()
+        try:
+            db.query(EmailOutbox).filter(done, or_(
+                EmailOutbox.body_text.isnot(None), EmailOutbox.body_html.isnot(None),
+                EmailOutbox.template_data.isnot(None),
+            )).update(self.SCRUBBED_FIELDS, synchronize_session=False)
+            db.commit()
+            if not self.retention_days:
+                return 0
+            old = (done, EmailOutbox.created_at < datetime.utcnow() - timedelta(days=self.retention_days))
+            while True:
+                ids = [row_id for (row_id,) in db.query(EmailOutbox.id).filter(*old).limit(self.PURGE_BATCH_SIZE)]
+                if not ids:
+                    break
+                removed += db.query(EmailOutbox).filter(EmailOutbox.id.in_(ids), *old) \
+                    .delete(synchronize_session=False)
+                db.commit()
+                if len(ids) < self.PURGE_BATCH_SIZE:
+                    break
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            self.purged += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        db = self.session_factory()
+        try:
+            by_status = dict(db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+        finally:
+            db.close()
+        with self._lock:
+            transports = [type(transport).__name__ for transport in self._all_transports]
+        return {
+            "transport": transports[0] if transports else None,
+            "open_transports": len(transports),
+            "concurrency": self.concurrency,
+            "outbox": by_status,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "purged": self.purged,
+            "retention_days": self.retention_days,
+        }
+
+    def shutdown(self) -> None:
+        """Detiene el hilo y cierra las conexiones de los transportes; lo pendiente queda en el outbox."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            transports, self._all_transports = self._all_transports, []
+        self._transports = queue.LifoQueue()
+        for transport in transports:
+            transport.close()
+
+
+email_dispatcher = EmailDispatcher(
+    lambda: create_transport(settings.EMAIL_TRANSPORT),
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    interval=settings.EMAIL_DISPATCH_INTERVAL_SECONDS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base=settings.EMAIL_RETRY_BASE_SECONDS,
+    retry_max=settings.EMAIL_RETRY_MAX_SECONDS,
+    concurrency=settings.EMAIL_CONCURRENCY,
+    retention_days=settings.EMAIL_OUTBOX_RETENTION_DAYS,
+)
+
+
+def enqueue_email(db: Session, to_email: str, subject: Optional[str] = None, body_text: Optional[str] = None,
+                  body_html: Optional[str] = None, to_name: Optional[str] = None, template_id: Optional[str] = None,
+                  template_data: Optional[Dict[str, Any]] = None, kind: Optional[str] = None,
+                  attachments: Optional[List[Dict[str, str]]] = None, job_id: Optional[str] = None,
+                  reference_id: Optional[str] = None) -> EmailOutbox:
+    """
+    Guarda un correo en el outbox y despierta al despachador; no espera al proveedor.
+    :param attachments: Archivos a adjuntar, [{"path", "filename", "content_type"}]; se leen al enviar.
+    :return: Fila creada (status pending).
+    """
+    row = EmailOutbox(to_email=to_email, to_name=to_name, subject=subject, body_text=body_text,
+                      body_html=body_html, template_id=template_id or None, template_data=template_data, kind=kind,
+                      attachments=attachments or None, job_id=job_id, reference_id=reference_id)
+    db.add(row)
+    db.commit()
+    email_dispatcher.wake()
+    return row
@@ -1,56 +1,29 @@
-
-from http.client import HTTPException
-import sendgrid
-import json
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sqlalchemy.orm import Session
 from ..config import settings
-from fastapi import HTTPException
-
-async def send_password_reset_email(email: str, token: str, user_name: str):
+from ..models.email_outbox import EmailOutbox
+from .email_outbox import enqueue_email
 
-    if not all([settings.EMAIL_FROM, settings.SENDGRID_TEMPLATE_ID]):
-        raise HTTPException(
-            status_code=500,
-            detail="Configuración de email incompleta"
-        )
-
-    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}" 
-    print(f"Enviando a: {email}")
-    print(f"Template ID: {settings.SENDGRID_TEMPLATE_ID}")
-    print(f"From: {settings.EMAIL_FROM}")
-    message = {
-        "from": {
-            "email": settings.EMAIL_FROM,
-            "name": "Soporte Sistema Contable"
+def send_password_reset_email(db: Session, email: str, token: str, user_name: str = "") -> EmailOutbox:
+    """
+    Encola el correo de restablecimiento de contraseña en el outbox; el despachador lo envía
+    en segundo plano (plantilla de SendGrid si hay SENDGRID_TEMPLATE_ID, texto plano si no).
+    :return: Fila del outbox (status pending).
+    """
+    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
+    return enqueue_email(
+        db,
+        to_email=email,
+        to_name=user_name or None,
+        subject="Restablecimiento de contraseña",
+        body_text=(
+            f"Hola {user_name},\n\n"
+            f"Para restablecer tu contraseña ingresa al siguiente enlace:\n{reset_url}\n\n"
+            "Si no solicitaste el cambio, ignora este correo."
+        ),
+        template_id=settings.SENDGRID_TEMPLATE_ID,
+        template_data={
+            "nombre_usuario": user_name,
+            "reset_link": reset_url
         },
-        "personalizations": [
-            {
-                "to": [{"email": email, "name": user_name}],
-                "dynamic_template_data": {
-                    "nombre_usuario": user_name,
-                    "reset_link": reset_url
-                }
-            }
-        ],
-        "template_id": settings.SENDGRID_TEMPLATE_ID  
-    }
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        response = sg.client.mail.send.post(request_body=message)
-        print(f"Status: {response.status_code}")
-        print(f"Body: {response.body}")
-        print(f"Headers: {response.headers}")
-
-        if response.status_code >= 400:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error de SendGrid: {response.body.decode('utf-8')}"
-            )
-        
-        return {"status": response.status_code, "message": "Email sent"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error enviando email: {str(e)}"
-        )
\ No newline at end of file
+        kind="password_reset",
+    )
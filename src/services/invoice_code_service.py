@@ -0,0 +1,172 @@
+# src/services/invoice_code_service.py
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import qrcode  # type: ignore
+from qrcode.exceptions import DataOverflowError  # type: ignore
+from PIL import Image
+
+from ..config import settings
+from .dian_service import generate_cufe, qr_payload
+
+QR_FORMATS = ("svg", "png")
+QR_ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_L
+QR_BORDER = 4  # zona de silencio en módulos (mínimo del estándar)
+# Máscara fija: evita evaluar las 8 máscaras por cada código (la mitad del tiempo de make)
+QR_MASK_PATTERN = 0
+PNG_MODULE_PX = 4
+# Lotes más pequeños se generan en el proceso actual (no compensa enviarlos al pool)
+INLINE_MAX = 8
+
+# Codificador preconfigurado del proceso (uno por worker del pool, ver _init_worker)
+_encoder: Optional[qrcode.QRCode] = None
+
+
+def _init_worker(version: int) -> None:
+    global _encoder
+    _encoder = qrcode.QRCode(version=version, error_correction=QR_ERROR_CORRECTION,
+                             border=QR_BORDER, mask_pattern=QR_MASK_PATTERN)
+
+
+def qr_matrix(data: str) -> List[List[bool]]:
+    """
+    Módulos del código QR (con la zona de silencio) usando la versión fija del codificador;
+    solo si el contenido no cabe se busca la versión para ese código.
+    """
+    if _encoder is None:
+        _init_worker(settings.QR_VERSION)
+    encoder = _encoder
+    encoder.clear()
+    encoder.add_data(data)
+    try:
+        encoder.make(fit=False)
+        return encoder.get_matrix()
+    except DataOverflowError:
+        fallback = qrcode.QRCode(error_correction=QR_ERROR_CORRECTION, border=QR_BORDER,
+                                 mask_pattern=QR_MASK_PATTERN)
+        fallback.add_data(data)
+        fallback.make(fit=True)
+        return fallback.get_matrix()
+
+
+def matrix_svg(matrix: List[List[bool]]) -> str:
+    """
+    SVG con un solo path: cada tramo horizontal de módulos oscuros es una línea de grosor 1,
+    con movimientos relativos dentro de la fila (unos pocos KB).
+    """
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        pen = None  # posición del lápiz en la fila, tras el último tramo
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}.5h{x - start}" if pen is None else f"m{start - pen} 0h{x - start}")
+            pen = x
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/><path stroke="#000" d="{"".join(path)}"/></svg>')
+
+
+def matrix_png(matrix: List[List[bool]], module_px: int = PNG_MODULE_PX) -> bytes:
+    """PNG de 1 bit por píxel (unos cientos de bytes)."""
+    size = len(matrix)
+    image = Image.new("1", (size, size), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    image = image.resize((size * module_px, size * module_px), Image.NEAREST)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_qr(data: str, fmt: str) -> Union[str, bytes]:
+    """Código QR de data en SVG (texto) o PNG (bytes). Se ejecuta en los procesos del pool."""
+    matrix = qr_matrix(data)
+    return matrix_svg(matrix) if fmt == "svg" else matrix_png(matrix)
+
+
+class InvoiceCodeIssuer:
+    """
+    CUFE y código QR de lotes de facturas. El CUFE (SHA-384, barato) se calcula una sola vez
+    por factura en este proceso y se pasa al contenido del QR; los QR (trabajo de CPU en
+    Python puro) se generan en un ProcessPoolExecutor cuyos procesos tienen un codificador
+    preconfigurado con versión y máscara fijas, sin la búsqueda de versión de fit=True.
+    El resultado es SVG o PNG binario, no PNG en base64.
+    """
+
+    def __init__(self, qr_version: int, max_workers: Optional[int] = None):
+        self.qr_version = qr_version
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.batches = 0
+        self.work_total = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                     initargs=(self.qr_version,))
+            return self._executor
+
+    def issue(self, invoices: Iterable[Dict[str, Any]], fmt: str = "svg",
+              issued_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Calcula el CUFE y el QR de cada factura del lote.
+        :param invoices: Datos de cada factura (invoice_number, total, client_id y opcionalmente total_taxes).
+        :param fmt: "svg" (texto) o "png" (bytes).
+        :param issued_at: Fecha de expedición común al lote (por defecto, ahora).
+        :return: [{"invoice_number", "cufe", "qr"}] en el orden recibido.
+        :raises ValueError: Si el formato no es válido.
+        :raises KeyError: Si a una factura le falta un campo del CUFE.
+        """
+        if fmt not in QR_FORMATS:
+            raise ValueError(f"Formato de QR inválido: {fmt}")
+        started = time.perf_counter()
+        issued_at = issued_at or datetime.now()
+        invoices = list(invoices)
+        cufes = [generate_cufe(invoice, issued_at) for invoice in invoices]
+        payloads = [qr_payload(invoice, cufe, issued_at) for invoice, cufe in zip(invoices, cufes)]
+
+        if len(payloads) <= INLINE_MAX:
+            images = [render_qr(payload, fmt) for payload in payloads]
+        else:
+            # Tandas por worker: menos viajes entre procesos que un envío por código
+            chunksize = max(1, len(payloads) // (self.max_workers * 4))
+            images = list(self._get_executor().map(render_qr, payloads, [fmt] * len(payloads), chunksize=chunksize))
+
+        with self._lock:
+            self.issued += len(invoices)
+            self.batches += 1
+            self.work_total += time.perf_counter() - started
+        return [{"invoice_number": invoice["invoice_number"], "cufe": cufe, "qr": image}
+                for invoice, cufe, image in zip(invoices, cufes, images)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "qr_version": self.qr_version,
+                "issued": self.issued,
+                "batches": self.batches,
+                "avg_ms_per_invoice": round(self.work_total * 1000 / self.issued, 3) if self.issued else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+invoice_code_issuer = InvoiceCodeIssuer(settings.QR_VERSION, settings.QR_WORKERS or None)
@@ -0,0 +1,363 @@
+# src/services/invoice_number_service.py
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.invoice_numbering import InvoiceNumberBlock, InvoiceNumberRange
+
+logger = logging.getLogger(__name__)
+
+# Reintentos de las actualizaciones compare-and-set cuando otro proceso gana la carrera
+MAX_CAS_RETRIES = 20
+
+
+class NumberingRangeExhausted(Exception):
+    """El rango no tiene más números o la resolución no está vigente; hay que registrar otra."""
+
+    def __init__(self, message: str, range_id: str):
+        super().__init__(message)
+        self.range_id = range_id
+
+
+class NumberingRangeNotFound(ValueError):
+    """El rango de numeración no existe."""
+
+
+class _LocalBlock:
+    __slots__ = ("id", "prefix", "first", "next", "last", "leased_at")
+
+    def __init__(self, block_id: str, prefix: str, first: int, last: int):
+        self.id = block_id
+        self.prefix = prefix
+        self.first = first
+        self.next = first
+        self.last = last
+        self.leased_at = time.monotonic()
+
+
+def format_number(prefix: str, number: int) -> str:
+    """Número de factura como lo exige la DIAN: prefijo + consecutivo (ej. SETP990000001)."""
+    return f"{prefix}{number}"
+
+
+def active_range_id(db: Session, issuer_nit: str, prefix: str = "") -> Optional[str]:
+    """Rango vigente y con números disponibles del emisor y prefijo (el más antiguo primero)."""
+    now = datetime.utcnow()
+    row = db.query(InvoiceNumberRange.id).filter(
+        InvoiceNumberRange.issuer_nit == issuer_nit,
+        InvoiceNumberRange.prefix == prefix,
+        InvoiceNumberRange.high_water < InvoiceNumberRange.range_end,
+        or_(InvoiceNumberRange.valid_from.is_(None), InvoiceNumberRange.valid_from <= now),
+        or_(InvoiceNumberRange.valid_to.is_(None), InvoiceNumberRange.valid_to >= now),
+    ).order_by(InvoiceNumberRange.range_start).first()
+    return row.id if row else None
+
+
+class InvoiceNumberAllocator:
+    """
+    Numeración de facturas por rango (resolución DIAN). Cada proceso reserva bloques de
+    block_size números consecutivos y los entrega desde memoria, con un lock por rango: solo
+    al agotarse el bloque va a la base de datos. La reserva es un compare-and-set sobre
+    high_water (sin bloqueos de fila largos), así que procesos concurrentes nunca reciben el
+    mismo número ni chocan con la restricción única de invoice_number.
+    Cada entrega guarda en el bloque hasta qué número se entregó (issued_through) antes de
+    devolver los números, así que un número entregado nunca se vuelve a entregar, tenga o no
+    factura. Solo se recuperan los que nunca se entregaron: al cerrar, la cola del bloque se
+    devuelve (al rango si es el final, o como bloque libre), y reconcile() hace lo mismo con
+    los bloques abandonados (lease vencido, ej. un proceso que se cayó). Los bloques libres
+    se entregan antes de avanzar high_water.
+    """
+
+    def __init__(self, block_size: int, lease_seconds: int, session_factory=SessionLocal):
+        self.block_size = max(1, block_size)
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+        self._blocks: Dict[str, _LocalBlock] = {}
+        self._range_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.blocks_leased = 0
+        self.blocks_reused = 0
+        self.rewound = 0
+
+    def _range_lock(self, range_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._range_locks.get(range_id)
+            if lock is None:
+                lock = self._range_locks[range_id] = threading.Lock()
+            return lock
+
+    def next_number(self, range_id: str) -> str:
+        return self.take(range_id, 1)[0]
+
+    def take(self, range_id: str, count: int = 1) -> List[str]:
+        """
+        Entrega count números consecutivos del rango (consecutivos dentro de cada bloque).
+        :raises NumberingRangeExhausted: Si el rango se agotó o la resolución no está vigente.
+        :raises NumberingRangeNotFound: Si el rango no existe.
+        """
+        numbers: List[str] = []
+        with self._range_lock(range_id):
+            while len(numbers) < count:
+                block = self._blocks.get(range_id)
+                if block is not None and (block.next > block.last or self._expiring(block)):
+                    self._close(range_id, block)
+                    block = None
+                if block is None:
+                    block = self._blocks[range_id] = self._lease(range_id, max(self.block_size, count - len(numbers)))
+                end = min(block.last, block.next + count - len(numbers) - 1)
+                if not self._mark_issued(block, end):
+                    # reconcile() lo tomó por abandonado: sus números ya no son de este proceso
+                    self._blocks.pop(range_id, None)
+                    continue
+                numbers.extend(format_number(block.prefix, n) for n in range(block.next, end + 1))
+                block.next = end + 1
+        with self._lock:
+            self.issued += len(numbers)
+        return numbers
+
+    def give_back(self, range_id: str, numbers: Iterable[str]) -> bool:
+        """
+        Devuelve los últimos números entregados si no se usaron (ej. la transacción de las
+        facturas falló), para entregarlos otra vez sin dejar hueco. Si no son la cola del
+        bloque actual no hace nada: reconcile() los recupera después.
+        :return: True si se devolvieron.
+        """
+        numbers = list(numbers)
+        if not numbers:
+            return True
+        with self._range_lock(range_id):
+            block = self._blocks.get(range_id)
+            if block is None:
+                return False
+            start = block.next - len(numbers)
+            expected = [format_number(block.prefix, n) for n in range(start, block.next)]
+            if start < block.first or sorted(numbers) != sorted(expected):
+                return False
+            if not self._mark_issued(block, start - 1):
+                return False
+            block.next = start
+        with self._lock:
+            self.rewound += len(numbers)
+        return True
+
+    def _mark_issued(self, block: _LocalBlock, issued_through: int) -> bool:
+        """
+        Guarda el último número entregado del bloque (compare-and-set sobre el dueño del lease).
+        :return: False si el bloque ya no es de este proceso.
+        """
+        db = self.session_factory()
+        try:
+            marked = db.query(InvoiceNumberBlock).filter(
+                InvoiceNumberBlock.id == block.id, InvoiceNumberBlock.owner == self.owner,
+                InvoiceNumberBlock.status == "leased",
+            ).update({"issued_through": issued_through, "updated_at": datetime.utcnow()},
+                     synchronize_session=False)
+            db.commit()
+            return bool(marked)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _expiring(self, block: _LocalBlock) -> bool:
+        # A la mitad del lease el bloque se cierra: reconcile() solo toma bloques con el lease vencido
+        return time.monotonic() - block.leased_at > self.lease_seconds / 2
+
+    def _lease(self, range_id: str, size: int) -> _LocalBlock:
+        """Reserva un bloque: primero uno libre (números recuperados), si no, avanza high_water."""
+        db = self.session_factory()
+        try:
+            number_range = db.query(InvoiceNumberRange).filter(InvoiceNumberRange.id == range_id).first()
+            if number_range is None:
+                raise NumberingRangeNotFound("Rango de numeración no encontrado.")
+            now = datetime.utcnow()
+            if (number_range.valid_from and number_range.valid_from > now) or \
+                    (number_range.valid_to and number_range.valid_to < now):
+                raise NumberingRangeExhausted("La resolución de numeración no está vigente.", range_id)
+            prefix = number_range.prefix or ""
+
+            for _ in range(MAX_CAS_RETRIES):
+                free = db.query(InvoiceNumberBlock.id, InvoiceNumberBlock.first_number, InvoiceNumberBlock.last_number) \
+                    .filter(InvoiceNumberBlock.range_id == range_id, InvoiceNumberBlock.status == "free") \
+                    .order_by(InvoiceNumberBlock.first_number).first()
+                if free is None:
+                    break
+                claimed = db.query(InvoiceNumberBlock).filter(
+                    InvoiceNumberBlock.id == free.id, InvoiceNumberBlock.status == "free"
+                ).update({"status": "leased", "owner": self.owner, "leased_at": now, "updated_at": now,
+                          "issued_through": free.first_number - 1}, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    with self._lock:
+                        self.blocks_reused += 1
+                    return _LocalBlock(free.id, prefix, free.first_number, free.last_number)
+
+            for _ in range(MAX_CAS_RETRIES):
+                high_water, range_end = db.query(InvoiceNumberRange.high_water, InvoiceNumberRange.range_end) \
+                    .filter(InvoiceNumberRange.id == range_id).one()
+                if high_water >= range_end:
+                    raise NumberingRangeExhausted("El rango de numeración se agotó.", range_id)
+                last = min(high_water + size, range_end)
+                advanced = db.query(InvoiceNumberRange).filter(
+                    InvoiceNumberRange.id == range_id, InvoiceNumberRange.high_water == high_water
+                ).update({"high_water": last, "updated_at": now}, synchronize_session=False)
+                if not advanced:
+                    db.rollback()
+                    continue
+                block = InvoiceNumberBlock(range_id=range_id, first_number=high_water + 1, last_number=last,
+                                           issued_through=high_water, status="leased", owner=self.owner,
+                                           leased_at=now, updated_at=now)
+                db.add(block)
+                db.commit()
+                with self._lock:
+                    self.blocks_leased += 1
+                return _LocalBlock(block.id, prefix, high_water + 1, last)
+            raise RuntimeError("No se pudo reservar un bloque de numeración (demasiada contención).")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _close(self, range_id: str, block: _LocalBlock) -> None:
+        """
+        Cierra el bloque en la base de datos. La parte sin entregar vuelve al rango si el bloque
+        es el final de high_water, o queda como bloque libre.
+        """
+        self._blocks.pop(range_id, None)
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            rows = db.query(InvoiceNumberBlock).filter(
+                InvoiceNumberBlock.id == block.id, InvoiceNumberBlock.owner == self.owner,
+                InvoiceNumberBlock.status == "leased",
+            )
+            closed = rows.update({"status": "closed", "last_number": min(block.last, block.next - 1),
+                                  "issued_through": min(block.last, block.next - 1), "updated_at": now},
+                                 synchronize_session=False)
+            if not closed:
+                # reconcile() ya lo tomó por abandonado y recuperó sus números
+                db.rollback()
+                return
+            if block.next <= block.last:
+                rewound = db.query(InvoiceNumberRange).filter(
+                    InvoiceNumberRange.id == range_id, InvoiceNumberRange.high_water == block.last
+                ).update({"high_water": block.next - 1, "updated_at": now}, synchronize_session=False)
+                if not rewound:
+                    db.add(InvoiceNumberBlock(range_id=range_id, first_number=block.next, last_number=block.last,
+                                              status="free", updated_at=now))
+                if block.next == block.first:
+                    # No se entregó ningún número
+                    db.query(InvoiceNumberBlock).filter(InvoiceNumberBlock.id == block.id) \
+                        .delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("No se pudo cerrar el bloque de numeración %s", block.id)
+        finally:
+            db.close()
+
+    def reconcile(self, range_id: Optional[str] = None, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Cierra los bloques abandonados (lease vencido, ej. un proceso que se cayó) y convierte en
+        bloque libre la parte que nunca se entregó. Los números entregados no se recuperan aunque
+        no tengan factura: otro proceso pudo haberlos usado.
+        :return: Bloques revisados y números recuperados.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        result = {"blocks": 0, "recovered": 0}
+        db = self.session_factory()
+        try:
+            while True:
+                query = db.query(InvoiceNumberBlock).filter(
+                    InvoiceNumberBlock.status == "leased",
+                    InvoiceNumberBlock.leased_at < cutoff,
+                    InvoiceNumberBlock.updated_at < cutoff,
+                )
+                if range_id is not None:
+                    query = query.filter(InvoiceNumberBlock.range_id == range_id)
+                blocks = query.order_by(InvoiceNumberBlock.first_number).limit(batch_size).all()
+                for block in blocks:
+                    result["recovered"] += self._reconcile_block(db, block)
+                    result["blocks"] += 1
+                if len(blocks) < batch_size:
+                    break
+        finally:
+            db.close()
+        return result
+
+    def _reconcile_block(self, db: Session, block: InvoiceNumberBlock) -> int:
+        # Sin issued_through no se sabe hasta dónde se entregó: se toma como entregado completo
+        issued_through = block.last_number if block.issued_through is None else block.issued_through
+        now = datetime.utcnow()
+
+        # Compare-and-set: si el dueño entregó o cerró el bloque mientras tanto se revisa en otra pasada
+        marked = db.query(InvoiceNumberBlock).filter(
+            InvoiceNumberBlock.id == block.id, InvoiceNumberBlock.status == "leased",
+            InvoiceNumberBlock.updated_at == block.updated_at,
+        ).update({"status": "closed", "last_number": issued_through, "updated_at": now},
+                 synchronize_session=False)
+        if not marked:
+            db.rollback()
+            return 0
+        recovered = block.last_number - issued_through
+        if recovered:
+            db.add(InvoiceNumberBlock(range_id=block.range_id, first_number=issued_through + 1,
+                                      last_number=block.last_number, status="free", updated_at=now))
+        if issued_through < block.first_number:
+            # No se entregó ningún número
+            db.query(InvoiceNumberBlock).filter(InvoiceNumberBlock.id == block.id) \
+                .delete(synchronize_session=False)
+        db.commit()
+        return recovered
+
+    def reconcile_in_background(self) -> threading.Thread:
+        """Ejecuta reconcile() en un hilo aparte y registra los números recuperados."""
+        def run():
+            try:
+                result = self.reconcile()
+                if result["recovered"]:
+                    logger.info("Numeración de facturas: recuperados %s", result)
+            except Exception:
+                logger.exception("Error conciliando la numeración de facturas")
+
+        thread = threading.Thread(target=run, name="invoice-number-reconcile", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            blocks = {range_id: max(0, block.last - block.next + 1) for range_id, block in self._blocks.items()}
+            return {
+                "owner": self.owner,
+                "block_size": self.block_size,
+                "issued": self.issued,
+                "blocks_leased": self.blocks_leased,
+                "blocks_reused": self.blocks_reused,
+                "rewound": self.rewound,
+                "remaining_by_range": blocks,
+            }
+
+    def shutdown(self) -> None:
+        """Devuelve la parte sin entregar de los bloques en memoria."""
+        for range_id in list(self._blocks):
+            with self._range_lock(range_id):
+                block = self._blocks.get(range_id)
+                if block is not None:
+                    self._close(range_id, block)
+
+
+invoice_numbers = InvoiceNumberAllocator(settings.INVOICE_NUMBER_BLOCK_SIZE, settings.INVOICE_NUMBER_LEASE_SECONDS)
@@ -1,46 +1,18 @@
 # services/invoice_service.py
-import uuid
-from datetime import datetime
-from models.invoice import Invoice, InvoiceItem, InvoiceSchema, InvoiceItemSchema
-from services.dian_service import generate_cufe, generate_qr_code
+from ..database import SessionLocal
+from ..business_logic.invoice_batch_logic import InvoiceBatchLogic
 
 class InvoiceService:
-    
+
     @staticmethod
-    def create_invoice(data):
-        # Validar datos
-        schema = InvoiceSchema()
-        errors = schema.validate(data)
-        if errors:
-            raise ValueError(errors)
-        
-        # Generar CUFE y QR
-        cufe = generate_cufe(data)
-        qr_data = generate_qr_code(data)
-        
-        # Crear factura
-        invoice_data = {
-            **data,
-            'cufe': cufe,
-            'qr_code': qr_data,
-            'issue_date': datetime.now()
-        }
-        
-        invoice = Invoice(**invoice_data)
-        invoice.save()
-        
-        # Crear items de factura si existen
-        if 'items' in data:
-            for item_data in data['items']:
-                item_schema = InvoiceItemSchema()
-                item_errors = item_schema.validate(item_data)
-                if item_errors:
-                    continue  # O manejar el error adecuadamente
-                
-                item = InvoiceItem(**{
-                    **item_data,
-                    'invoice_id': invoice.id
-                })
-                item.save()
-        
-        return invoice
\ No newline at end of file
+    def create_invoice(data, db=None, range_id=None):
+        # Una factura es un lote de uno: misma validación, totales, CUFE/QR y transacción
+        session = db or SessionLocal()
+        try:
+            result = InvoiceBatchLogic(session).issue_invoices([data], range_id=range_id)
+        finally:
+            if db is None:
+                session.close()
+        if result["errors"]:
+            raise ValueError(result["errors"][0]["errors"])
+        return result["created"][0]
@@ -0,0 +1,133 @@
+# src/services/jwt_service.py
+import base64
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import jwt
+from jwt.algorithms import get_default_algorithms, has_crypto
+from jwt.exceptions import InvalidAlgorithmError, InvalidKeyError
+
+from ..config import Settings, settings
+from .token_revocation import token_ids
+
+SYMMETRIC_ALGORITHMS = ("HS256", "HS384", "HS512")
+# Miembros obligatorios de la JWK por tipo de clave, para el thumbprint (RFC 7638) que se usa como kid
+_THUMBPRINT_MEMBERS = {"EC": ("crv", "kty", "x", "y"), "OKP": ("crv", "kty", "x"), "RSA": ("e", "kty", "n")}
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _read_key(value: str, path: str) -> Optional[str]:
+    """Clave PEM desde la variable (con saltos de línea escapados como \\n) o desde un archivo."""
+    if value:
+        return value.replace("\\n", "\n")
+    if path:
+        with open(path, "r", encoding="utf-8") as key_file:
+            return key_file.read()
+    return None
+
+
+class JWTCore:
+    """
+    Emisión y verificación de JWT (JWS compacto) con un solo camino para toda la aplicación.
+    La clave y el algoritmo se preparan una vez al crear la instancia y el encabezado ya
+    codificado se reutiliza en cada token. Con HS256/384/512 se firma con SECRET_KEY; con
+    ES256 o EdDSA se firma con la clave privada y otros servicios pueden verificar sin
+    compartir secretos usando la clave pública publicada en jwks().
+    Los errores son las excepciones de PyJWT (jwt.ExpiredSignatureError, jwt.PyJWTError...).
+    """
+
+    def __init__(self, algorithm: str, secret_key: str = "", private_key: Optional[str] = None,
+                 public_key: Optional[str] = None, expire_minutes: int = 30, leeway: int = 0):
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms:
+            hint = "" if has_crypto else " (ES256 y EdDSA requieren el paquete cryptography)"
+            raise InvalidAlgorithmError(f"Algoritmo JWT no soportado: {algorithm}{hint}")
+        self.algorithm = algorithm
+        self.expire_minutes = expire_minutes
+        self.leeway = leeway
+        self._algorithm = algorithms[algorithm]
+        self.kid: Optional[str] = None
+        self.public_jwk: Optional[Dict[str, Any]] = None
+
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            self._signing_key = self._verifying_key = self._algorithm.prepare_key(secret_key)
+        else:
+            if not private_key and not public_key:
+                raise InvalidKeyError(f"{algorithm} requiere JWT_PRIVATE_KEY o JWT_PUBLIC_KEY")
+            self._signing_key = self._algorithm.prepare_key(private_key) if private_key else None
+            self._verifying_key = (self._algorithm.prepare_key(public_key) if public_key
+                                   else self._signing_key.public_key())
+            jwk = self._algorithm.to_jwk(self._verifying_key, as_dict=True)
+            members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+            thumbprint = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+            self.kid = _b64encode(thumbprint).decode()
+            self.public_jwk = {**jwk, "kid": self.kid, "alg": algorithm, "use": "sig"}
+
+        header = {"alg": algorithm, "typ": "JWT"}
+        if self.kid:
+            header["kid"] = self.kid
+        self._header_segment = _b64encode(json.dumps(header, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "JWTCore":
+        return cls(
+            config.ALGORITHM,
+            secret_key=config.SECRET_KEY,
+            private_key=_read_key(config.JWT_PRIVATE_KEY, config.JWT_PRIVATE_KEY_FILE),
+            public_key=_read_key(config.JWT_PUBLIC_KEY, config.JWT_PUBLIC_KEY_FILE),
+            expire_minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES,
+            leeway=config.JWT_LEEWAY_SECONDS,
+        )
+
+    def issue(self, claims: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+        """
+        Firma un token con los claims dados más exp, iat y jti.
+        :param expires_delta: Vigencia del token; por defecto ACCESS_TOKEN_EXPIRE_MINUTES.
+        :raises InvalidKeyError: Si solo hay clave pública (la instancia solo puede verificar).
+        """
+        if self._signing_key is None:
+            raise InvalidKeyError("No hay clave privada para firmar tokens")
+        payload = dict(claims)
+        payload.update(token_ids())
+        lifetime = expires_delta.total_seconds() if expires_delta is not None else self.expire_minutes * 60
+        payload["exp"] = payload["iat"] + int(lifetime)
+        signing_input = self._header_segment + b"." + _b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        signature = self._algorithm.sign(signing_input, self._signing_key)
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verifica la firma y los claims de tiempo (exp, nbf, iat) con PyJWT, usando la clave ya
+        preparada y solo el algoritmo configurado, y devuelve los claims.
+        :raises jwt.ExpiredSignatureError: Si el token expiró.
+        :raises jwt.PyJWTError: Si el token es inválido.
+        """
+        return jwt.decode(token, self._verifying_key, algorithms=[self.algorithm], leeway=self.leeway)
+
+    def jwks(self) -> Dict[str, Any]:
+        """JWK Set con la clave pública (vacío con algoritmos simétricos: el secreto no se publica)."""
+        return {"keys": [self.public_jwk] if self.public_jwk else []}
+
+
+jwt_core = JWTCore.from_settings()
+
+
+def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    """Emite un token con jwt_core (vigencia por defecto: ACCESS_TOKEN_EXPIRE_MINUTES)."""
+    return jwt_core.issue(data, expires_delta)
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verifica un token con jwt_core.
+    :raises jwt.ExpiredSignatureError: Si el token expiró.
+    :raises jwt.PyJWTError: Si el token es inválido.
+    """
+    return jwt_core.verify(token)
@@ -0,0 +1,153 @@
+# src/services/login_audit.py
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.login import Login
+
+logger = logging.getLogger(__name__)
+
+
+class LoginAuditWriter:
+    """
+    Registro de inicios de sesión fuera de la ruta de login. Cada evento se encola en memoria
+    y un hilo de fondo los guarda con un solo bulk insert cuando se juntan batch_size eventos o
+    pasan flush_interval segundos. Si la base de datos falla, el lote vuelve a la cola; por encima
+    de max_queue eventos se descartan los más antiguos (y se cuentan en dropped).
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="login-audit", daemon=True)
+            self._thread.start()
+
+    def record(self, id_user: str, email: str, login_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Encola un inicio de sesión; no toca la base de datos.
+        :return: Fila que se insertará en la tabla login.
+        """
+        now = datetime.now(timezone.utc)
+        row = {
+            "id": str(uuid.uuid4()),
+            "id_user": id_user,
+            "email": email,
+            "login_date": login_date or now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._condition:
+            self._ensure_started()
+            self._queue.append(row)
+            self.recorded += 1
+            while len(self._queue) > self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+        return row
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        with self._condition:
+            self._queue.extendleft(reversed(rows))
+            while len(self._queue) > self.max_queue:
+                self._queue.pop()
+                self.dropped += 1
+
+    def flush(self) -> int:
+        """
+        Guarda todos los eventos en cola, por lotes de batch_size.
+        :return: Número de eventos guardados.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._take_batch()
+                if not rows:
+                    return written
+                started = time.perf_counter()
+                db = SessionLocal()
+                try:
+                    db.bulk_insert_mappings(Login, rows)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    self._requeue(rows)
+                    with self._condition:
+                        self.failed_flushes += 1
+                    logger.exception("No se pudo guardar el lote de inicios de sesión (%s eventos)", len(rows))
+                    return written
+                finally:
+                    db.close()
+                written += len(rows)
+                with self._condition:
+                    self.written += len(rows)
+                    self.batches += 1
+                    self.last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "queued": len(self._queue),
+                "recorded": self.recorded,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_ms": self.last_flush_ms,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+            }
+
+    def shutdown(self) -> None:
+        """Detiene el hilo y guarda lo que quede en la cola."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+
+login_audit = LoginAuditWriter(
+    settings.LOGIN_AUDIT_BATCH_SIZE,
+    settings.LOGIN_AUDIT_FLUSH_SECONDS,
+    settings.LOGIN_AUDIT_MAX_QUEUE,
+)
@@ -0,0 +1,438 @@
+# src/services/nomina_pdf_service.py
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from ..config import settings
+from ..database import SessionLocal, WriteLaneBusy
+from ..models.nomina import Nomina
+from ..business_logic.payroll_rates import calculate_payroll
+from .blob_store import blob_store
+
+logger = logging.getLogger(__name__)
+
+# Trabajos recordados para consultar su estado (los más antiguos se descartan)
+MAX_TRACKED_JOBS = 200
+
+# Cambiar al modificar el diseño del PDF: invalida todo lo que hay en caché
+PDF_TEMPLATE_VERSION = "1"
+
+
+def pdf_cache_key(payload: Dict[str, Any]) -> str:
+    """
+    Hash (SHA-256) de los campos que se dibujan en el PDF. Si la nómina cambia, cambia la
+    clave; si no cambia, el PDF ya generado sirve tal cual. También se usa como ETag.
+    """
+    rendered = {key: value for key, value in payload.items() if key != "id"}
+    canonical = json.dumps([PDF_TEMPLATE_VERSION, rendered], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def nomina_pdf_payload(nomina: Nomina) -> Dict[str, Any]:
+    """
+    Copia serializable (picklable) de los datos que van en el PDF, para enviarla al
+    proceso que lo genera. El desglose de horas extras se calcula aquí con las tasas del periodo.
+    """
+    def overtime(**hours) -> Decimal:
+        return calculate_payroll(nomina.period, base_salary=nomina.salario_base or 0, days_worked=0,
+                                 transport_allowance=0, **hours)["extra_pay"]
+
+    contract_type = getattr(nomina.contract_type, "value", nomina.contract_type)
+    total_deducciones = nomina.total_deducciones or sum(
+        (value or Decimal("0")) for value in (
+            nomina.health_contribution, nomina.pension_contribution,
+            nomina.solidarity_pension_fund, nomina.deductions,
+        )
+    )
+    return {
+        "id": str(nomina.id),
+        "period": nomina.period,
+        "employee_name": nomina.employee_name,
+        "employee_id": nomina.employee_id,
+        "contract_type": contract_type,
+        "days_worked": nomina.days_worked,
+        "concepts": [
+            ("Salario básico", nomina.salario_base),
+            ("Auxilio transporte", nomina.transporte),
+            ("Horas extras diurnas", overtime(extra_day_hours=nomina.extra_day_hours or 0)),
+            ("Horas extras nocturnas", overtime(extra_night_hours=nomina.extra_night_hours or 0)),
+            ("Horas dominicales/festivas", overtime(sunday_hours=nomina.sunday_hours or 0,
+                                                    holiday_hours=nomina.holiday_hours or 0)),
+            ("Total Devengado", nomina.total_ingresos),
+            ("", ""),
+            ("Aportes Salud", nomina.health_contribution),
+            ("Aportes Pensión", nomina.pension_contribution),
+            ("Fondo Solidaridad Pensional", nomina.solidarity_pension_fund),
+            ("Otros descuentos", nomina.deductions),
+            ("Total Deducciones", total_deducciones),
+            ("", ""),
+            ("NETO A PAGAR", nomina.total_neto),
+        ],
+    }
+
+
+def render_nomina_pdf(payload: Dict[str, Any], output_path: str) -> str:
+    """
+    Genera el PDF de una nómina. Se ejecuta en un proceso del pool: solo usa el payload
+    y escribe en un archivo temporal que luego se renombra (nunca queda un PDF a medias).
+    :return: Ruta del PDF generado.
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+
+    # Encabezado
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(100, 750, f"NÓMINA DE PAGO - {payload['period']}")
+
+    # Información empleado
+    c.setFont("Helvetica", 12)
+    y = 700
+    c.drawString(100, y, f"Empleado: {payload['employee_name']} ({payload['employee_id']})")
+    y -= 20
+    c.drawString(100, y, f"Tipo Contrato: {payload['contract_type']}")
+    y -= 20
+    c.drawString(100, y, f"Días trabajados: {payload['days_worked']}")
+
+    # Detalles de pago
+    y -= 40
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(100, y, "DESGLOSE DE PAGOS")
+    y -= 30
+
+    c.setFont("Helvetica", 12)
+    for concept, value in payload["concepts"]:
+        c.drawString(100, y, concept)
+        c.drawString(400, y, f"${(value or 0):,.2f}" if value != "" else "")
+        y -= 20
+
+    # Pie de página
+    y -= 30
+    c.drawString(100, y, "Firma empleador: __________________________")
+    y -= 20
+    c.drawString(100, y, "Firma empleado: __________________________")
+
+    c.save()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def store_nomina_pdfs(db: Session, pdf_paths: Dict[str, str]) -> Dict[str, str]:
+    """
+    Guarda PDFs generados en el almacén por contenido y los asocia a sus nóminas (pdf_sha256 y
+    pdf_url), moviendo la referencia del PDF anterior si cambió. No hace commit.
+    El archivo de la caché se enlaza (o copia) al almacén: la caché puede descartarlo sin
+    afectar al PDF guardado.
+    :param pdf_paths: Ruta del PDF generado por id de nómina.
+    :return: Digest del PDF por id de nómina.
+    """
+    if not pdf_paths:
+        return {}
+    stored = {nomina_id: blob_store.put_file(path, move=False) for nomina_id, path in pdf_paths.items()}
+    link_nomina_pdfs(db, stored)
+    return {nomina_id: digest for nomina_id, (digest, _) in stored.items()}
+
+
+def link_nomina_pdfs(db: Session, stored: Dict[str, Tuple[str, int]]) -> None:
+    """
+    Asocia a sus nóminas PDFs que ya están en el almacén (pdf_sha256 y pdf_url), moviendo la
+    referencia del PDF anterior si cambió. No hace commit.
+    :param stored: (digest, tamaño) del PDF por id de nómina.
+    """
+    previous = dict(db.query(Nomina.id, Nomina.pdf_sha256).filter(Nomina.id.in_(list(stored))))
+    changed = [nomina_id for nomina_id, (digest, _) in stored.items() if previous.get(nomina_id) != digest]
+    if changed:
+        blob_store.add_refs(db, [(stored[nomina_id][0], stored[nomina_id][1], "application/pdf")
+                                 for nomina_id in changed])
+        blob_store.release(db, [previous.get(nomina_id) for nomina_id in changed])
+        db.bulk_update_mappings(Nomina, [
+            {"id": nomina_id, "pdf_sha256": stored[nomina_id][0], "pdf_url": f"/nominas/{nomina_id}/pdf"}
+            for nomina_id in changed
+        ])
+
+
+class PdfJob:
+    """Estado de un trabajo de generación de PDFs (una nómina o un periodo completo)."""
+
+    def __init__(self, job_id: str, nomina_ids: List[str], id_user: Optional[str] = None):
+        self.id = job_id
+        self.nomina_ids = nomina_ids
+        self.id_user = id_user
+        self.status = "pending"  # pending, running, done, failed
+        self.completed = 0
+        self.stored = 0
+        self.errors: Dict[str, str] = {}
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.nomina_ids),
+            "completed": self.completed,
+            "failed": len(self.errors),
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class NominaPdfCache:
+    """
+    PDFs generados, guardados en disco con su clave de contenido como nombre. Se descartan
+    los menos usados (LRU) cuando el total supera max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # clave -> tamaño, del menos al más usado
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Reconstruye el índice con lo que ya hay en disco, del más antiguo al más reciente."""
+        if not os.path.isdir(self.directory):
+            return
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pdf") and len(name) == 68:  # <sha256>.pdf
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Ruta del PDF en caché (y lo marca como usado), o None si no está."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self.total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return path
+
+    def add(self, key: str) -> None:
+        """Registra un PDF recién generado y descarta los menos usados si se supera el tamaño."""
+        size = os.path.getsize(self.path_for(key))
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+                try:
+                    os.remove(self.path_for(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "total_bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+class NominaPdfQueue:
+    """
+    Cola de generación de PDFs sobre un ProcessPoolExecutor: ReportLab es trabajo de CPU
+    y así no bloquea el event loop ni compite por el GIL con las peticiones.
+    Los PDFs se guardan en la caché por contenido: lo que ya está generado no se vuelve a
+    generar, y dos peticiones del mismo PDF esperan el mismo render.
+    Cada PDF se ingresa al almacén por contenido apenas termina (antes de que la caché pueda
+    descartarlo) y un hilo dedicado lo asocia a su nómina: junta lo que haya en cola y lo
+    guarda con una actualización masiva por lote, reintentando si la conexión escritora está
+    ocupada (WriteLaneBusy). Nada de esto corre en los callbacks de los Future.
+    """
+
+    STORE_BATCH_SIZE = 500
+    STORE_RETRIES = 5
+    STORE_RETRY_SECONDS = 0.5
+
+    def __init__(self, cache: NominaPdfCache, max_workers: Optional[int] = None):
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, PdfJob]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self._store_queue: "queue.Queue" = queue.Queue()
+        self._store_thread: Optional[threading.Thread] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _render(self, payload: Dict[str, Any]) -> Future:
+        """Future con la ruta del PDF: resuelto si ya está en caché, o el render en curso/nuevo."""
+        key = pdf_cache_key(payload)
+        with self._lock:
+            path = self.cache.get(key)
+            if path is not None:
+                future: Future = Future()
+                future.set_result(path)
+                return future
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._get_executor().submit(render_nomina_pdf, payload, self.cache.path_for(key))
+                self._inflight[key] = future
+                future.add_done_callback(lambda f, key=key: self._on_rendered(key, f))
+            return future
+
+    def _on_rendered(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if future.exception() is None:
+            self.cache.add(key)
+
+    def render(self, payload: Dict[str, Any]) -> Future:
+        """Future con la ruta del PDF de la nómina, sin esperar el render (ver render_cached)."""
+        return self._render(payload)
+
+    def render_cached(self, payload: Dict[str, Any]) -> str:
+        """
+        Ruta del PDF de la nómina; solo lo genera (en el pool) si no está en caché.
+        :raises Exception: El error del render, si falla.
+        """
+        return self._render(payload).result()
+
+    def submit(self, payloads: Iterable[Dict[str, Any]], id_user: Optional[str] = None) -> PdfJob:
+        """
+        Encola la generación de los PDFs y devuelve el trabajo sin esperar a que terminen.
+        :param payloads: Datos de cada nómina (ver nomina_pdf_payload).
+        :param id_user: Usuario dueño de las nóminas (solo él puede consultar el trabajo).
+        """
+        payloads = list(payloads)
+        job = PdfJob(str(uuid.uuid4()), [payload["id"] for payload in payloads], id_user)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+
+        if not payloads:
+            job.status = "done"
+            job.finished_at = datetime.now()
+            return job
+
+        job.status = "running"
+        for payload in payloads:
+            future = self._render(payload)
+            future.add_done_callback(lambda f, nomina_id=payload["id"]: self._on_done(job, nomina_id, f))
+        return job
+
+    def _on_done(self, job: PdfJob, nomina_id: str, future: Future) -> None:
+        """Ingresa el PDF al almacén (solo archivos) y deja la asociación al hilo de guardado."""
+        try:
+            blob = blob_store.put_file(future.result(), move=False)
+        except Exception as e:
+            self._record(job, nomina_id, str(e))
+            return
+        self._start_store_thread()
+        self._store_queue.put((job, nomina_id, blob))
+
+    def _record(self, job: PdfJob, nomina_id: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            if error is None:
+                job.stored += 1
+            else:
+                job.errors[nomina_id] = error
+            job.completed += 1
+            if job.completed == len(job.nomina_ids):
+                job.status = "failed" if job.errors and not job.stored else "done"
+                job.finished_at = datetime.now()
+
+    def _start_store_thread(self) -> None:
+        with self._lock:
+            if self._store_thread is None:
+                self._store_thread = threading.Thread(target=self._store_loop, name="nomina-pdf-store", daemon=True)
+                self._store_thread.start()
+
+    def _store_loop(self) -> None:
+        while True:
+            item = self._store_queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.STORE_BATCH_SIZE:
+                try:
+                    item = self._store_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._store_queue.put(None)  # se termina después de guardar este lote
+                    break
+                batch.append(item)
+            error = self._store_batch({nomina_id: blob for _, nomina_id, blob in batch})
+            for job, nomina_id, _ in batch:
+                self._record(job, nomina_id, error)
+
+    def _store_batch(self, stored: Dict[str, Tuple[str, int]]) -> Optional[str]:
+        """
+        Asocia un lote de PDFs a sus nóminas en una transacción.
+        :return: None si se guardó, o el error.
+        """
+        for attempt in range(self.STORE_RETRIES):
+            db = SessionLocal()
+            try:
+                link_nomina_pdfs(db, stored)
+                db.commit()
+                return None
+            except WriteLaneBusy as e:
+                db.rollback()
+                error = e
+                time.sleep(self.STORE_RETRY_SECONDS * 2 ** attempt)
+            except Exception as e:
+                db.rollback()
+                error = e
+                break
+            finally:
+                db.close()
+        logger.error("No se pudieron asociar %s PDFs de nómina: %s", len(stored), error)
+        return f"No se pudo guardar el PDF: {error}"
+
+    def get_job(self, job_id: str) -> Optional[PdfJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        """Espera los renders en curso y a que el hilo de guardado asocie lo que quedó en cola."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            thread, self._store_thread = self._store_thread, None
+        if thread is not None:
+            self._store_queue.put(None)
+            thread.join()
+
+
+pdf_cache = NominaPdfCache(settings.NOMINA_PDF_DIR, settings.NOMINA_PDF_CACHE_MAX_MB * 1024 * 1024)
+pdf_queue = NominaPdfQueue(pdf_cache, settings.PDF_WORKERS or None)
@@ -0,0 +1,140 @@
+# src/services/password_service.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from ..config import settings
+
+
+class PasswordHasherBusy(Exception):
+    """Hay demasiadas operaciones de hash en espera; la petición debe reintentarse."""
+
+
+def hash_password(password: str) -> str:
+    """Genera el hash de la contraseña con el método configurado (PASSWORD_HASH_METHOD)."""
+    return generate_password_hash(password, method=settings.PASSWORD_HASH_METHOD)
+
+
+def check_password(password_hash: str, password: str) -> bool:
+    """Verifica la contraseña contra el hash almacenado."""
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True si el hash se generó con otro método o parámetros (ej. menos iteraciones) que los configurados."""
+    return password_hash.split("$", 1)[0] != settings.PASSWORD_HASH_METHOD
+
+
+class PasswordHasher:
+    """
+    Ejecuta el hash y la verificación de contraseñas (PBKDF2, trabajo de CPU) en un pool de
+    hilos dedicado y acotado, fuera del event loop. hashlib libera el GIL, así que los hilos
+    corren en paralelo. Si hay más de max_pending operaciones en curso se rechaza con
+    PasswordHasherBusy en lugar de acumular una cola sin límite.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.work_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _reserve(self) -> Tuple[float, ThreadPoolExecutor]:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Demasiadas solicitudes de autenticación en curso.")
+            self.pending += 1
+            executor = self._get_executor()
+        return time.perf_counter(), executor
+
+    def _run(self, queued_at: float, func: Callable[..., Any], *args) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            waited = started - queued_at
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+                self.work_total += time.perf_counter() - started
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Ejecuta func(*args) en el pool sin bloquear el event loop."""
+        queued_at, executor = self._reserve()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._run, queued_at, func, *args)
+
+    def run_sync(self, func: Callable[..., Any], *args) -> Any:
+        """Igual que run, para código síncrono (rutas def que ya corren en el threadpool)."""
+        queued_at, executor = self._reserve()
+        return executor.submit(self._run, queued_at, func, *args).result()
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        return await self.run(check_password, password_hash, password)
+
+    async def verify_and_rehash(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica la contraseña y, si es correcta pero el hash usa parámetros antiguos,
+        genera uno nuevo con los actuales.
+        :return: (contraseña correcta, hash nuevo o None si no hace falta actualizarlo).
+        """
+        if not await self.verify(password_hash, password):
+            return False, None
+        if not needs_rehash(password_hash):
+            return True, None
+        new_hash = await self.hash(password)
+        with self._lock:
+            self.rehashed += 1
+        return True, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "wait_avg_ms": round(self.wait_total * 1000 / completed, 3) if completed else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "work_avg_ms": round(self.work_total * 1000 / completed, 3) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,235 @@
+# src/services/payroll_mail_service.py
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.email_outbox import EmailOutbox
+from ..models.nomina import Nomina
+from .blob_store import blob_store
+from .email_outbox import email_dispatcher
+from .nomina_pdf_service import nomina_pdf_payload, pdf_queue, store_nomina_pdfs
+
+logger = logging.getLogger(__name__)
+
+KIND = "payroll_slip"
+# Trabajos recordados para consultar su estado (los más antiguos se descartan)
+MAX_TRACKED_JOBS = 200
+# Un comprobante en estos estados no se vuelve a encolar al repetir el envío del periodo
+ACTIVE_STATUSES = ("pending", "sending", "sent")
+
+
+class PayrollMailJobRunning(Exception):
+    """Ya hay un envío en curso que cubre las mismas nóminas (mismo periodo y empresa)."""
+
+    def __init__(self, message: str, job: "PayrollMailJob"):
+        super().__init__(message)
+        self.job = job
+
+
+class PayrollMailJob:
+    """Estado de un envío masivo de comprobantes; el estado por destinatario está en el outbox."""
+
+    def __init__(self, job_id: str, period: str, id_user: Optional[str] = None):
+        self.id = job_id
+        self.period = period
+        self.id_user = id_user
+        self.status = "pending"  # pending, running, done, failed, cancelled
+        self.processed = 0
+        self.queued = 0
+        self.skipped = 0  # ya enviados (o en cola) por un envío anterior
+        self.render_failed = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "period": self.period,
+            "id_user": self.id_user,
+            "status": self.status,
+            "processed": self.processed,
+            "queued": self.queued,
+            "skipped": self.skipped,
+            "render_failed": self.render_failed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class PayrollSlipMailer:
+    """
+    Envío masivo de comprobantes de nómina de un periodo. Un hilo de fondo recorre las
+    nóminas por tandas de chunk_size (keyset por id, sin retener un cursor abierto), genera
+    los PDFs en el pool de nomina_pdf_service (o los toma de la caché) y encola un correo por
+    empleado en el outbox con una sola inserción masiva por tanda. El envío lo hace
+    email_dispatcher, con su pool de conexiones y su límite de concurrencia, y cada fila del
+    outbox (job_id, reference_id = id de la nómina) guarda el estado de su destinatario.
+    """
+
+    def __init__(self, chunk_size: int, session_factory=SessionLocal):
+        self.chunk_size = max(1, chunk_size)
+        self.session_factory = session_factory
+        self._jobs: "OrderedDict[str, PayrollMailJob]" = OrderedDict()
+        self._threads: Dict[str, threading.Thread] = {}
+        self._running: Dict[str, PayrollMailJob] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self, period: str, id_user: Optional[str] = None) -> PayrollMailJob:
+        """
+        Inicia el envío de los comprobantes del periodo sin esperar a que termine.
+        Dos envíos simultáneos de las mismas nóminas leerían el outbox antes de que el otro
+        inserte sus filas y encolarían cada comprobante dos veces, así que se rechaza.
+        :param id_user: Limita el envío a las nóminas de esa empresa.
+        :raises PayrollMailJobRunning: Si ya hay un envío en curso del periodo para esa empresa
+            (o para todas).
+        """
+        job = PayrollMailJob(str(uuid.uuid4()), period, id_user)
+        thread = threading.Thread(target=self._run, args=(job,), name=f"payroll-mail-{job.id[:8]}", daemon=True)
+        with self._lock:
+            for running in self._running.values():
+                if running.period == period and (running.id_user is None or id_user is None or running.id_user == id_user):
+                    raise PayrollMailJobRunning("Ya hay un envío de comprobantes en curso para este periodo.", running)
+            self._running[job.id] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+            self._threads[job.id] = thread
+        thread.start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[PayrollMailJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: PayrollMailJob) -> None:
+        job.status = "running"
+        try:
+            last_id = None
+            while not self._stopping.is_set():
+                chunk = self._read_chunk(job, last_id)
+                if not chunk:
+                    break
+                last_id = chunk[-1]["id"]
+                self._queue_chunk(job, chunk)
+                email_dispatcher.wake()
+            job.status = "cancelled" if self._stopping.is_set() else "done"
+        except Exception as e:
+            logger.exception("Error en el envío de comprobantes %s", job.id)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                self._threads.pop(job.id, None)
+                self._running.pop(job.id, None)
+
+    def _read_chunk(self, job: PayrollMailJob, last_id: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Siguiente tanda de nóminas del periodo, ya convertidas a datos planos, marcando las
+        que ya tienen un comprobante activo en el outbox.
+        """
+        db = self.session_factory()
+        try:
+            query = db.query(Nomina).filter(Nomina.period == job.period)
+            if job.id_user is not None:
+                query = query.filter(Nomina.id_user == job.id_user)
+            if last_id is not None:
+                query = query.filter(Nomina.id > last_id)
+            nominas = query.order_by(Nomina.id).limit(self.chunk_size).all()
+            if not nominas:
+                return []
+            ids = [nomina.id for nomina in nominas]
+            already_sent = {reference_id for (reference_id,) in db.query(EmailOutbox.reference_id).filter(
+                EmailOutbox.kind == KIND,
+                EmailOutbox.reference_id.in_(ids),
+                EmailOutbox.status.in_(ACTIVE_STATUSES),
+            )}
+            return [{
+                "id": nomina.id,
+                "email": nomina.email,
+                "employee_name": nomina.employee_name,
+                "employee_id": nomina.employee_id,
+                "payload": None if nomina.id in already_sent else nomina_pdf_payload(nomina),
+            } for nomina in nominas]
+        finally:
+            db.close()
+
+    def _queue_chunk(self, job: PayrollMailJob, chunk: List[Dict[str, Any]]) -> None:
+        """Genera los PDFs de la tanda en paralelo y encola sus correos con una sola transacción."""
+        pending = [item for item in chunk if item["payload"] is not None]
+        job.skipped += len(chunk) - len(pending)
+        futures = {item["id"]: pdf_queue.render(item["payload"]) for item in pending}
+
+        pdf_paths, errors = {}, {}
+        for item in pending:
+            try:
+                pdf_paths[item["id"]] = futures[item["id"]].result()
+            except Exception as e:
+                errors[item["id"]] = str(e)
+
+        db = self.session_factory()
+        try:
+            # El adjunto apunta al PDF en el almacén por contenido (no a la caché, que puede descartarlo)
+            digests = store_nomina_pdfs(db, pdf_paths)
+            now = datetime.utcnow()
+            outbox_rows = []
+            for item in pending:
+                row = {
+                    "id": str(uuid.uuid4()),
+                    "kind": KIND,
+                    "job_id": job.id,
+                    "reference_id": item["id"],
+                    "to_email": item["email"],
+                    "to_name": item["employee_name"],
+                    "subject": f"Comprobante de nómina {job.period}",
+                    "body_text": (f"Hola {item['employee_name']},\n\n"
+                                  f"Adjuntamos tu comprobante de nómina del periodo {job.period}.\n"),
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "created_at": now,
+                }
+                if item["id"] in errors:
+                    # Queda registrado como fallido para ese destinatario; no detiene el resto del envío
+                    row.update(status="failed", last_error=f"No se pudo generar el PDF: {errors[item['id']]}")
+                else:
+                    row.update(status="pending", attachments=[{
+                        "path": blob_store.path(digests[item["id"]]),
+                        "filename": f"nomina_{item['employee_id']}_{job.period}.pdf",
+                        "content_type": "application/pdf",
+                    }])
+                outbox_rows.append(row)
+            if outbox_rows:
+                db.bulk_insert_mappings(EmailOutbox, outbox_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        job.queued += len(pdf_paths)
+        job.render_failed += len(errors)
+        job.processed += len(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tracked_jobs": len(self._jobs), "running_jobs": len(self._threads)}
+
+    def shutdown(self) -> None:
+        """Detiene los envíos en curso al terminar la tanda actual; lo ya encolado sigue en el outbox."""
+        self._stopping.set()
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join()
+        self._stopping.clear()
+
+
+payroll_mailer = PayrollSlipMailer(settings.PAYROLL_MAIL_CHUNK_SIZE)
@@ -0,0 +1,255 @@
+# src/services/rate_limiter.py
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.rate_limit import RateLimitCounter
+
+
+class RateLimitExceeded(Exception):
+    """Se superó el límite de intentos; retry_after indica en cuántos segundos reintentar."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens en memoria por clave: admite ráfagas de hasta capacity intentos y se
+    recarga a rate tokens por segundo. Es un primer filtro local, sin acceso a la base de datos.
+    """
+
+    def __init__(self, capacity: int, rate: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # clave -> (tokens, último acceso)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Consume un token.
+        :return: 0 si se concedió, o los segundos hasta que haya un token disponible.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float) -> None:
+        # Una cubeta que ya se habría recargado por completo equivale a no tenerla
+        full_after = self.capacity / self.rate
+        for key in [key for key, (_, last) in self._buckets.items() if now - last >= full_after]:
+            del self._buckets[key]
+
+
+class MemoryCounterBackend:
+    """Contadores por ventana fija en memoria del proceso."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._counters: Dict[str, Dict[int, int]] = {}  # clave -> {inicio de ventana: intentos}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        """
+        Suma un intento a la ventana actual.
+        :return: (intentos en la ventana anterior, intentos en la actual incluido este).
+        """
+        with self._lock:
+            windows = self._counters.setdefault(key, {})
+            for start in [start for start in windows if start < window_start - window]:
+                del windows[start]
+            current = windows.get(window_start, 0) + 1
+            windows[window_start] = current
+            if len(self._counters) > self.max_keys:
+                self._prune(window_start - window)
+            return windows.get(window_start - window, 0), current
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def _prune(self, oldest: int) -> None:
+        for key in [key for key, windows in self._counters.items() if max(windows) < oldest]:
+            del self._counters[key]
+
+
+class SQLCounterBackend:
+    """
+    Contadores por ventana fija en la tabla rate_limit_counters, compartidos entre procesos.
+    El incremento es un upsert atómico (INSERT ... ON CONFLICT DO UPDATE), igual que INCR en Redis.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def _upsert(self, db, key: str, window_start: int):
+        dialect = db.get_bind(mapper=RateLimitCounter.__mapper__).dialect.name
+        values = {"key": key, "window_start": window_start, "count": 1}
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = insert(RateLimitCounter).values(**values)
+            return db.execute(statement.on_conflict_do_update(
+                index_elements=["key", "window_start"],
+                set_={"count": RateLimitCounter.count + 1},
+            ))
+        updated = db.query(RateLimitCounter).filter(
+            RateLimitCounter.key == key, RateLimitCounter.window_start == window_start
+        ).update({"count": RateLimitCounter.count + 1}, synchronize_session=False)
+        if not updated:
+            db.add(RateLimitCounter(**values))
+            db.flush()
+
+    def hit(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        with self._lock:
+            self._hits += 1
+            purge = self._hits % self.PURGE_EVERY == 0
+        db = self.session_factory()
+        try:
+            self._upsert(db, key, window_start)
+            rows = dict(db.query(RateLimitCounter.window_start, RateLimitCounter.count).filter(
+                RateLimitCounter.key == key,
+                RateLimitCounter.window_start.in_([window_start - window, window_start]),
+            ).all())
+            if purge:
+                db.query(RateLimitCounter).filter(
+                    RateLimitCounter.window_start < window_start - window
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return rows.get(window_start - window, 0), rows.get(window_start, 1)
+
+    def reset(self, key: str) -> None:
+        db = self.session_factory()
+        try:
+            db.query(RateLimitCounter).filter(RateLimitCounter.key == key).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class SlidingWindowLimiter:
+    """
+    Límite de intentos por ventana deslizante (aproximada con dos ventanas fijas): el conteo
+    estimado es intentos_anteriores * (fracción de la ventana anterior aún dentro) + intentos_actuales.
+    Cuenta todos los intentos, también los rechazados.
+    """
+
+    def __init__(self, backend, limit: int, window: int):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key: str, now: Optional[float] = None) -> int:
+        """
+        Registra un intento.
+        :return: 0 si está dentro del límite, o los segundos hasta que vuelva a estarlo.
+        """
+        now = time.time() if now is None else now
+        window_start = int(now // self.window) * self.window
+        previous, current = self.backend.hit(key, window_start, self.window)
+        elapsed = now - window_start
+        weight = 1 - elapsed / self.window
+        if previous * weight + current <= self.limit:
+            return 0
+        if current > self.limit or previous == 0:
+            # Hay que esperar a la ventana siguiente y a que esta pese lo suficientemente poco
+            return math.ceil(self.window - elapsed + self.window * (1 - self.limit / current))
+        # Momento en que la parte de la ventana anterior que queda deja de superar el límite
+        return max(1, math.ceil(self.window * (1 - (self.limit - current) / previous) - elapsed))
+
+    def reset(self, key: str) -> None:
+        self.backend.reset(key)
+
+
+class LoginRateLimiter:
+    """
+    Protege el login antes de verificar la contraseña (trabajo de CPU): una cubeta de tokens
+    en memoria por IP para ráfagas y ventanas deslizantes por IP y por email (credential
+    stuffing desde una IP, o fuerza bruta a una cuenta desde muchas IPs).
+    """
+
+    def __init__(self, backend, window: int, ip_limit: int, email_limit: int, burst: int):
+        self.bucket = TokenBucket(burst, ip_limit / window)
+        self.by_ip = SlidingWindowLimiter(backend, ip_limit, window)
+        self.by_email = SlidingWindowLimiter(backend, email_limit, window)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _reject(self, message: str, retry_after: float) -> None:
+        with self._lock:
+            self.rejected += 1
+        raise RateLimitExceeded(message, max(1, math.ceil(retry_after)))
+
+    def check(self, ip: Optional[str], email: Optional[str]) -> None:
+        """
+        Registra un intento de login. Sin email (LoginRequest.email es opcional) solo cuenta
+        para la IP; el login responde 401 como siempre.
+        :raises RateLimitExceeded: Si la IP o el email superaron su límite.
+        """
+        ip = ip or "unknown"
+        retry_after = self.bucket.take(f"ip:{ip}")
+        if retry_after:
+            self._reject("Demasiados intentos de inicio de sesión desde esta dirección.", retry_after)
+        retry_after = self.by_ip.hit(f"ip:{ip}")
+        if retry_after:
+            self._reject("Demasiados intentos de inicio de sesión desde esta dirección.", retry_after)
+        if not email or not email.strip():
+            return
+        retry_after = self.by_email.hit(f"email:{email.strip().lower()}")
+        if retry_after:
+            self._reject("Demasiados intentos de inicio de sesión para esta cuenta.", retry_after)
+
+    def login_succeeded(self, email: str) -> None:
+        """Tras un login correcto se reinicia el contador del email (los intentos fallidos previos no cuentan)."""
+        self.by_email.reset(f"email:{email.strip().lower()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.by_ip.backend).__name__,
+            "window_seconds": self.by_ip.window,
+            "ip_limit": self.by_ip.limit,
+            "email_limit": self.by_email.limit,
+            "burst": self.bucket.capacity,
+            "rejected": self.rejected,
+        }
+
+
+def create_counter_backend(name: str):
+    """Backend de contadores según LOGIN_RATE_BACKEND ("memory" o "sql")."""
+    if name == "memory":
+        return MemoryCounterBackend()
+    if name == "sql":
+        return SQLCounterBackend()
+    raise ValueError(f"LOGIN_RATE_BACKEND inválido: {name}")
+
+
+login_rate_limiter = LoginRateLimiter(
+    create_counter_backend(settings.LOGIN_RATE_BACKEND),
+    window=settings.LOGIN_RATE_WINDOW_SECONDS,
+    ip_limit=settings.LOGIN_RATE_LIMIT_PER_IP,
+    email_limit=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+    burst=settings.LOGIN_RATE_BURST,
+)
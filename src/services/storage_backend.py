@@ -0,0 +1,153 @@
+# src/services/storage_backend.py
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterator, Optional
+
+
+class StorageBackend(ABC):
+    """
+    Dónde se guardan los bytes del almacén de archivos (src/services/blob_store.py). La
+    aplicación solo conoce claves; otro backend (ej. un bucket S3) implementa estos métodos
+    sin cambiar las rutas ni las tablas.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def put_file(self, key: str, source: str, move: bool = True) -> None:
+        """Guarda el archivo local source con la clave dada (de forma atómica: nunca a medias)."""
+        ...
+
+    @abstractmethod
+    def touch(self, key: str) -> bool:
+        """Marca la clave como usada ahora. :return: True si existía."""
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """:return: True si la clave existe."""
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """:raises FileNotFoundError: Si la clave no existe."""
+        ...
+
+    @abstractmethod
+    def modified_at(self, key: str) -> Optional[float]:
+        """Última escritura o touch (UNIX). :return: None si la clave no existe."""
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Archivo binario de solo lectura con seek (para servir rangos). :raises FileNotFoundError:"""
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """:return: True si existía."""
+        ...
+
+    @abstractmethod
+    def iter_keys(self, older_than: float, removed: Dict[str, int]) -> Iterator[str]:
+        """
+        Claves sin modificar desde older_than (UNIX), para buscar huérfanas; de paso borra los
+        temporales abandonados y los suma en removed["temporary"].
+        """
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Ruta en el disco local (None si el backend no es local)."""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Archivos en el disco local: root/ab/cd/<clave> (dos niveles de subdirectorios para no
+    acumular miles de archivos en uno). Se escribe en un temporal y se renombra con os.replace.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put_file(self, key: str, source: str, move: bool = True) -> None:
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            try:
+                os.replace(source, target)
+                return
+            except OSError:
+                pass  # otro disco: se copia
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(source, tmp_path)  # sin copiar datos si están en el mismo disco
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+        if move:
+            os.remove(source)
+
+    def touch(self, key: str) -> bool:
+        try:
+            os.utime(self.local_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.local_path(key))
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.local_path(key))
+        except FileNotFoundError:
+            return None
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    def delete(self, key: str) -> bool:
+        return _remove(self.local_path(key))
+
+    def iter_keys(self, older_than: float, removed: Dict[str, int]) -> Iterator[str]:
+        if not os.path.isdir(self.root):
+            return
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) >= older_than:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if name.endswith((".tmp", ".part")):
+                    if _remove(path):
+                        removed["temporary"] = removed.get("temporary", 0) + 1
+                elif directory != self.root:
+                    yield name
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def create_storage_backend(name: str, root: str) -> StorageBackend:
+    """Backend del almacén según BLOB_STORAGE_BACKEND (por ahora solo "local")."""
+    if name == "local":
+        return LocalStorageBackend(root)
+    raise ValueError(f"BLOB_STORAGE_BACKEND inválido: {name}")
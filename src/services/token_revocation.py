@@ -0,0 +1,263 @@
+# src/services/token_revocation.py
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.revoked_token import RevokedToken
+from .auth_cache import invalidate_user, token_cache, token_digest
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TYPE = "access"
+
+
+def token_ids() -> Dict[str, Any]:
+    """Claims que identifican cada token emitido: jti único e iat (segundos UNIX)."""
+    return {"jti": uuid.uuid4().hex, "iat": int(time.time())}
+
+
+def _timestamp(value: datetime) -> float:
+    """Segundos UNIX de una fecha UTC sin zona horaria (como se guardan en la base de datos)."""
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray. Responde "seguro que no está" con k lecturas de bits;
+    un positivo puede ser falso (con probabilidad error_rate) y se confirma con el conjunto exacto.
+    Las k posiciones salen de un solo SHA-256 (doble hashing de Kirsch-Mitzenmacher).
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "bits": self.size,
+            "hashes": self.hash_count,
+            "bytes": len(self._bits),
+        }
+
+
+class RevocationList:
+    """
+    Lista de revocación en memoria, espejo de la tabla revoked_tokens. Se carga al iniciar y se
+    mantiene al día de forma incremental (filas con revoked_at posterior a la última sincronización),
+    así que verificar un token no consulta la base de datos:
+      - jti revocados: filtro de Bloom delante de un diccionario exacto jti -> vencimiento.
+      - cortes por sujeto: (tipo, email) -> segundo a partir del cual se aceptan tokens (iat).
+    Las entradas vencidas se descartan de memoria y de la tabla en cada sincronización.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._jtis: Dict[str, float] = {}
+        self._subjects: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._last_sync: Optional[datetime] = None
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    # --- consulta ---
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        """True si el token (por sus claims ya verificados) fue revocado."""
+        jti = claims.get("jti")
+        if jti is not None and jti in self._bloom:
+            with self._lock:
+                self.bloom_hits += 1
+                if jti in self._jtis:
+                    return True
+                self.false_positives += 1
+        cutoff = self._subjects.get((claims.get("type", ACCESS_TOKEN_TYPE), claims.get("sub")))
+        # Tokens sin iat (emitidos antes de agregar el claim) quedan cubiertos por el corte
+        return cutoff is not None and int(claims.get("iat", 0)) < cutoff[0]
+
+    # --- revocación ---
+
+    def revoke_token(self, db: Session, claims: Dict[str, Any], reason: str, token: Optional[str] = None) -> None:
+        """
+        Revoca un token concreto hasta su exp. Un token sin jti no se puede distinguir de los
+        demás del usuario, así que se revocan todos los de su tipo emitidos hasta ahora.
+        :param token: Token en claro, para descartarlo también de la caché de claims.
+        """
+        jti = claims.get("jti")
+        if jti is None:
+            self.revoke_subject(db, claims["sub"], claims.get("type", ACCESS_TOKEN_TYPE), reason)
+            return
+        exp = claims.get("exp")
+        expires_at = (datetime.utcfromtimestamp(float(exp)) if exp is not None
+                      else datetime.utcnow() + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES))
+        db.add(RevokedToken(jti=jti, subject=claims["sub"], token_type=claims.get("type", ACCESS_TOKEN_TYPE),
+                            reason=reason, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Ya estaba revocado (ej. doble logout)
+            db.rollback()
+        self._add_jti(jti, _timestamp(expires_at))
+        if token is not None:
+            token_cache.invalidate(token_digest(token))
+
+    def revoke_subject(self, db: Session, email: str, token_type: str = ACCESS_TOKEN_TYPE,
+                       reason: Optional[str] = None) -> None:
+        """
+        Revoca todos los tokens del tipo emitidos al usuario hasta este momento (incluido el
+        segundo en curso, porque iat tiene resolución de segundos). Los tokens nuevos son válidos
+        a partir del segundo siguiente.
+        """
+        now = datetime.utcnow()
+        row_expires = now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+        db.add(RevokedToken(subject=email, token_type=token_type, reason=reason, revoked_at=now,
+                            expires_at=row_expires))
+        db.commit()
+        self._add_subject(token_type, email, _timestamp(now), _timestamp(row_expires))
+        if token_type == ACCESS_TOKEN_TYPE:
+            invalidate_user(email)
+
+    def _add_jti(self, jti: str, expires: float) -> None:
+        with self._lock:
+            if jti in self._jtis:
+                return
+            self._jtis[jti] = expires
+            if len(self._jtis) > self._bloom.capacity:
+                # El filtro se llenó: se reconstruye con el doble de capacidad
+                self._rebuild(self._bloom.capacity * 2)
+            else:
+                self._bloom.add(jti)
+
+    def _add_subject(self, token_type: str, email: str, revoked_at: float, expires: float) -> None:
+        cutoff = math.floor(revoked_at) + 1
+        key = (token_type, email)
+        with self._lock:
+            current = self._subjects.get(key)
+            if current is None or current[0] < cutoff:
+                self._subjects[key] = (cutoff, max(expires, current[1] if current else expires))
+
+    def _rebuild(self, capacity: int) -> None:
+        bloom = BloomFilter(max(capacity, settings.REVOCATION_BLOOM_CAPACITY), self.error_rate)
+        for jti in self._jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    # --- sincronización con la base de datos ---
+
+    def load(self, db: Session) -> None:
+        """Carga completa de las revocaciones vigentes (al iniciar la aplicación)."""
+        with self._lock:
+            self._jtis.clear()
+            self._subjects.clear()
+            self._rebuild(settings.REVOCATION_BLOOM_CAPACITY)
+            self._last_sync = None
+        self.sync(db)
+
+    def sync(self, db: Session) -> int:
+        """
+        Aplica las revocaciones hechas desde la última sincronización (incluidas las de otros
+        procesos) y descarta las vencidas.
+        :return: Número de filas leídas.
+        """
+        now = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.subject, RevokedToken.token_type,
+                         RevokedToken.revoked_at, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if self._last_sync is not None:
+            # Margen para filas confirmadas por otros procesos con un revoked_at algo anterior
+            query = query.filter(RevokedToken.revoked_at >= self._last_sync - timedelta(seconds=settings.REVOCATION_SYNC_SECONDS))
+        rows = query.all()
+        for jti, subject, token_type, revoked_at, expires_at in rows:
+            if jti is not None:
+                self._add_jti(jti, _timestamp(expires_at))
+            else:
+                self._add_subject(token_type, subject, _timestamp(revoked_at), _timestamp(expires_at))
+        self._last_sync = now
+        self._prune(_timestamp(now))
+        return len(rows)
+
+    def _prune(self, now: float) -> None:
+        with self._lock:
+            expired = [jti for jti, expires in self._jtis.items() if expires <= now]
+            for jti in expired:
+                del self._jtis[jti]
+            for key in [key for key, (_, expires) in self._subjects.items() if expires <= now]:
+                del self._subjects[key]
+            # Un filtro de Bloom no admite borrados: se reconstruye cuando sobran muchos bits
+            if expired and self._bloom.count > 2 * len(self._jtis) + 1000:
+                self._rebuild(len(self._jtis) * 2)
+
+    def purge_expired(self, db: Session) -> int:
+        """Borra de la tabla las revocaciones de tokens que ya expiraron."""
+        deleted = db.query(RevokedToken).filter(RevokedToken.expires_at <= datetime.utcnow()).delete(
+            synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def _sync_with_new_session(self, purge: bool) -> None:
+        db = SessionLocal()
+        try:
+            self.sync(db)
+            if purge:
+                self.purge_expired(db)
+        finally:
+            db.close()
+
+    async def run_sync_loop(self) -> None:
+        """Tarea de fondo: sincroniza cada REVOCATION_SYNC_SECONDS y purga la tabla cada hora."""
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            purge = time.monotonic() - last_purge >= 3600
+            try:
+                await asyncio.to_thread(self._sync_with_new_session, purge)
+                if purge:
+                    last_purge = time.monotonic()
+            except Exception:
+                logger.exception("No se pudo sincronizar la lista de revocación")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "revoked_jtis": len(self._jtis),
+                "revoked_subjects": len(self._subjects),
+                "bloom": self._bloom.stats(),
+                "bloom_hits": self.bloom_hits,
+                "false_positives": self.false_positives,
+                "last_sync": self._last_sync.isoformat() if self._last_sync else None,
+            }
+
+
+revocation_list = RevocationList(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
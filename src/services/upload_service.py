@@ -0,0 +1,307 @@
+# src/services/upload_service.py
+import hashlib
+import os
+import re
+import uuid
+from urllib.parse import parse_qsl
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect, Request
+
+from .blob_store import BlobStore
+
+# Firmas (magic bytes) aceptadas por extensión: el contenido debe coincidir con la extensión
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # .doc (Office 97-2003)
+ZIP_SIGNATURE = b"PK\x03\x04"  # .docx (Office Open XML)
+FILE_SIGNATURES: Dict[str, Tuple[str, Tuple[bytes, ...]]] = {
+    ".pdf": ("application/pdf", (b"%PDF-",)),
+    ".png": ("image/png", (b"\x89PNG\r\n\x1a\n",)),
+    ".jpg": ("image/jpeg", (b"\xff\xd8\xff",)),
+    ".jpeg": ("image/jpeg", (b"\xff\xd8\xff",)),
+    ".doc": ("application/msword", (OLE_SIGNATURE,)),
+    ".docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", (ZIP_SIGNATURE,)),
+}
+SNIFF_BYTES = max(len(signature) for _, signatures in FILE_SIGNATURES.values() for signature in signatures)
+# Los datos de cada archivo se acumulan hasta este tamaño antes de escribirlos (en un hilo aparte)
+WRITE_BUFFER_BYTES = 256 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+MAX_FIELDS = 50
+
+
+class UploadRejected(Exception):
+    """La carga no cumple los límites o el tipo de archivo; status_code es el código HTTP a devolver."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def safe_filename(filename: str) -> str:
+    """Nombre sin rutas ni caracteres problemáticos (el nombre lo envía el cliente)."""
+    name = os.path.basename(filename.replace("\\", "/"))
+    name = re.sub(r"[^\w.\- ]", "_", name).strip(" .")
+    return name[:150] or "archivo"
+
+
+class UploadedFile:
+    """Archivo recibido: primero en un temporal del almacén y luego ingresado por su SHA-256."""
+
+    def __init__(self, field_name: str, filename: str, tmp_path: str):
+        self.field_name = field_name
+        self.filename = filename
+        self.tmp_path = tmp_path
+        self.digest: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.head = b""
+        self.complete = False
+        self._file = None
+        self._hash = hashlib.sha256()  # se calcula mientras se escribe: no hay que releer el archivo
+
+    def write(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.tmp_path, "wb")
+        self._file.write(data)
+        self._hash.update(data)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        self.close()
+        if self.tmp_path:
+            try:
+                os.remove(self.tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+class _Part:
+    def __init__(self):
+        self.headers: Dict[bytes, bytes] = {}
+        self.name = ""
+        self.data = bytearray()
+        self.file: Optional[UploadedFile] = None
+        self.skip = False  # input de archivo enviado vacío
+
+
+class StreamingUpload:
+    """
+    Recepción de un formulario multipart leyendo el cuerpo de la petición a medida que llega,
+    sin el parser de Starlette (que guarda todo el cuerpo antes de llamar a la ruta).
+    - Los archivos se escriben por bloques en un temporal, con la escritura en un hilo aparte
+      para no bloquear el event loop.
+    - Los límites por archivo y por petición se aplican mientras se lee: al superarlos se corta
+      la lectura y se borra lo escrito, así un archivo enorme no llena el disco.
+    - El tipo se valida con los primeros bytes del contenido (magic bytes), no solo con la extensión.
+    - Cuando todo es válido, commit() ingresa los archivos al almacén por contenido (os.replace,
+      atómico: nunca queda un archivo a medias); un archivo repetido no se vuelve a guardar.
+    """
+
+    def __init__(self, store: BlobStore, max_file_bytes: int, max_request_bytes: int, max_files: int,
+                 allowed_extensions: Optional[Iterable[str]] = None):
+        self.store = store
+        self.allowed_extensions = set(allowed_extensions or FILE_SIGNATURES)
+        self.tmp_dir = store.tmp_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.max_files = max_files
+        self.fields: Dict[str, str] = {}
+        self.files: List[UploadedFile] = []
+        self.received = 0
+        self._part = _Part()
+        self._header_field = b""
+        self._header_value = b""
+        self._pending: List[Tuple[UploadedFile, bytes]] = []
+        self._buffer = bytearray()
+        self._finished: List[UploadedFile] = []
+
+    # --- Callbacks del parser (síncronos: solo acumulan y validan, no escriben en disco) ---
+
+    def _on_part_begin(self) -> None:
+        self._part = _Part()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._part.headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise UploadRejected("Parte del formulario sin nombre.")
+        self._part.name = options[b"name"].decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if filename is None:
+            if len(self.fields) >= MAX_FIELDS:
+                raise UploadRejected("Demasiados campos en el formulario.")
+            return
+        filename = safe_filename(filename.decode("utf-8", "replace")) if filename else ""
+        if not filename:
+            self._part.skip = True
+            return
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in FILE_SIGNATURES or extension not in self.allowed_extensions:
+            raise UploadRejected(f"Tipo de archivo no permitido: {filename}", 415)
+        if len(self.files) >= self.max_files:
+            raise UploadRejected(f"Se permiten máximo {self.max_files} archivos.", 413)
+        uploaded = UploadedFile(self._part.name, filename, os.path.join(self.tmp_dir, f"{uuid.uuid4()}.part"))
+        self.files.append(uploaded)
+        self._part.file = uploaded
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._part.skip:
+            return
+        chunk = data[start:end]
+        uploaded = self._part.file
+        if uploaded is None:
+            self._part.data += chunk
+            if len(self._part.data) > MAX_FIELD_BYTES:
+                raise UploadRejected(f"El campo {self._part.name} es demasiado grande.", 413)
+            return
+        uploaded.size += len(chunk)
+        if uploaded.size > self.max_file_bytes:
+            raise UploadRejected(
+                f"El archivo {uploaded.filename} supera el máximo de {self.max_file_bytes // (1024 * 1024)} MB.", 413
+            )
+        if len(uploaded.head) < SNIFF_BYTES:
+            uploaded.head += chunk[:SNIFF_BYTES - len(uploaded.head)]
+            if len(uploaded.head) >= SNIFF_BYTES:
+                self._sniff(uploaded)
+        self._buffer += chunk
+        if len(self._buffer) >= WRITE_BUFFER_BYTES:
+            self._pending.append((uploaded, bytes(self._buffer)))
+            self._buffer.clear()
+
+    def _on_part_end(self) -> None:
+        if self._part.skip:
+            return
+        uploaded = self._part.file
+        if uploaded is None:
+            self.fields[self._part.name] = self._part.data.decode("utf-8", "replace")
+            return
+        if uploaded.content_type is None:
+            self._sniff(uploaded)  # archivo más corto que SNIFF_BYTES
+        if self._buffer:
+            self._pending.append((uploaded, bytes(self._buffer)))
+            self._buffer.clear()
+        self._finished.append(uploaded)
+
+    def _sniff(self, uploaded: UploadedFile) -> None:
+        content_type, signatures = FILE_SIGNATURES[os.path.splitext(uploaded.filename)[1].lower()]
+        if not any(uploaded.head.startswith(signature) for signature in signatures):
+            raise UploadRejected(f"El contenido de {uploaded.filename} no corresponde a su extensión.", 415)
+        uploaded.content_type = content_type
+
+    # --- Lectura del cuerpo ---
+
+    def _flush(self) -> None:
+        """Escribe los bloques acumulados y cierra los archivos terminados (se llama en un hilo)."""
+        for uploaded, data in self._pending:
+            uploaded.write(data)
+        for uploaded in self._finished:
+            uploaded.close()
+            uploaded.complete = True
+        self._pending.clear()
+        self._finished.clear()
+
+    async def receive(self, request: Request) -> "StreamingUpload":
+        """
+        Lee y valida el formulario completo.
+        :raises UploadRejected: Si se supera un límite, un archivo no es de un tipo permitido o
+            el cuerpo no es multipart válido; lo ya escrito se borra.
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_request_bytes:
+            raise UploadRejected(
+                f"La petición supera el máximo de {self.max_request_bytes // (1024 * 1024)} MB.", 413
+            )
+        if content_type == b"application/x-www-form-urlencoded":
+            return await self._receive_urlencoded(request)
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadRejected("Se esperaba un formulario multipart/form-data.", 415)
+
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+        await run_in_threadpool(os.makedirs, self.tmp_dir, exist_ok=True)
+        try:
+            async for chunk in request.stream():
+                self.received += len(chunk)
+                if self.received > self.max_request_bytes:
+                    raise UploadRejected(
+                        f"La petición supera el máximo de {self.max_request_bytes // (1024 * 1024)} MB.", 413
+                    )
+                parser.write(chunk)
+                if self._pending or self._finished:
+                    await run_in_threadpool(self._flush)
+            parser.finalize()
+            if not all(uploaded.complete for uploaded in self.files):
+                raise UploadRejected("Formulario multipart incompleto.")
+        except UploadRejected:
+            await run_in_threadpool(self.discard)
+            raise
+        except ClientDisconnect as e:
+            await run_in_threadpool(self.discard)
+            raise UploadRejected("El cliente cerró la conexión durante la carga.") from e
+        except Exception as e:
+            await run_in_threadpool(self.discard)
+            raise UploadRejected(f"Formulario multipart inválido: {e}") from e
+        return self
+
+    async def _receive_urlencoded(self, request: Request) -> "StreamingUpload":
+        """Formulario sin archivos (application/x-www-form-urlencoded), con el mismo límite por petición."""
+        body = bytearray()
+        try:
+            async for chunk in request.stream():
+                body += chunk
+                if len(body) > self.max_request_bytes:
+                    raise UploadRejected(
+                        f"La petición supera el máximo de {self.max_request_bytes // (1024 * 1024)} MB.", 413
+                    )
+        except ClientDisconnect as e:
+            raise UploadRejected("El cliente cerró la conexión durante la carga.") from e
+        fields = parse_qsl(body.decode("latin-1"), keep_blank_values=True, max_num_fields=MAX_FIELDS,
+                           encoding="utf-8")
+        self.fields.update(fields)
+        return self
+
+    def commit(self, db: Session) -> List[Dict[str, Any]]:
+        """
+        Ingresa los archivos recibidos al almacén y suma sus referencias en la transacción de db
+        (sin commit: se confirman junto con la fila que los usa).
+        :return: Descripción de cada archivo (sha256, nombre, content_type, tamaño), en orden de llegada.
+        """
+        for uploaded in self.files:
+            uploaded.digest = uploaded._hash.hexdigest()
+            self.store.put_file(uploaded.tmp_path, uploaded.digest)
+            uploaded.tmp_path = None
+        self.store.add_refs(db, [(uploaded.digest, uploaded.size, uploaded.content_type) for uploaded in self.files])
+        return [{
+            "sha256": uploaded.digest,
+            "nombre": uploaded.filename,
+            "content_type": uploaded.content_type,
+            "size": uploaded.size,
+        } for uploaded in self.files]
+
+    def discard(self) -> None:
+        """Borra los temporales que aún no se ingresaron al almacén."""
+        for uploaded in self.files:
+            uploaded.discard()
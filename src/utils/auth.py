@@ -1,45 +1,12 @@
-from datetime import datetime, timedelta
-import jwt
-from src.config import settings
+from datetime import timedelta
+from src.services.jwt_service import jwt_core
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, 
-        settings.SECRET_KEY, 
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    return jwt_core.issue(data, expires_delta)
 
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token expirado")
-    except jwt.JWTError:
-        raise ValueError("Token inválido")
-    
 def create_reset_token(email: str, expires_delta: timedelta = None) -> str:
-    to_encode = {"sub": email}  # Crea el diccionario aquí
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=30)  # 30 min por defecto
-    
-    to_encode.update({"exp": expire})
-    return jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
+    # 30 min por defecto
+    return jwt_core.issue(
+        {"sub": email, "type": "password_reset"},
+        expires_delta or timedelta(minutes=30)
     )
\ No newline at end of file
@@ -0,0 +1,103 @@
+# src/utils/export.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Iterable, Iterator, List, Optional
+
+from src.database import SessionLocal
+
+# Filas por lote leídas del cursor y escritas en cada trozo de la respuesta
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_value(value: Any) -> Any:
+    """Convierte un valor de columna a un tipo serializable (JSON/CSV)."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return None
+    return value
+
+
+def iter_rows(model, columns: Optional[List[str]] = None, filters: Iterable[Any] = (),
+              batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Recorre la tabla con un cursor del lado del servidor (stream_results + yield_per),
+    sin hidratar objetos ORM ni cargar la tabla completa en memoria.
+
+    Abre su propia sesión: el generador se consume mientras se envía la respuesta,
+    cuando la sesión de get_db ya se cerró.
+    :param model: Modelo a exportar.
+    :param columns: Columnas a exportar (por defecto todas las de la tabla).
+    :param filters: Condiciones adicionales (ej. Client.id_user == user_id).
+    :param batch_size: Filas por lote leídas de la base de datos.
+    """
+    table_columns = model.__table__.columns
+    selected = [table_columns[name] for name in columns] if columns else list(table_columns)
+    db = SessionLocal()
+    try:
+        query = db.query(*selected)
+        for condition in filters:
+            query = query.filter(condition)
+        query = query.execution_options(stream_results=True).yield_per(batch_size)
+        for row in query:
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+def stream_ndjson(model, columns: List[str], filters: Iterable[Any] = (),
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Genera la exportación en NDJSON (un objeto JSON por línea), en trozos de batch_size filas."""
+    buffer = []
+    for row in iter_rows(model, columns, filters, batch_size):
+        record = {name: export_value(value) for name, value in zip(columns, row)}
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= batch_size:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+
+def stream_csv(model, columns: List[str], filters: Iterable[Any] = (),
+               batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Genera la exportación en CSV con fila de encabezados, en trozos de batch_size filas."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in iter_rows(model, columns, filters, batch_size):
+        writer.writerow([export_value(value) for value in row])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_export(model, columns: List[str], fmt: str, filters: Iterable[Any] = (),
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    :param fmt: "ndjson" o "csv".
+    :raises ValueError: Si el formato no está soportado.
+    """
+    if fmt == "ndjson":
+        return stream_ndjson(model, columns, filters, batch_size)
+    if fmt == "csv":
+        return stream_csv(model, columns, filters, batch_size)
+    raise ValueError(f"Formato no soportado: {fmt}")
@@ -0,0 +1,91 @@
+# src/utils/file_response.py
+import re
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+CHUNK_BYTES = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango de bytes pedido en el encabezado Range, como (inicio, fin) inclusivos.
+    Soporta "bytes=a-b", "bytes=a-" y "bytes=-n"; con varios rangos devuelve None y se
+    responde el archivo completo (lo permite el RFC 9110).
+    :raises ValueError: Si el rango no se puede satisfacer (respuesta 416).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        if header.strip().startswith("bytes=") and "," in header:
+            return None
+        raise ValueError("Rango inválido")
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError("Rango inválido")
+    if not first:
+        # Sufijo: los últimos n bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Rango vacío")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Rango fuera del archivo")
+    return start, end
+
+
+def _read(open_file: Callable[[], BinaryIO], start: int, end: int) -> Iterator[bytes]:
+    # Iterador síncrono: StreamingResponse lo recorre en el threadpool, sin bloquear el event loop
+    with open_file() as source:
+        source.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = source.read(min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def range_response(request: Request, open_file: Callable[[], BinaryIO], size: int, etag: str,
+                   media_type: str, filename: Optional[str] = None,
+                   cache_control: str = "private, max-age=31536000, immutable") -> Response:
+    """
+    Respuesta de descarga en streaming con soporte de Range (206 / 416), If-Range e
+    If-None-Match (304), para reanudar descargas y que los visores de PDF pidan solo las
+    páginas que muestran.
+    :param open_file: Abre el archivo (con seek); se llama solo si hay que enviar contenido.
+    :param etag: ETag sin comillas (ej. el SHA-256 del contenido).
+    """
+    quoted_etag = f'"{etag}"'
+    headers: Dict[str, str] = {
+        "ETag": quoted_etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+    }
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    if quoted_etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == quoted_etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_read(open_file, 0, size - 1), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_read(open_file, start, end), status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,66 @@
+# src/utils/money.py
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Tuple, Union
+
+import numpy as np
+
+# Los valores monetarios se manejan en centavos enteros (Numeric(12, 2) en la base de datos)
+# y las cantidades (horas, días, porcentajes) en centésimas enteras. Nunca se pasa por float.
+CENT = Decimal("0.01")
+SCALE = 100
+
+IntLike = Union[int, np.ndarray]
+
+
+def to_decimal(value: Any) -> Decimal:
+    """
+    Convierte un valor (Decimal, int, str o float) a Decimal redondeado a 2 decimales.
+    Los float se convierten desde su representación más corta (str), no desde el binario.
+    """
+    if value is None:
+        return Decimal("0.00")
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_cents(value: Any) -> int:
+    """Convierte un valor monetario (o una cantidad con 2 decimales) a un entero de centésimas."""
+    return int(to_decimal(value) * SCALE)
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convierte centésimas enteras a Decimal con 2 decimales (listo para columnas Numeric)."""
+    return (Decimal(int(cents)) / SCALE).quantize(CENT)
+
+
+def ratio(value: Any) -> Tuple[int, int]:
+    """
+    Convierte una tasa o multiplicador ("1.25", "0.04") a una fracción entera exacta
+    (numerador, denominador), ej. "1.25" -> (5, 4).
+    """
+    return Decimal(str(value)).as_integer_ratio()
+
+
+def div_round(numerator: IntLike, denominator: int) -> IntLike:
+    """
+    División entera con redondeo half-up (el mismo de Decimal.ROUND_HALF_UP) para valores
+    no negativos. Funciona igual con enteros de Python y con arreglos int64 de NumPy.
+    """
+    return (numerator * 2 + denominator) // (denominator * 2)
+
+
+def apply_ratio(amount: IntLike, rate: Tuple[int, int]) -> IntLike:
+    """Multiplica un monto en centavos por una tasa (numerador, denominador), redondeando half-up."""
+    numerator, denominator = rate
+    return div_round(amount * numerator, denominator)
+
+
+def line_total_cents(quantity: Any, unit_price: Any, discount_pct: Any = 0, tax_pct: Any = 0) -> int:
+    """
+    Total de una línea de factura en centavos: cantidad x precio, menos descuento, más impuesto.
+    Cada paso se redondea a centavos con half-up.
+    """
+    gross = div_round(to_cents(quantity) * to_cents(unit_price), SCALE)
+    net = gross - div_round(gross * to_cents(discount_pct), SCALE * 100)
+    return net + div_round(net * to_cents(tax_pct), SCALE * 100)
@@ -0,0 +1,48 @@
+# src/utils/ownership.py
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.clients import Client
+from ..models.dianVerification import DianVerification
+from ..models.generator import Generator
+from ..models.invoice import Invoice
+from ..models.nomina import Nomina
+from ..models.paymentsTransfers import PaymentsTransfers
+from ..models.suppliers import Supplier
+from ..models.taxes import Taxes
+
+# Cada registro pertenece al usuario (contador) dueño del cliente del que depende:
+# cliente <- factura <- impuesto <- pago/transferencia <- generador <- verificación DIAN
+
+
+def owned_ids(model, user_id: str):
+    """Subconsulta con los ids de model que pertenecen al usuario."""
+    return select(model.id).where(owner_filter(model, user_id))
+
+
+OWNER_FILTERS: Dict[Any, Callable[[str], Any]] = {
+    Client: lambda user_id: Client.id_user == user_id,
+    Supplier: lambda user_id: Supplier.id_user == user_id,
+    Nomina: lambda user_id: Nomina.id_user == user_id,
+    Invoice: lambda user_id: Invoice.id_client.in_(owned_ids(Client, user_id)),
+    Taxes: lambda user_id: Taxes.id_invoice_receipt.in_(owned_ids(Invoice, user_id)),
+    PaymentsTransfers: lambda user_id: PaymentsTransfers.id_tax.in_(owned_ids(Taxes, user_id)),
+    Generator: lambda user_id: Generator.id_payment_transfer.in_(owned_ids(PaymentsTransfers, user_id)),
+    DianVerification: lambda user_id: DianVerification.id_generator.in_(owned_ids(Generator, user_id)),
+}
+
+
+def owner_filter(model, user_id: str):
+    """Condición para quedarse con los registros de model que pertenecen al usuario."""
+    return OWNER_FILTERS[model](user_id)
+
+
+def get_owned(db: Session, model, row_id: Any, user_id: str) -> Optional[Any]:
+    """El registro si existe y pertenece al usuario; None en otro caso (no se distingue cuál)."""
+    return db.query(model).filter(model.id == row_id, owner_filter(model, user_id)).first()
+
+
+def is_owned(db: Session, model, row_id: Any, user_id: str) -> bool:
+    return db.query(model.id).filter(model.id == row_id, owner_filter(model, user_id)).first() is not None
@@ -0,0 +1,158 @@
+# src/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, func, or_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Columnas de fecha que sirven como primera clave del cursor, en orden de preferencia
+KEYSET_TIME_COLUMNS = ("created_at", "createdAt", "fecha")
+
+
+class PageParams:
+    """Parámetros de una página: cursor opaco, tamaño, proyección y conteo total opcional."""
+
+    def __init__(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                 fields: Optional[List[str]] = None, include_total: bool = False):
+        self.cursor = cursor
+        self.limit = max(1, min(limit, MAX_PAGE_SIZE))
+        self.fields = fields
+        self.include_total = include_total
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor de la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamaño de la página"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (ej. id,name,email)"),
+    include_total: bool = Query(False, description="Incluir el total de registros (consulta adicional)"),
+) -> PageParams:
+    """Dependencia de FastAPI para los endpoints de listado."""
+    field_list = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    return PageParams(cursor=cursor, limit=limit, fields=field_list, include_total=include_total)
+
+
+def keyset_columns(model) -> Tuple[Any, Any]:
+    """
+    Columnas (fecha de creación, id) usadas como clave del cursor.
+    :raises ValueError: Si el modelo no tiene columna de fecha de creación.
+    """
+    mapper = sa_inspect(model)
+    for name in KEYSET_TIME_COLUMNS:
+        if name in mapper.columns:
+            return mapper.columns[name], mapper.primary_key[0]
+    raise ValueError(f"{model.__name__} no tiene columna de fecha para paginar.")
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: Any) -> str:
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """
+    :raises ValueError: Si el cursor no es válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), row_id
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def resolve_fields(model, requested: Optional[Iterable[str]], allowed: Iterable[str],
+                   defaults: Optional[Iterable[str]] = None) -> List[Tuple[str, Any]]:
+    """
+    Traduce los nombres de campo pedidos a columnas del modelo. "created_at" se
+    resuelve a la columna de fecha del cursor si el modelo usa otro nombre.
+    :param defaults: Campos si no se piden (por defecto, todos los permitidos).
+    :raises ValueError: Si se pide un campo que no está permitido.
+    """
+    mapper = sa_inspect(model)
+    allowed = list(allowed)
+    names = list(requested) if requested else list(defaults or allowed)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Campos no permitidos: {', '.join(unknown)}")
+
+    columns = []
+    for name in names:
+        if name in mapper.columns:
+            columns.append((name, mapper.columns[name]))
+        elif name == "created_at":
+            columns.append((name, keyset_columns(model)[0]))
+    return columns
+
+
+def paginate(db: Session, model, params: PageParams, allowed_fields: Iterable[str],
+             filters: Iterable[Any] = (), default_fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Pagina por keyset sobre (fecha de creación, id), de más reciente a más antiguo; los
+    registros sin fecha se listan al final por id.
+    Solo se consultan las columnas pedidas, sin hidratar objetos ORM.
+    :param db: Sesión de base de datos.
+    :param model: Modelo a listar.
+    :param params: Parámetros de la página.
+    :param allowed_fields: Campos que el endpoint permite devolver (y los que devuelve por defecto).
+    :param filters: Condiciones adicionales (ej. Client.id_user == user_id).
+    :param default_fields: Campos que se devuelven si no se piden (ej. sin las columnas pesadas).
+    :return: Diccionario con items, next_cursor, limit y total (None si no se pidió).
+    :raises ValueError: Si el cursor o los campos no son válidos.
+    """
+    time_col, id_col = keyset_columns(model)
+    columns = resolve_fields(model, params.fields, allowed_fields, default_fields)
+    filters = list(filters)
+
+    query = db.query(
+        *[column.label(name) for name, column in columns],
+        time_col.label("_cursor_time"),
+        id_col.label("_cursor_id"),
+    )
+    for condition in filters:
+        query = query.filter(condition)
+
+    # Las filas sin fecha van al final (en cualquier backend), ordenadas solo por id
+    if params.cursor:
+        last_time, last_id = decode_cursor(params.cursor)
+        if last_time is None:
+            query = query.filter(time_col.is_(None), id_col < last_id)
+        else:
+            query = query.filter(or_(
+                time_col < last_time,
+                and_(time_col == last_time, id_col < last_id),
+                time_col.is_(None),
+            ))
+
+    rows = query.order_by(time_col.is_(None), time_col.desc(), id_col.desc()).limit(params.limit + 1).all()
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+
+    total = None
+    if params.include_total:
+        count_query = db.query(func.count(id_col))
+        for condition in filters:
+            count_query = count_query.filter(condition)
+        total = count_query.scalar()
+
+    return {
+        "items": [{name: row._mapping[name] for name, _ in columns} for row in rows],
+        "next_cursor": encode_cursor(rows[-1]._cursor_time, rows[-1]._cursor_id) if has_more else None,
+        "limit": params.limit,
+        "total": total,
+    }
+
+
+def paginate_or_400(db: Session, model, params: PageParams, allowed_fields: Iterable[str],
+                    filters: Iterable[Any] = (), default_fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Igual que paginate, pero traduce los errores de parámetros a HTTP 400."""
+    try:
+        return paginate(db, model, params, allowed_fields, filters, default_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
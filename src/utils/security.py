@@ -1,33 +1,15 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
-import jwt
-from ..config import settings
-from passlib.context import CryptContext
-
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..services.jwt_service import jwt_core
+from ..services.password_service import check_password, hash_password
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return jwt_core.issue(data, expires_delta)
 
-def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.PyJWTError:
-        return None
-    
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña en texto plano coincide con su hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(hashed_password, plain_password)
 
 def get_password_hash(password: str) -> str:
     """Genera el hash de una contraseña."""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return hash_password(password)
\ No newline at end of file
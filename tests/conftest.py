@@ -0,0 +1,63 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# La configuración se lee al importar src: base de datos y almacenamiento en un directorio temporal
+TEST_DIR = tempfile.mkdtemp(prefix="backend-dian-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["BLOB_STORE_DIR"] = os.path.join(TEST_DIR, "blobs")
+os.environ["NOMINA_PDF_DIR"] = os.path.join(TEST_DIR, "nominas")
+os.environ["EMAIL_LOCAL_DIR"] = os.path.join(TEST_DIR, "emails")
+# Los tests inician sesión muchas veces desde la misma IP
+os.environ["LOGIN_RATE_LIMIT_PER_IP"] = "100000"
+os.environ["LOGIN_RATE_BURST"] = "100000"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.database import SessionLocal  # noqa: E402
+from src.main import app  # noqa: E402
+from src.models.register import User  # noqa: E402
+
+PASSWORD = "secret1"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(client):
+    """Crea un usuario activo y devuelve (id, cabeceras con su token)."""
+    def create(permissions: str = "total"):
+        email = f"{uuid.uuid4().hex[:12]}@test.co"
+        session = SessionLocal()
+        try:
+            user = User(first_name="Test", last_name="User", role="contador", identification_number=email,
+                        email=email, permissions=permissions, status="activo")
+            user.set_password(PASSWORD)
+            session.add(user)
+            session.commit()
+            user_id = user.id
+        finally:
+            session.close()
+        response = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return create
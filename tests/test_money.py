@@ -0,0 +1,48 @@
+# tests/test_money.py
+from decimal import Decimal
+
+from src.business_logic.invoice_batch_logic import InvoiceBatchLogic
+from src.business_logic.payroll_rates import calculate_payroll
+from src.schemas.invoice_issue_schema import InvoiceIssueRequest
+from src.utils.money import div_round, from_cents, line_total_cents, to_cents, to_decimal
+
+
+def test_to_decimal_rounds_half_up_from_the_shortest_repr():
+    assert to_decimal(2.675) == Decimal("2.68")
+    assert to_decimal("0.005") == Decimal("0.01")
+    assert to_decimal(None) == Decimal("0.00")
+    assert to_cents("1234.565") == 123457
+    assert from_cents(123457) == Decimal("1234.57")
+
+
+def test_div_round_matches_decimal_half_up():
+    for numerator in range(0, 1000, 7):
+        expected = (Decimal(numerator) / 8).quantize(Decimal("1"), rounding="ROUND_HALF_UP")
+        assert div_round(numerator, 8) == int(expected)
+
+
+def test_line_total_rounds_each_step_to_cents():
+    # 3 x 33.34 (33.335 redondeado) = 100.02; -10 % = 90.02; +19 % (17.1038) = 107.12
+    assert line_total_cents(3, "33.335", 10, 19) == 10712
+
+
+def test_single_payroll_is_exact_in_cents():
+    values = calculate_payroll("2024-05", Decimal("2000000"), days_worked=30, extra_day_hours=2)
+    assert values["transport"] == Decimal("162000.00")
+    assert values["total_gross"] == Decimal("2182833.33")
+    assert values["total_net"] == Decimal("2022833.33")
+    assert values["total_net"] == values["total_gross"] - values["total_deductions"]
+    assert all(value == value.quantize(Decimal("0.01")) for value in values.values())
+
+
+def test_batch_invoice_totals_match_line_totals():
+    lines = [("3", "33.33", "10", "19"), ("1", "0.05", "0", "19"), ("2.5", "1999.99", "5", "0")]
+    invoice = InvoiceIssueRequest.model_validate({
+        "id_client": "c", "client_name": "Cliente", "client_id": "900", "items": [
+            {"product_name": "x", "quantity": q, "unit_price": p, "discount": d, "tax": t} for q, p, d, t in lines
+        ],
+    })
+    values = InvoiceBatchLogic._compute([invoice])
+    expected = [line_total_cents(*line) for line in lines]
+    assert values["line_total"].tolist() == expected
+    assert values["total"].tolist() == [sum(expected)]
@@ -0,0 +1,48 @@
+# tests/test_nominas.py
+from decimal import Decimal
+
+NOMINA = {
+    "contract_type": "indefinido",
+    "period": "2024-05",
+    "employee_id": "1020304050",
+    "employee_name": "Empleado Prueba",
+    "email": "empleado@test.co",
+    "base_salary": "2000000",
+    "days_worked": "30",
+    "extra_day_hours": "2",
+}
+
+
+def test_create_nomina_requires_a_token(client):
+    assert client.post("/nominas/", json=NOMINA).status_code == 422
+
+
+def test_create_nomina_uses_the_payroll_engine(client, make_user):
+    user_id, headers = make_user()
+    response = client.post("/nominas/", json={**NOMINA, "id_user": "otro-usuario"}, headers=headers)
+    assert response.status_code == 200, response.text
+    nomina = response.json()
+
+    assert nomina["id_user"] == user_id
+    assert Decimal(nomina["transport_allowance"]) == Decimal("162000")
+    assert Decimal(nomina["total_gross"]) == Decimal("2182833.33")
+    assert Decimal(nomina["total_net"]) == Decimal("2022833.33")
+
+
+def test_single_nomina_matches_the_pay_run(client, make_user):
+    _, headers = make_user()
+    single = client.post("/nominas/", json=NOMINA, headers=headers).json()
+    pay_run = client.post("/nominas/liquidacion", headers=headers, json={
+        "period": NOMINA["period"], "employees": [{**NOMINA, "employee_id": "2"}],
+    }).json()
+    assert Decimal(pay_run["nominas"][0]["total_neto"]) == Decimal(single["total_net"])
+
+
+def test_nomina_is_not_visible_to_other_users(client, make_user):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    nomina_id = client.post("/nominas/", json=NOMINA, headers=headers).json()["id"]
+
+    assert client.post(f"/nominas/{nomina_id}/pagar", headers=other_headers).status_code == 404
+    assert client.delete(f"/nominas/nomina/{nomina_id}", headers=other_headers).status_code == 404
+    assert client.post(f"/nominas/{nomina_id}/pagar", headers=headers).status_code == 200
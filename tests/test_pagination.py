@@ -0,0 +1,60 @@
+# tests/test_pagination.py
+from datetime import datetime
+
+from src.models.clients import Client
+
+
+def add_clients(db, user_id, count):
+    clients = [
+        Client(user_id, f"Cliente {n}", "Natural", f"NIT{n}", "id_card", str(n), "comercio",
+               f"c{n}@test.co", "3000000", "Calle 1", "Bogotá", "Common")
+        for n in range(count)
+    ]
+    db.add_all(clients)
+    db.commit()
+    return [client.id for client in clients]
+
+
+def read_all_pages(client, headers, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/clients", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_keyset_pages_cover_null_dates_without_duplicates(client, make_user, db):
+    user_id, headers = make_user()
+    ids = add_clients(db, user_id, 7)
+    # Fechas repetidas (se desempata por id), una más reciente y dos sin fecha
+    db.query(Client).filter(Client.id.in_(ids[:2])).update({"created_at": None}, synchronize_session=False)
+    db.query(Client).filter(Client.id == ids[2]).update({"created_at": datetime(2030, 1, 1)}, synchronize_session=False)
+    db.commit()
+
+    seen = read_all_pages(client, headers, limit=2)
+
+    assert len(seen) == len(set(seen)) == len(ids)
+    assert set(seen) == set(ids)
+    assert seen[0] == ids[2]
+    assert set(seen[-2:]) == set(ids[:2])
+
+
+def test_pages_only_list_own_rows(client, make_user, db):
+    user_id, headers = make_user()
+    other_id, _ = make_user()
+    ids = add_clients(db, user_id, 2)
+    add_clients(db, other_id, 3)
+    assert set(read_all_pages(client, headers, limit=50)) == set(ids)
+
+
+def test_invalid_cursor_is_a_400(client, make_user):
+    _, headers = make_user()
+    response = client.get("/clients", params={"cursor": "no-es-un-cursor"}, headers=headers)
+    assert response.status_code == 400
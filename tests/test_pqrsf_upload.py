@@ -0,0 +1,49 @@
+# tests/test_pqrsf_upload.py
+import os
+
+from src.config import settings
+from src.services.blob_store import blob_store
+
+PDF = b"%PDF-1.4\n" + b"0" * 1024
+
+
+def leftover_parts():
+    if not os.path.isdir(blob_store.tmp_dir):
+        return []
+    return [name for name in os.listdir(blob_store.tmp_dir) if name.endswith(".part")]
+
+
+def post_pqrsf(client, files):
+    return client.post("/pqrsf/", data={"tipo": "peticion", "mensaje": "Hola"},
+                       files=[("archivos", file) for file in files])
+
+
+def test_small_attachment_is_stored(client):
+    response = post_pqrsf(client, [("soporte.pdf", PDF, "application/pdf")])
+    assert response.status_code == 200, response.text
+
+
+def test_file_over_the_cap_is_a_413_and_leaves_nothing(client, monkeypatch):
+    monkeypatch.setattr(settings, "PQRSF_MAX_FILE_MB", 1)
+    big = b"%PDF-1.4\n" + b"0" * (1024 * 1024 + 1)
+    response = post_pqrsf(client, [("grande.pdf", big, "application/pdf")])
+    assert response.status_code == 413
+    assert leftover_parts() == []
+
+
+def test_request_over_the_cap_is_a_413(client, monkeypatch):
+    monkeypatch.setattr(settings, "PQRSF_MAX_REQUEST_MB", 1)
+    chunk = b"%PDF-1.4\n" + b"0" * (600 * 1024)
+    response = post_pqrsf(client, [("a.pdf", chunk, "application/pdf"), ("b.pdf", chunk, "application/pdf")])
+    assert response.status_code == 413
+
+
+def test_too_many_files_is_a_413(client, monkeypatch):
+    monkeypatch.setattr(settings, "PQRSF_MAX_FILES", 1)
+    response = post_pqrsf(client, [("a.pdf", PDF, "application/pdf"), ("b.pdf", PDF, "application/pdf")])
+    assert response.status_code == 413
+
+
+def test_content_must_match_the_extension(client):
+    response = post_pqrsf(client, [("falso.pdf", b"MZ\x90\x00" * 10, "application/pdf")])
+    assert response.status_code == 415
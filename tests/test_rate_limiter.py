@@ -0,0 +1,38 @@
+# tests/test_rate_limiter.py
+import pytest
+
+from src.services.rate_limiter import (
+    LoginRateLimiter, MemoryCounterBackend, RateLimitExceeded, SlidingWindowLimiter,
+)
+
+
+def test_login_without_email_is_a_401(client):
+    response = client.post("/auth/login", json={"password": "secret1"})
+    assert response.status_code == 401
+
+
+def test_missing_email_only_counts_for_the_ip():
+    limiter = LoginRateLimiter(MemoryCounterBackend(), window=60, ip_limit=100, email_limit=1, burst=100)
+    for _ in range(5):
+        limiter.check("10.0.0.1", None)
+        limiter.check("10.0.0.1", "   ")
+    assert limiter.rejected == 0
+
+
+def test_email_limit_applies_across_ips():
+    limiter = LoginRateLimiter(MemoryCounterBackend(), window=60, ip_limit=100, email_limit=2, burst=100)
+    limiter.check("10.0.0.1", "a@test.co")
+    limiter.check("10.0.0.2", "A@test.co ")
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.check("10.0.0.3", "a@test.co")
+    assert excinfo.value.retry_after >= 1
+
+
+def test_sliding_window_weighs_the_previous_window():
+    limiter = SlidingWindowLimiter(MemoryCounterBackend(), limit=4, window=60)
+    for _ in range(4):
+        assert limiter.hit("k", now=1000 * 60 + 30) == 0
+    # A mitad de la ventana siguiente la anterior todavía cuenta la mitad (2 intentos)
+    assert limiter.hit("k", now=1001 * 60 + 30) == 0
+    assert limiter.hit("k", now=1001 * 60 + 30) == 0
+    assert limiter.hit("k", now=1001 * 60 + 30) > 0